@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from make_java_repo import generate_repo
+from run_benchmarks import DEFAULT_SCRIPTS, script_command
+
+# Modules that must never be imported on the offline path.
+HEAVY_MODULES = ("openai", "supabase", "httpx", "pydantic", "tiktoken", "psycopg", "numpy", "transformers", "torch")
+DEFAULT_BUDGET_MS = float(os.environ.get("COLD_START_BUDGET_MS", "500"))
+
+def offline_env(work):
+    env = dict(os.environ)
+    env.update({
+        "PIPELINE_OFFLINE": "1",
+        "LLM_CACHE_DISABLED": "1",
+        "RUN_METRICS_DIR": str(work / "metrics"),
+    })
+    return env
+
+def heavy_imports(command, cwd, env):
+    """Run a command under -X importtime and return the heavy top-level modules it imported."""
+    result = subprocess.run([command[0], "-X", "importtime", *command[1:]], cwd=cwd, env=env,
+                            capture_output=True, text=True)
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            loaded.add(line.rsplit("|", 1)[1].strip().split(".")[0])
+    return sorted(loaded & set(HEAVY_MODULES))
+
+def measure(scripts, runs=5, files=10):
+    """Time offline runs of each script on a tiny repo; return one result per script with the median wall time."""
+    work = Path(tempfile.mkdtemp(prefix="cold-start-"))
+    source = generate_repo(work / "repo", files)
+    env = offline_env(work)
+    results = []
+    for name in scripts:
+        command = script_command(name, source, work)
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(command, cwd=work, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            timings.append((time.perf_counter() - start) * 1000)
+        results.append({
+            "script": name,
+            "median_ms": round(statistics.median(timings), 1),
+            "max_ms": round(max(timings), 1),
+            "heavy_imports": heavy_imports(command, work, env),
+        })
+    subprocess.run(["rm", "-rf", str(work)], check=False)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the offline cold start of each pipeline script")
+    parser.add_argument("--scripts", default=",".join(DEFAULT_SCRIPTS), help="Comma-separated scripts to run")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per script (the median is reported)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="Fail when a script's median exceeds this (default: COLD_START_BUDGET_MS or 500)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = measure([name.strip() for name in args.scripts.split(",")], runs=args.runs)
+    failures = [r for r in results if r["median_ms"] > args.budget_ms or r["heavy_imports"]]
+    if args.json:
+        print(json.dumps({"budget_ms": args.budget_ms, "results": results}, indent=2))
+    else:
+        for r in results:
+            heavy = ", ".join(r["heavy_imports"]) or "none"
+            print(f"{r['script']:<22} median {r['median_ms']:>7.1f} ms  max {r['max_ms']:>7.1f} ms  heavy imports: {heavy}")
+    if failures:
+        print(f"Cold start budget of {args.budget_ms:.0f} ms exceeded or SDK imported offline by: "
+              + ", ".join(r["script"] for r in failures))
+        sys.exit(1)
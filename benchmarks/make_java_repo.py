@@ -0,0 +1,130 @@
+import argparse
+import random
+from pathlib import Path
+
+SERVLET = """package {package};
+
+import java.io.IOException;
+import java.sql.Connection;
+import java.sql.DriverManager;
+import java.sql.PreparedStatement;
+import java.sql.ResultSet;
+import javax.servlet.ServletException;
+import javax.servlet.annotation.WebServlet;
+import javax.servlet.http.HttpServlet;
+import javax.servlet.http.HttpServletRequest;
+import javax.servlet.http.HttpServletResponse;
+import javax.servlet.http.HttpSession;
+
+@WebServlet("/{route}")
+public class {name}Servlet extends HttpServlet {{
+    private static final String DB_URL = "jdbc:postgresql://localhost:5432/{route}";
+    private static final String DB_USER = "admin";
+    private static final String DB_PASSWORD = "password";
+    private final {name}DAO dao = new {name}DAO();
+
+    @Override
+    protected void doGet(HttpServletRequest request, HttpServletResponse response) throws ServletException, IOException {{
+        HttpSession session = request.getSession();
+        String term = request.getParameter("q");
+        System.out.println("Searching {route} for " + term);
+        request.setAttribute("results", dao.search(term));
+        request.getRequestDispatcher("/{route}.jsp").forward(request, response);
+    }}
+{extra}}}
+"""
+
+DAO = """package {package};
+
+import java.sql.Connection;
+import java.sql.DriverManager;
+import java.sql.PreparedStatement;
+import java.sql.ResultSet;
+import java.util.ArrayList;
+import java.util.List;
+
+public class {name}DAO {{
+    public List<{name}> search(String term) {{
+        List<{name}> results = new ArrayList<>();
+        String sql = "SELECT Id, PolicyNumber, CustomerName FROM Policies WHERE PolicyNumber LIKE '%" + term + "%'";
+        try (Connection c = DriverManager.getConnection("jdbc:postgresql://localhost/db", "admin", "password");
+             PreparedStatement ps = c.prepareStatement(sql);
+             ResultSet rs = ps.executeQuery()) {{
+            while (rs.next()) {{
+                {name} item = new {name}();
+                item.setId(rs.getInt("Id"));
+                results.add(item);
+            }}
+        }} catch (Exception e) {{
+            e.printStackTrace();
+        }}
+        return results;
+    }}
+{extra}}}
+"""
+
+ENTITY = """package {package};
+
+import java.io.Serializable;
+import java.util.Date;
+
+public class {name} implements Serializable {{
+    private int id;
+    private String policyNumber;
+    private String customerName;
+    private Date issueDate;
+
+    public int getId() {{ return id; }}
+    public void setId(int id) {{ this.id = id; }}
+    public String getPolicyNumber() {{ return policyNumber; }}
+    public void setPolicyNumber(String policyNumber) {{ this.policyNumber = policyNumber; }}
+    public String getCustomerName() {{ return customerName; }}
+    public void setCustomerName(String customerName) {{ this.customerName = customerName; }}
+{extra}}}
+"""
+
+NOUNS = ["Policy", "Claim", "Customer", "Quote", "Premium", "Agent", "Broker", "Invoice", "Payment", "Coverage"]
+TEMPLATES = [("", ENTITY), ("DAO", DAO), ("Servlet", SERVLET)]
+
+def extra_methods(rng, count):
+    """Generate filler helper methods so file sizes vary like a real codebase."""
+    methods = []
+    for i in range(count):
+        methods.append(
+            f"\n    public int helper{i}(int value) {{\n"
+            f"        int result = value * {rng.randint(2, 97)};\n"
+            f"        return result + {rng.randint(0, 1000)};\n"
+            f"    }}\n"
+        )
+    return "".join(methods)
+
+def generate_repo(output_dir, file_count, seed=42, max_extra_methods=40):
+    """Write file_count synthetic legacy Java files (entities, DAOs, servlets) under output_dir/src/main/java."""
+    rng = random.Random(seed)
+    root = Path(output_dir) / "src" / "main" / "java"
+    written = 0
+    module = 0
+    while written < file_count:
+        package = f"com.example.module{module}"
+        package_dir = root / package.replace(".", "/")
+        package_dir.mkdir(parents=True, exist_ok=True)
+        for noun in NOUNS:
+            name = f"{noun}{module}"
+            for suffix, template in TEMPLATES:
+                if written >= file_count:
+                    break
+                source = template.format(package=package, name=name, route=name.lower(),
+                                         extra=extra_methods(rng, rng.randint(0, max_extra_methods)))
+                (package_dir / f"{name}{suffix}.java").write_text(source, encoding="utf-8")
+                written += 1
+        module += 1
+    return root
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic legacy Java repository for benchmarks")
+    parser.add_argument("output_dir", help="Directory to create the repository in")
+    parser.add_argument("--files", type=int, default=1000, help="Number of Java files to generate")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    root = generate_repo(args.output_dir, args.files, args.seed)
+    print(f"Generated {args.files} Java files under {root}")
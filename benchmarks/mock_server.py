@@ -0,0 +1,140 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class MockConfig:
+    """Behaviour knobs for the mock server; shared by all request handler threads."""
+
+    def __init__(self, latency=0.05, jitter=0.02, error_rate=0.0, throttle_rate=0.0, retry_after=1, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"chat_completions": 0, "execute_sql": 0, "errors": 0, "throttled": 0}
+
+    def roll(self):
+        with self.lock:
+            return self.random.random()
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+def fake_completion(messages):
+    """Build a plausible reply for whichever pipeline prompt was sent."""
+    prompt = messages[-1]["content"] if messages else ""
+    files = re.findall(r"^// File: (.+?)(?: \(part \d+/\d+\))?$", prompt, re.MULTILINE)
+    if "JSON object keyed by file path" in prompt:
+        return json.dumps({
+            path: {"functional": [f"Manage records in {path}"], "non_functional": ["Respond within 2 seconds"]}
+            for path in files
+        })
+    if "modernization gaps" in prompt:
+        return ("- Gap: Servlet-based architecture detected. Recommendation: Migrate to Spring Boot REST APIs.\n"
+                "- Gap: Raw JDBC usage. Recommendation: Use Spring Data JPA.")
+    if "Functional Requirements" in prompt:
+        return ("Functional Requirements:\n- FR1: The system shall search policies.\n\n"
+                "Non-Functional Requirements:\n- NFR1: Searches shall complete within 2 seconds.")
+    if "system inventory" in prompt:
+        return "## System Inventory\n\n### Components\n- Servlet API\n\n### Issues\n- Hardcoded credentials"
+    return "This class handles HTTP requests and uses JDBC for persistence. It hardcodes credentials."
+
+class MockHandler(BaseHTTPRequestHandler):
+    config = MockConfig()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length) if length else b"{}"
+        try:
+            return json.loads(raw or b"{}")
+        except ValueError:
+            return {}
+
+    def do_GET(self):
+        if self.path.startswith("/stats"):
+            with self.config.lock:
+                self._send_json(200, dict(self.config.stats))
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        config = self.config
+        payload = self._read_json()
+        time.sleep(max(0.0, config.latency + config.random.uniform(-config.jitter, config.jitter)))
+        if config.roll() < config.throttle_rate:
+            config.count("throttled")
+            self._send_json(429, {"error": {"code": "429", "message": "Rate limit is exceeded."}},
+                            {"Retry-After": str(config.retry_after), "retry-after-ms": str(config.retry_after * 1000)})
+            return
+        if config.roll() < config.error_rate:
+            config.count("errors")
+            self._send_json(500, {"error": {"code": "500", "message": "Injected server error."}})
+            return
+
+        if "/chat/completions" in self.path:
+            config.count("chat_completions")
+            content = fake_completion(payload.get("messages", []))
+            prompt_chars = sum(len(m.get("content", "")) for m in payload.get("messages", []))
+            self._send_json(200, {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "mock"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(content) // 4,
+                          "total_tokens": prompt_chars // 4 + len(content) // 4},
+            }, {"x-ratelimit-remaining-requests": "1000", "x-ratelimit-remaining-tokens": "1000000"})
+        elif self.path.startswith("/rest/v1/rpc/execute_sql"):
+            config.count("execute_sql")
+            self._send_json(200, [])
+        else:
+            self._send_json(404, {"error": "not found"})
+
+def start_server(config=None, host="127.0.0.1", port=0):
+    """Start the mock server on a background thread and return (server, base_url)."""
+    handler = type("ConfiguredMockHandler", (MockHandler,), {"config": config or MockConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for Azure OpenAI chat completions and Supabase execute_sql")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Uniform latency jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429 responses")
+    args = parser.parse_args()
+    server, url = start_server(MockConfig(args.latency, args.jitter, args.error_rate, args.throttle_rate, args.retry_after),
+                               port=args.port)
+    print(f"Mock server listening on {url}")
+    print(f"  AZURE_OPENAI_ENDPOINT={url}  SUPABASE_URL={url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from make_java_repo import generate_repo
+from mock_server import MockConfig, start_server
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+DEFAULT_SCRIPTS = ["codebert_summary", "generate_requirements", "generate_gaps", "generate_inventory"]
+
+def script_command(name, source, work):
+    """Command line for one pipeline script against the synthetic repo in work/."""
+    index = ["--index", str(work / "reports" / "source-index.json")]
+    commands = {
+        "codebert_summary": [str(source), "--output", str(work / "reports" / "codebert-summary.md")],
+        "generate_requirements": ["--source", str(source), "--entity", "Policy", "--industry", "Insurance",
+                                  "--output", str(work / "docs" / "requirements.md"), "--batch"],
+        "generate_gaps": ["--analysis-reports", str(work / "reports"), "--output", str(work / "docs" / "gaps.md"),
+                          "--source-dir", str(source)],
+        "generate_inventory": ["--source", str(source), "--output", str(work / "docs" / "inventory.md")],
+    }
+    return [sys.executable, str(SCRIPTS_DIR / f"{name}.py"), *commands[name], *index]
+
+def run_script(command, cwd, env, log_path):
+    """Run a script to completion and return (exit code, wall seconds, peak RSS in MB)."""
+    start = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        process = subprocess.Popen(command, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS.
+    peak_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return os.waitstatus_to_exitcode(status), elapsed, peak_mb
+
+def fetch_stats(base_url):
+    import urllib.request
+    with urllib.request.urlopen(f"{base_url}/stats", timeout=5) as response:
+        return json.load(response)
+
+def run_benchmarks(sizes, scripts, offline=False, latency=0.05, error_rate=0.0, throttle_rate=0.0,
+                   keep=False, use_cache=False):
+    """Benchmark each script on synthetic repos of the given sizes and return one result per run.
+
+    In mock mode a run that made no model calls measured the fallback path
+    (e.g. the SDK failed to import); its result gets an "error" entry.
+    """
+    server, base_url = start_server(MockConfig(latency=latency, error_rate=error_rate,
+                                               throttle_rate=throttle_rate, seed=1))
+    results = []
+    try:
+        for size in sizes:
+            work = Path(tempfile.mkdtemp(prefix=f"bench-{size}-"))
+            source = generate_repo(work / "repo", size)
+            env = dict(os.environ)
+            env.update({
+                "RUN_METRICS_DIR": str(work / "metrics"),
+                "LLM_CACHE_DIR": str(work / ".cache" / "llm"),
+                "LLM_CACHE_DISABLED": "0" if use_cache else "1",
+                "SUPABASE_URL": base_url,
+                "SUPABASE_KEY": "mock-key",
+            })
+            if offline:
+                for name in ("AZURE_OPENAI_ENDPOINT", "AZURE_OPENAI_KEY", "AZURE_OPENAI_DEPLOYMENT"):
+                    env.pop(name, None)
+            else:
+                env.update({"AZURE_OPENAI_ENDPOINT": base_url, "AZURE_OPENAI_KEY": "mock-key",
+                            "AZURE_OPENAI_DEPLOYMENT": "mock-deployment"})
+            for name in scripts:
+                before = fetch_stats(base_url)
+                code, elapsed, peak_mb = run_script(script_command(name, source, work), work, env,
+                                                    work / f"{name}.log")
+                after = fetch_stats(base_url)
+                result = {
+                    "script": name,
+                    "files": size,
+                    "mode": "offline" if offline else "mock",
+                    "exit_code": code,
+                    "seconds": round(elapsed, 3),
+                    "files_per_second": round(size / elapsed, 2) if elapsed else None,
+                    "peak_rss_mb": round(peak_mb, 1),
+                    "model_calls": after["chat_completions"] - before["chat_completions"],
+                    "throttled": after["throttled"] - before["throttled"],
+                    "errors": after["errors"] - before["errors"],
+                }
+                if not offline and result["model_calls"] == 0:
+                    result["error"] = "no model calls reached the mock server, so the fallback path was measured"
+                results.append(result)
+                print(f"{name:<22} {size:>7} files  {elapsed:>8.2f}s  {result['files_per_second'] or 0:>9.1f} files/s  "
+                      f"{peak_mb:>7.1f} MB  {result['model_calls']:>6} calls  exit {code}")
+                if "error" in result:
+                    print(f"Error: {name}: {result['error']}; see {work / f'{name}.log'}")
+            if not keep:
+                subprocess.run(["rm", "-rf", str(work)], check=False)
+            else:
+                print(f"Kept benchmark workspace {work}")
+    finally:
+        server.shutdown()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline throughput benchmarks for the pipeline scripts")
+    parser.add_argument("--sizes", default="100,1000", help="Comma-separated repo sizes in files (100 to 100000)")
+    parser.add_argument("--scripts", default=",".join(DEFAULT_SCRIPTS), help="Comma-separated scripts to run")
+    parser.add_argument("--offline", action="store_true", help="Run without model credentials (fallback path)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock model latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of mock requests failing with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of mock requests failing with 429")
+    parser.add_argument("--cache", action="store_true", help="Keep the LLM response cache enabled")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated repos and outputs")
+    parser.add_argument("--output", help="Write results as JSON (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        [int(size) for size in args.sizes.split(",")],
+        [name.strip() for name in args.scripts.split(",")],
+        offline=args.offline, latency=args.latency, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, keep=args.keep, use_cache=args.cache
+    )
+    output = Path(args.output or Path(__file__).resolve().parent / "results" / f"benchmark-{int(time.time())}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"created": time.time(), "python": sys.version.split()[0], "results": results}, f, indent=2)
+    print(f"Benchmark results written to {output}")
+    if any("error" in result for result in results):
+        raise SystemExit(1)
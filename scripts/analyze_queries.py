@@ -1,15 +1,293 @@
-from supabase import create_client
+import argparse
+import json
 import os
+import re
+from pathlib import Path
 
-def analyze_queries(url, key):
-    supabase = create_client(url, key)
-    query = "SELECT * FROM Policies WHERE PolicyNumber LIKE '%POL-001%';"
-    # Simulate EXPLAIN (Supabase doesn't support EXPLAIN directly)
-    response = supabase.rpc("execute_sql", {
-        "query": f"EXPLAIN {query}"
-    }).execute()
-    # Mock analysis for demo
-    return f"Query: {query}\nAnalysis: Table scan detected, estimated 5-10s due to LIKE '%...%'. Add index for performance."
+from artifacts import records_path, write_records
+from source_index import DEFAULT_INDEX_PATH, load_index, source_files
+from rule_engine import format_location
+from run_metrics import get_recorder
+
+# Connection string of the database the queries run against, e.g. a local
+# instance loaded by setup_supabase.py or the Supabase direct connection URI.
+DEFAULT_DSN = os.environ.get("DATABASE_URL")
+STATEMENT_TIMEOUT_MS = int(os.environ.get("QUERY_TIMEOUT_MS", "30000"))
+# A sequential scan that filters out at least this many rows is reported as a missing index.
+SEQ_SCAN_MIN_ROWS = int(os.environ.get("SEQ_SCAN_MIN_ROWS", "1000"))
+# Literal substituted for JDBC '?' parameters so the statement can be planned and executed.
+PLACEHOLDER_VALUE = os.environ.get("QUERY_PLACEHOLDER", "'1'")
+# EXPLAIN ANALYZE executes the statement. Rolling back undoes the rows but not sequence advances or trigger side effects,
+# and locks are held until the rollback, so INSERT/UPDATE/DELETE (and locking reads) are only planned unless this is set.
+ANALYZE_DML = os.environ.get("QUERY_ANALYZE_DML", "").strip().lower() in ("1", "true", "yes")
+
+_STRING = r'"(?:[^"\\\n]|\\.)*"'
+_OPERAND = r'[\w.]+(?:\([^()"\n]*\))?'
+_CHAIN = re.compile(rf"{_STRING}(?:\s*\+\s*(?:{_STRING}|{_OPERAND}))*")
+_PART = re.compile(rf"({_STRING})|({_OPERAND})")
+_SQL_START = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+_LEADING_WILDCARD = re.compile(r"\b(I?LIKE)\s+'%", re.IGNORECASE)
+_LIKE_PARAMETER = re.compile(r"\b(I?LIKE)\s+\?", re.IGNORECASE)
+_WILDCARD_CONCAT = re.compile(r"\"%\"\s*\+")
+_FILTER_COLUMN = re.compile(r"\(?(\w+)\)?(?:::\w+)?\s*(?:~~\*?|!~~|=|<>|<=|>=|<|>)")
+_LIKE_COLUMN = re.compile(r"(\w+)\s+I?LIKE", re.IGNORECASE)
+_WRITES = re.compile(r"\b(?:INSERT|UPDATE|DELETE|MERGE|FOR\s+(?:NO\s+KEY\s+)?UPDATE|FOR\s+(?:KEY\s+)?SHARE|NEXTVAL|SETVAL)\b", re.IGNORECASE)
+
+# -------------------- Extraction --------------------
+
+def _unescape(literal):
+    return literal[1:-1].replace('\\"', '"').replace("\\n", " ").replace("\\t", " ").replace("\\\\", "\\")
+
+def extract_sql(code):
+    """Return the SQL statements found in Java string literals as dicts with line, sql and dynamic.
+
+    Adjacent literals joined with '+' are concatenated; any non-literal
+    operand (a variable or method call) becomes a '?' and marks the statement
+    as dynamically built.
+    """
+    statements = []
+    for match in _CHAIN.finditer(code):
+        pieces, dynamic = [], False
+        for literal, operand in _PART.findall(match.group(0)):
+            if literal:
+                pieces.append(_unescape(literal))
+            else:
+                pieces.append("?")
+                dynamic = True
+        sql = " ".join("".join(pieces).split())
+        if _SQL_START.match(sql):
+            statements.append({
+                "line": code.count("\n", 0, match.start()) + 1,
+                "sql": sql.rstrip(";"),
+                "dynamic": dynamic,
+            })
+    return statements
+
+def is_read_only(sql):
+    """True for a SELECT (or WITH ... SELECT) that neither writes, locks rows nor advances a sequence."""
+    return bool(re.match(r"\s*(SELECT|WITH)\b", sql, re.IGNORECASE)) and not _WRITES.search(sql)
+
+def bind_placeholders(sql, value=PLACEHOLDER_VALUE):
+    """Replace '?' parameters outside quoted strings with a literal so the statement can be explained."""
+    out, quoted = [], False
+    for char in sql:
+        if char == "'":
+            quoted = not quoted
+        out.append(value if char == "?" and not quoted else char)
+    return "".join(out)
+
+# -------------------- Plan Analysis --------------------
+
+def walk_plan(node):
+    """Yield every node of an EXPLAIN JSON plan tree, depth first."""
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk_plan(child)
+
+def analyze_plan(explained):
+    """Summarize one EXPLAIN result into timings and flags.
+
+    For a plan explained without ANALYZE the row counts are the planner's
+    estimates, there are no timings, and a sequential scan is never reported
+    as a missing index (that needs the measured rows removed by its filter).
+    """
+    root = explained["Plan"]
+    analyzed = "Execution Time" in explained
+    flags = []
+    for node in walk_plan(root):
+        if node.get("Node Type") != "Seq Scan":
+            continue
+        relation = node.get("Relation Name", "unknown")
+        removed = node.get("Rows Removed by Filter", 0)
+        condition = node.get("Filter", "")
+        columns = list(dict.fromkeys(_FILTER_COLUMN.findall(condition)))
+        flag = {
+            "kind": "missing_index" if condition and removed >= SEQ_SCAN_MIN_ROWS else "seq_scan",
+            "relation": relation,
+            "columns": columns,
+            "rows": node.get("Actual Rows", node.get("Plan Rows", 0)),
+            "rows_removed": removed,
+            "ms": round(node.get("Actual Total Time", 0.0), 3),
+        }
+        flags.append(flag)
+        if "~~" in condition and re.search(r"~~\*?\s+'%", condition):
+            flags.append({"kind": "leading_wildcard", "relation": relation, "columns": columns})
+    if not analyzed:
+        return {"measured": False, "planned": True, "flags": flags}
+    return {
+        "measured": True,
+        "planning_ms": round(explained.get("Planning Time", 0.0), 3),
+        "execution_ms": round(explained.get("Execution Time", 0.0), 3),
+        "shared_hit_blocks": root.get("Shared Hit Blocks", 0),
+        "shared_read_blocks": root.get("Shared Read Blocks", 0),
+        "flags": flags,
+    }
+
+def static_flags(statement, code):
+    """Flags that follow from the SQL text and its Java context alone."""
+    flags = []
+    sql = statement["sql"]
+    if _LEADING_WILDCARD.search(sql) or (_LIKE_PARAMETER.search(sql) and _WILDCARD_CONCAT.search(code)):
+        flags.append({"kind": "leading_wildcard", "columns": _LIKE_COLUMN.findall(sql)})
+    if statement["dynamic"]:
+        flags.append({"kind": "string_concatenation"})
+    return flags
+
+# -------------------- Execution --------------------
+
+def connect(dsn):
+    """Open a PostgreSQL connection with psycopg 3, or psycopg2 when only that is installed."""
+    try:
+        import psycopg
+        return psycopg.connect(dsn)
+    except ImportError:
+        import psycopg2
+        return psycopg2.connect(dsn)
+
+def explain(connection, sql, timeout_ms=STATEMENT_TIMEOUT_MS, analyze=True):
+    """Run EXPLAIN (FORMAT JSON), with ANALYZE and BUFFERS when ``analyze``, in a transaction that is always rolled back.
+
+    ANALYZE really executes the statement; callers only ask for it on
+    read-only statements unless ANALYZE_DML is set (see is_read_only).
+    """
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+        cursor.execute(f"EXPLAIN ({options}) {sql}")
+        plan = cursor.fetchone()[0]
+    finally:
+        connection.rollback()
+        cursor.close()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]
+
+def analyze_queries(source_dir, dsn=DEFAULT_DSN, index_path=DEFAULT_INDEX_PATH, reuse_index=False,
+                    timeout_ms=STATEMENT_TIMEOUT_MS, analyze_dml=ANALYZE_DML):
+    """Extract SQL from the indexed sources and, when a database is configured, explain each statement.
+
+    Read-only statements are run under EXPLAIN ANALYZE; the others are only
+    planned unless ``analyze_dml``. Returns one record per statement: file,
+    line, sql, whether it is dynamically built, measured timings and buffer
+    counts (when analyzed), flags, and the error if it could not be explained.
+    """
+    index = load_index(source_dir, index_path, reuse=reuse_index)
+    connection = None
+    if dsn:
+        try:
+            connection = connect(dsn)
+        except Exception as e:
+            print(f"Warning: Could not connect to PostgreSQL, reporting static findings only: {str(e)}")
+    else:
+        print("Warning: DATABASE_URL not set, reporting static findings only.")
+
+    records = []
+    recorder = get_recorder()
+    try:
+        for file_path, record in source_files(index):
+            try:
+                with open(file_path, encoding="utf-8") as f:
+                    code = f.read()
+            except Exception as e:
+                print(f"Warning: Failed to read {file_path}: {str(e)}")
+                continue
+            for statement in extract_sql(code):
+                entry = dict(statement, file=record["path"], measured=False, flags=static_flags(statement, code))
+                if connection is not None:
+                    with recorder.timed("query", f"{record['path']}:{statement['line']}") as event:
+                        try:
+                            analyze = analyze_dml or is_read_only(statement["sql"])
+                            plan = analyze_plan(explain(connection, bind_placeholders(statement["sql"]), timeout_ms, analyze))
+                        except Exception as e:
+                            event["status"] = "error"
+                            entry["error"] = (str(e).strip().splitlines() or [type(e).__name__])[0]
+                        else:
+                            # Plan evidence supersedes the static guess of the same kind.
+                            measured_kinds = {flag["kind"] for flag in plan["flags"]}
+                            static = [flag for flag in entry["flags"] if flag["kind"] not in measured_kinds]
+                            entry.update(plan, flags=plan["flags"] + static)
+                records.append(entry)
+    finally:
+        if connection is not None:
+            connection.close()
+    return records
+
+# -------------------- Reporting --------------------
+
+def _timing(record):
+    return f" ({record['execution_ms']} ms measured)" if record.get("measured") else ""
+
+def query_gaps(records):
+    """Turn flagged statements into gap lines, one per file and finding."""
+    grouped = {}
+    for record in records:
+        for flag in record["flags"]:
+            if flag["kind"] == "seq_scan":
+                continue
+            key = (record["file"], flag["kind"], flag.get("relation"), tuple(flag.get("columns", [])))
+            grouped.setdefault(key, []).append(record)
+    gaps = []
+    for (file, kind, relation, columns), hits in grouped.items():
+        location = format_location(Path(file).name, [hit["line"] for hit in hits])
+        slowest = max(hits, key=lambda hit: hit.get("execution_ms", 0))
+        column_text = ", ".join(columns)
+        if kind == "missing_index":
+            flag = next(f for f in slowest["flags"] if f["kind"] == kind)
+            gaps.append(f"Gap: Query in {location} scans {relation} sequentially and discards {flag['rows_removed']} rows{_timing(slowest)}. "
+                        f"Recommendation: Add an index on {relation}({column_text or '<filter columns>'}).")
+        elif kind == "leading_wildcard":
+            target = f" on {column_text}" if column_text else ""
+            gaps.append(f"Gap: Query in {location} uses a leading-wildcard LIKE{target}, which cannot use a btree index{_timing(slowest)}. "
+                        f"Recommendation: Add a pg_trgm GIN index or switch to prefix or full-text search.")
+        elif kind == "string_concatenation":
+            gaps.append(f"Gap: SQL in {location} is built by string concatenation, risking SQL injection. "
+                        f"Recommendation: Use PreparedStatement parameters.")
+    return gaps
+
+def format_report(records):
+    """Render the statements and their findings as markdown."""
+    measured = sum(1 for r in records if r.get("measured"))
+    planned = sum(1 for r in records if r.get("planned"))
+    lines = ["# Query Analysis", "",
+             f"{len(records)} SQL statement(s) found, {measured} explained against PostgreSQL"
+             + (f", {planned} planned without execution." if planned else "."), ""]
+    if records:
+        lines += ["| File | Line | Execution (ms) | Planning (ms) | Buffers hit/read | Findings |",
+                  "|------|------|----------------|---------------|------------------|----------|"]
+    for r in records:
+        findings = ", ".join(dict.fromkeys(
+            flag["kind"] + (f" ({flag['relation']})" if flag.get("relation") else "") for flag in r["flags"]
+        )) or "none"
+        if r.get("error"):
+            findings += f"; not explained: {r['error']}"
+        timing = (r["execution_ms"], r["planning_ms"], f"{r['shared_hit_blocks']}/{r['shared_read_blocks']}") \
+            if r.get("measured") else ("planned only", "-", "-") if r.get("planned") else ("-", "-", "-")
+        lines.append(f"| {r['file']} | {r['line']} | {timing[0]} | {timing[1]} | {timing[2]} | {findings} |")
+    gaps = query_gaps(records)
+    if gaps:
+        lines += ["", "## Performance Gaps", ""] + [f"- {gap}" for gap in gaps]
+    return "\n".join(lines) + "\n"
+
+def write_report(records, output_path):
+    """Write the markdown report and its query-analysis.jsonl records."""
+    os.makedirs(Path(output_path).parent, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(format_report(records))
+    write_records(records_path(output_path), records)
+    print(f"Query analysis for {len(records)} statement(s) written to {output_path}")
 
 if __name__ == "__main__":
-    print(analyze_queries(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"]))
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", required=True, help="Directory containing Java source files")
+    parser.add_argument("--output", default="reports/query-analysis.md", help="Output markdown file path")
+    parser.add_argument("--dsn", default=DEFAULT_DSN, help="PostgreSQL connection string (default: DATABASE_URL)")
+    parser.add_argument("--timeout-ms", type=int, default=STATEMENT_TIMEOUT_MS, help="Statement timeout per query")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Path of the shared source index")
+    parser.add_argument("--reuse-index", action="store_true", help="Load --index as is instead of rescanning the source tree")
+    parser.add_argument("--analyze-dml", action="store_true", default=ANALYZE_DML,
+                        help="Also execute INSERT/UPDATE/DELETE under EXPLAIN ANALYZE (rolled back, but sequences, triggers and locks are affected)")
+    args = parser.parse_args()
+    records = analyze_queries(args.source, args.dsn, args.index, args.reuse_index, args.timeout_ms, args.analyze_dml)
+    write_report(records, args.output)
+    get_recorder().write()
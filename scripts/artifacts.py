@@ -0,0 +1,155 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+def records_path(markdown_path):
+    """Return the JSON Lines artifact that sits next to a markdown output, e.g. gaps.md -> gaps.jsonl."""
+    return Path(markdown_path).with_suffix(".jsonl")
+
+def iter_records(path):
+    """Yield records from a JSON Lines file one at a time, skipping blank or malformed lines."""
+    path = Path(path)
+    if not path.exists():
+        return
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                print(f"Warning: Skipping malformed record {path}:{number}: {str(e)}")
+
+def write_records(path, records):
+    """Write records as JSON Lines, replacing the file atomically so readers never see a partial artifact."""
+    path = Path(path)
+    os.makedirs(path.parent, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+def append_records(path, records):
+    """Append records to a JSON Lines file, creating it if needed."""
+    path = Path(path)
+    os.makedirs(path.parent, exist_ok=True)
+    count = 0
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+def merge_records(path, updates, removed_keys=(), key="file"):
+    """Replace updated records in place, drop removed ones and append new ones, streaming the old artifact.
+
+    ``updates`` maps record keys to their new records; records whose key is in
+    ``removed_keys`` are dropped. Mirrors incremental.merge_sections for markdown.
+    """
+    updates = dict(updates)
+    pending = dict(updates)
+
+    def merged():
+        for record in iter_records(path):
+            name = record.get(key)
+            if name in removed_keys:
+                continue
+            if name in updates:
+                if name in pending:
+                    yield pending.pop(name)
+                continue
+            yield record
+        yield from pending.values()
+
+    return write_records(path, merged())
+
+def checkpoint_path(markdown_path):
+    """Return the checkpoint that streams a run's records before the final artifact is assembled."""
+    return records_path(markdown_path).with_suffix(".jsonl.partial")
+
+class RecordStream:
+    """Append-only JSON Lines checkpoint of per-file results.
+
+    Each record is written and flushed as soon as its file completes, so a
+    run that dies loses only the files in flight, and only byte offsets are
+    kept in memory. With ``resume``, the records of a previous run are kept
+    (a torn last line is cut off) and ``done`` tells which files can be
+    skipped; otherwise the checkpoint starts empty. Records are read back in
+    any order with ``records``.
+    """
+
+    def __init__(self, path, resume=False, key="file"):
+        self.path = Path(path)
+        self.key = key
+        self.offsets = {}
+        self.hashes = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.path.parent, exist_ok=True)
+        if resume and self.path.exists():
+            self._load()
+        else:
+            open(self.path, "wb").close()
+        self._file = open(self.path, "ab")
+
+    def _load(self):
+        with open(self.path, "rb+") as f:
+            offset = 0
+            for line in iter(f.readline, b""):
+                try:
+                    record = json.loads(line) if line.endswith(b"\n") else None
+                except ValueError:
+                    record = None
+                if not isinstance(record, dict):
+                    print(f"Warning: Truncating checkpoint {self.path} at an incomplete record")
+                    f.truncate(offset)
+                    break
+                self.offsets[record.get(self.key)] = offset
+                self.hashes[record.get(self.key)] = record.get("sha256")
+                offset += len(line)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __contains__(self, name):
+        return name in self.offsets
+
+    def done(self, name, sha256=None):
+        """True if ``name`` is in the checkpoint (with the same content hash, when one is given)."""
+        return name in self.offsets and (sha256 is None or self.hashes[name] == sha256)
+
+    def append(self, record):
+        """Write one record and flush it; a later record for the same key supersedes the earlier one."""
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(line)
+            self._file.flush()
+            self.offsets[record.get(self.key)] = offset
+            self.hashes[record.get(self.key)] = record.get("sha256")
+        return record
+
+    def get(self, name):
+        """Read back the latest record for ``name``, or None."""
+        return next(self.records([name]), None)
+
+    def records(self, names):
+        """Yield the latest record of each name in the given order, skipping names not in the checkpoint."""
+        with self._lock:
+            self._file.flush()
+        with open(self.path, "rb") as f:
+            for name in names:
+                offset = self.offsets.get(name)
+                if offset is not None:
+                    f.seek(offset)
+                    yield json.loads(f.readline())
+
+    def close(self, remove=False):
+        """Close the checkpoint; ``remove`` deletes it once the final artifacts are written."""
+        self._file.close()
+        if remove:
+            self.path.unlink(missing_ok=True)
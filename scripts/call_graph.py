@@ -0,0 +1,494 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+from analyze_queries import extract_sql
+from source_index import DEFAULT_INDEX_PATH, IGNORED_DIRS, load_index, parse_structure, source_files
+
+DEFAULT_GRAPH_PATH = os.environ.get("CALL_GRAPH_PATH", "reports/call-graph.json")
+GRAPH_VERSION = 2
+# Larger diagrams stop rendering legibly; the remaining components are still listed in text.
+MAX_DIAGRAM_NODES = int(os.environ.get("PROCESS_FLOW_MAX_NODES", "60"))
+MAX_FLOWS = 200
+WEB_FILE_SUFFIXES = (".jsp", ".jspx", "web.xml")
+SERVLET_BASES = {"HttpServlet", "GenericServlet"}
+KIND_ORDER = ["jsp", "servlet", "service", "dao", "entity", "class", "table"]
+KIND_LABELS = {
+    "jsp": "JSP views", "servlet": "Servlets", "service": "Services", "dao": "Data access (DAO/JDBC)",
+    "entity": "Domain entities", "class": "Other classes", "table": "Database tables",
+}
+
+# Patterns start with a literal where possible: the regex engine then skips ahead with a fast substring search.
+_COMMENT = re.compile(r"/(?:\*.*?\*/|(?<![:\"]/)/[^\n]*)", re.DOTALL)
+_SUPERTYPES = re.compile(r"class(?<!\wclass)\s+([A-Z]\w*)(?:<[^{]*?>)?\s*(?:extends\s+([\w.<>, ]+?))?\s*(?:implements\s+([\w.<>, ]+?))?\s*\{")
+_WEB_SERVLET = re.compile(r"@WebServlet\s*\(([^)]*)\)")
+_STRING_VALUE = re.compile(r"\"([^\"]*)\"")
+_HTTP_METHOD = re.compile(r"void(?<!\wvoid)\s+do(Get|Post|Put|Delete)\s*\(")
+_DECLARATION = re.compile(r"\b([A-Z]\w*)(?:<[^<>;()=]*>)?(?:\[\])?\s+([a-z_]\w*)\s*(?=[=;,)])")
+_CALL = re.compile(r"\.\s*([a-z]\w*)\s*\(")
+_RECEIVER = re.compile(r"([A-Za-z_]\w*)\s*$")
+_NEW = re.compile(r"new(?<!\wnew)\s+([A-Z]\w*)\s*[(<]")
+_DISPATCH = re.compile(r"(getRequestDispatcher|sendRedirect|include)\s*\(\s*(?:[\w.()]+\s*\+\s*)?\"([^\"]+)\"")
+_JDBC = re.compile(r"\b(?:DriverManager\.getConnection|prepareStatement|createStatement|executeQuery|executeUpdate|DataSource)\b")
+_SQL_TABLE = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE)\s+\"?([A-Za-z_][\w.]*)\"?", re.IGNORECASE)
+
+_FORM = re.compile(r"<form\b([^>]*)>", re.IGNORECASE)
+_ATTRIBUTE = re.compile(r"\b(action|method)\s*=\s*[\"']([^\"']*)[\"']", re.IGNORECASE)
+_LINK = re.compile(r"\bhref\s*=\s*[\"']([^\"'#?]+\.jspx?)", re.IGNORECASE)
+_JSP_PAGE = re.compile(r"<jsp:(forward|include)\b[^>]*\bpage\s*=\s*[\"']([^\"']+)[\"']|<%@\s*include\s+file\s*=\s*[\"']([^\"']+)[\"']", re.IGNORECASE)
+_JSP_IMPORT = re.compile(r"<%@\s*page\b[^>]*\bimport\s*=\s*[\"']([^\"']+)[\"']|<jsp:useBean\b[^>]*\bclass\s*=\s*[\"']([\w.]+)[\"']", re.IGNORECASE)
+_XML_SERVLET = re.compile(r"<servlet>.*?<servlet-name>\s*(.*?)\s*</servlet-name>.*?<servlet-class>\s*(.*?)\s*</servlet-class>.*?</servlet>", re.DOTALL)
+_XML_MAPPING = re.compile(r"<servlet-mapping>.*?<servlet-name>\s*(.*?)\s*</servlet-name>(.*?)</servlet-mapping>", re.DOTALL)
+_XML_URL = re.compile(r"<url-pattern>\s*(.*?)\s*</url-pattern>")
+
+# -------------------- Fact Extraction --------------------
+
+def _simple_name(name):
+    return name.split("<")[0].strip().split(".")[-1]
+
+def java_facts(code, file_name):
+    """Extract the structural facts of one Java file: types, mappings, calls, dispatches and SQL tables.
+
+    Calls are kept as (type, method) pairs, with receivers resolved through
+    the file's own field, local and parameter declarations. Type names stay
+    simple here; build_graph resolves them through the file's package and
+    imports, and drops references to types outside the project.
+    """
+    structure = parse_structure(code)
+    stem = Path(file_name).stem
+    primary = stem if stem in structure["classes"] else (structure["classes"] or [stem])[0]
+    text = _COMMENT.sub(" ", code)
+    supertypes = []
+    for match in _SUPERTYPES.finditer(text):
+        if match.group(1) == primary:
+            supertypes = [_simple_name(name) for group in match.groups()[1:] if group for name in group.split(",")]
+    mappings = []
+    for match in _WEB_SERVLET.finditer(text):
+        mappings += [value for value in _STRING_VALUE.findall(match.group(1)) if value.startswith(("/", "*"))]
+    variables = {name: kind for kind, name in _DECLARATION.findall(text)}
+    calls = set()
+    for match in _CALL.finditer(text):
+        receiver = _RECEIVER.search(text, max(0, match.start() - 80), match.start())
+        if receiver is None:
+            continue
+        receiver, method = receiver.group(1), match.group(1)
+        kind = variables.get(receiver) or (receiver if receiver[:1].isupper() else None)
+        if kind and kind != primary:
+            calls.add((kind, method))
+    tables = {}
+    for statement in extract_sql(code):
+        operation = statement["sql"].split(None, 1)[0].upper()
+        for table in _SQL_TABLE.findall(statement["sql"]):
+            tables.setdefault(table.split(".")[-1].lower(), set()).add(operation)
+    return {
+        "type": "java",
+        "class": primary,
+        "package": structure["package"],
+        "imports": structure["imports"],
+        "supertypes": supertypes,
+        "annotations": structure["annotations"],
+        "mappings": mappings,
+        "http_methods": [method.upper() for method in dict.fromkeys(_HTTP_METHOD.findall(text))],
+        "calls": [list(call) for call in sorted(calls)],
+        "instantiates": sorted(set(_NEW.findall(text)) - {primary}),
+        "dispatches": [[call, target] for call, target in dict.fromkeys(_DISPATCH.findall(code))],
+        "jdbc": bool(_JDBC.search(text)),
+        "tables": {table: sorted(operations) for table, operations in sorted(tables.items())},
+    }
+
+def jsp_facts(code):
+    """Extract form submissions, links, forwards/includes and imported classes from a JSP."""
+    forms = []
+    for match in _FORM.finditer(code):
+        attributes = {name.lower(): value for name, value in _ATTRIBUTE.findall(match.group(1))}
+        forms.append([(attributes.get("method") or "GET").upper(), attributes.get("action", "")])
+    pages = [target for match in _JSP_PAGE.finditer(code) for target in (match.group(2) or match.group(3),)]
+    imports = []
+    for page_import, bean in _JSP_IMPORT.findall(code):
+        imports += [name.strip() for name in (page_import or bean).split(",") if name.strip()]
+    return {
+        "type": "jsp",
+        "forms": forms,
+        "links": sorted(set(_LINK.findall(code))),
+        "pages": pages,
+        "imports": sorted(set(imports)),
+    }
+
+def web_xml_facts(code):
+    """Map servlet classes to their URL patterns from a web.xml deployment descriptor."""
+    classes = dict(_XML_SERVLET.findall(code))
+    mappings = {}
+    for name, body in _XML_MAPPING.findall(code):
+        if name in classes:
+            mappings.setdefault(classes[name].strip(), []).extend(_XML_URL.findall(body))
+    return {"type": "web.xml", "mappings": mappings}
+
+# -------------------- Cache --------------------
+
+def web_files(source_dir):
+    """Yield (relative path, path) for JSPs and web.xml under the source root and, for a src/main/java root, src/main/webapp."""
+    root = Path(source_dir).resolve()
+    roots = [root]
+    if root.parts[-3:] == ("src", "main", "java"):
+        roots.append(root.parent / "webapp")
+    for base in roots:
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames[:] = sorted(d for d in dirnames if d not in IGNORED_DIRS)
+            for name in sorted(filenames):
+                if name.endswith(WEB_FILE_SUFFIXES):
+                    path = Path(dirpath) / name
+                    yield os.path.relpath(path, root).replace(os.sep, "/"), path
+
+def load_cache(graph_path, root):
+    try:
+        with open(graph_path, encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("version") == GRAPH_VERSION and cache.get("root") == root:
+            return cache["files"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return {}
+
+def extract_facts(source_dir, graph_path=DEFAULT_GRAPH_PATH, index_path=DEFAULT_INDEX_PATH, reuse_index=False):
+    """Return {relative path: facts} for the tree, re-parsing only files whose content hash changed.
+
+    Java files come from the shared source index (which already hashes
+    them); JSPs and web.xml are hashed here. The facts are saved to
+    ``graph_path`` for the next run.
+    """
+    index = load_index(source_dir, index_path, reuse=reuse_index)
+    root = index["root"]
+    cached = load_cache(graph_path, root) if graph_path else {}
+    files, parsed = {}, 0
+    entries = [(record["path"], path, record["sha256"]) for path, record in source_files(index, [".java"])]
+    for relative, path in web_files(source_dir):
+        try:
+            with open(path, "rb") as f:
+                entries.append((relative, path, hashlib.sha256(f.read()).hexdigest()))
+        except OSError as e:
+            print(f"Warning: Failed to read {path}: {str(e)}")
+    for relative, path, sha256 in entries:
+        previous = cached.get(relative)
+        if previous and previous["sha256"] == sha256:
+            files[relative] = previous
+            continue
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                code = f.read()
+        except OSError as e:
+            print(f"Warning: Failed to read {path}: {str(e)}")
+            continue
+        if relative.endswith("web.xml"):
+            facts = web_xml_facts(code)
+        elif relative.endswith((".jsp", ".jspx")):
+            facts = jsp_facts(code)
+        else:
+            facts = java_facts(code, relative)
+        files[relative] = {"sha256": sha256, "facts": facts}
+        parsed += 1
+    print(f"Call graph facts for {len(files)} files ({parsed} parsed, {len(files) - parsed} unchanged)")
+    if graph_path:
+        os.makedirs(Path(graph_path).parent, exist_ok=True)
+        tmp_path = Path(graph_path).with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": GRAPH_VERSION, "root": root, "files": files}, f)
+        os.replace(tmp_path, graph_path)
+    return {relative: entry["facts"] for relative, entry in files.items()}
+
+# -------------------- Graph --------------------
+
+def classify(facts):
+    name, bases = facts["class"], set(facts["supertypes"])
+    if bases & SERVLET_BASES or facts["mappings"] or "WebServlet" in facts["annotations"]:
+        return "servlet"
+    if facts["jdbc"] or facts["tables"] or name.endswith(("DAO", "Dao", "Repository")):
+        return "dao"
+    if "Serializable" in bases or {"Entity", "Table"} & set(facts["annotations"]):
+        return "entity"
+    if name.endswith(("Service", "ServiceImpl", "Manager")):
+        return "service"
+    return "class"
+
+def _matches(url, pattern):
+    if pattern.endswith("/*"):
+        return url == pattern[:-2] or url.startswith(pattern[:-1])
+    if pattern.startswith("*."):
+        return url.endswith(pattern[1:])
+    return url == pattern
+
+def _normalize_url(target):
+    """Reduce a form action or redirect target to its path, e.g. '${pageContext.request.contextPath}/search?x=1' -> '/search'."""
+    target = re.sub(r"^.*(?:\}|%>)", "", target).split("?")[0].split("#")[0].strip()
+    if not target or target.startswith(("http:", "https:", "javascript:")):
+        return None
+    return target if target.startswith("/") else "/" + target
+
+def _qualified(facts):
+    return f"{facts['package']}.{facts['class']}" if facts["package"] else facts["class"]
+
+def _class_resolver(nodes):
+    """Return resolve(name, package, imports) -> class node id, following Java's name lookup.
+
+    A simple name resolves to an explicit import, then a class of the same
+    package, then a wildcard import; a name none of these match resolves
+    only if exactly one project class has it. Qualified names must match.
+    """
+    by_simple = {}
+    for node_id, node in nodes.items():
+        if "class" in node:
+            by_simple.setdefault(node["class"], []).append(node_id)
+
+    def resolve(name, package=None, imports=()):
+        if "." in name:
+            return f"class:{name}" if f"class:{name}" in nodes else None
+        for imported in imports:
+            if imported.split(".")[-1] == name:
+                return f"class:{imported}" if f"class:{imported}" in nodes else None
+        candidates = [f"class:{package}.{name}" if package else f"class:{name}"]
+        candidates += [f"class:{imported[:-1]}{name}" for imported in imports if imported.endswith(".*")]
+        for candidate in candidates:
+            if candidate in nodes:
+                return candidate
+        matches = by_simple.get(name, [])
+        return matches[0] if len(matches) == 1 else None
+
+    return resolve
+
+def build_graph(facts_by_file):
+    """Build {"nodes": {id: node}, "edges": [[source, target, label]]} from the extracted facts.
+
+    Nodes are Java classes (by package-qualified name; shown by simple name
+    unless another class shares it), JSPs (by file name) and database
+    tables; edges are form submissions and links, servlet forwards and
+    redirects, resolved method calls and instantiations between project
+    classes, and SQL statements against tables.
+    """
+    nodes, edges = {}, {}
+    mappings, class_ids = {}, {}
+    for relative, facts in facts_by_file.items():
+        if facts["type"] == "java":
+            # The same qualified name in two files (e.g. copies under different source roots) falls back to the path.
+            node_id = f"class:{_qualified(facts)}"
+            class_ids[relative] = node_id = f"class:{relative}" if node_id in nodes else node_id
+            nodes[node_id] = {"name": facts["class"], "class": facts["class"], "kind": classify(facts), "file": relative,
+                              "mappings": list(facts["mappings"]), "http_methods": facts["http_methods"],
+                              "tables": facts["tables"]}
+        elif facts["type"] == "jsp":
+            nodes[f"jsp:{Path(relative).name}"] = {"name": Path(relative).name, "kind": "jsp", "file": relative}
+    names = {}
+    for node_id, node in nodes.items():
+        if node_id.startswith("class:"):
+            names.setdefault(node["name"], []).append(node_id)
+    for same_name in names.values():
+        if len(same_name) > 1:
+            for node_id in same_name:
+                nodes[node_id]["name"] = node_id.split(":", 1)[1]
+    resolve_class = _class_resolver(nodes)
+    for facts in facts_by_file.values():
+        if facts["type"] == "web.xml":
+            for name, patterns in facts["mappings"].items():
+                node_id = resolve_class(name)
+                if node_id:
+                    nodes[node_id]["mappings"] = list(dict.fromkeys(nodes[node_id]["mappings"] + patterns))
+                    nodes[node_id]["kind"] = "servlet"
+    for node_id, node in nodes.items():
+        for pattern in node.get("mappings", []):
+            mappings[pattern] = node_id
+
+    def add_edge(source, target, label):
+        if target and source != target and target in nodes:
+            labels = edges.setdefault((source, target), [])
+            if label and label not in labels:
+                labels.append(label)
+
+    def resolve(target):
+        """Resolve a URL or page to a servlet or JSP node id."""
+        if target.endswith((".jsp", ".jspx")) or ".jsp?" in target:
+            return f"jsp:{Path(target.split('?')[0]).name}"
+        url = _normalize_url(target)
+        if url is None:
+            return None
+        for pattern in sorted(mappings, key=len, reverse=True):
+            if _matches(url, pattern):
+                return mappings[pattern]
+        return None
+
+    for relative, facts in facts_by_file.items():
+        if facts["type"] == "jsp":
+            source = f"jsp:{Path(relative).name}"
+            for method, action in facts["forms"]:
+                target = resolve(action or relative)
+                if target:
+                    add_edge(source, target, f"{method} {_normalize_url(action) or ''}".strip())
+            for link in facts["links"]:
+                add_edge(source, resolve(link), "link")
+            for page in facts["pages"]:
+                add_edge(source, resolve(page), "include")
+            for name in facts["imports"]:
+                if name.endswith(".*"):
+                    continue
+                add_edge(source, resolve_class(name), "uses")
+        elif facts["type"] == "java":
+            source = class_ids[relative]
+            package, imports = facts["package"], facts["imports"]
+            for call, target in facts["dispatches"]:
+                resolved = resolve(target)
+                if resolved:
+                    add_edge(source, resolved, "redirect" if call == "sendRedirect" else "forward" if call == "getRequestDispatcher" else "include")
+            for kind, method in facts["calls"]:
+                add_edge(source, resolve_class(kind, package, imports), f"{method}()")
+            for kind in facts["instantiates"]:
+                add_edge(source, resolve_class(kind, package, imports), "")
+            for table, operations in facts["tables"].items():
+                table_id = f"table:{table}"
+                nodes.setdefault(table_id, {"name": table, "kind": "table"})
+                add_edge(source, table_id, ", ".join(operations))
+    return {"nodes": nodes, "edges": [[source, target, ", ".join(labels)] for (source, target), labels in edges.items()]}
+
+def flow_nodes(graph, max_nodes=MAX_DIAGRAM_NODES):
+    """Pick the nodes of the process flow; returns (node ids, number of nodes on the request paths).
+
+    Paths start at the web entry points (JSPs and servlets; in a tree
+    without them, the classes nobody calls). Entry points with the most
+    outgoing edges come first and each contributes its whole path until
+    ``max_nodes`` is reached, so a large tree shows complete flows for its
+    busiest entry points rather than a row of disconnected ones.
+    """
+    nodes = graph["nodes"]
+    outgoing, incoming = {}, set()
+    for source, target, _ in graph["edges"]:
+        outgoing.setdefault(source, []).append(target)
+        incoming.add(target)
+    entries = [node_id for node_id, node in nodes.items() if node["kind"] in ("jsp", "servlet")]
+    if not entries:
+        entries = [node_id for node_id in nodes if node_id not in incoming and node_id in outgoing]
+    entries.sort(key=lambda node_id: (-len(outgoing.get(node_id, [])), nodes[node_id]["name"]))
+    shown, reachable = [], set()
+    for entry in entries:
+        path, frontier = [], [entry]
+        while frontier:
+            node_id = frontier.pop(0)
+            if node_id in reachable:
+                continue
+            reachable.add(node_id)
+            path.append(node_id)
+            frontier += outgoing.get(node_id, [])
+        if len(shown) + len(path) <= max_nodes:
+            shown += path
+    return shown, len(reachable)
+
+def render_mermaid(graph, max_nodes=MAX_DIAGRAM_NODES):
+    """Render the process flow as a Mermaid flowchart; returns (text, nodes shown, nodes on the request path)."""
+    shown, total = flow_nodes(graph, max_nodes)
+    ids = {node_id: f"n{i}" for i, node_id in enumerate(shown)}
+    shapes = {"jsp": '[/"{}"/]', "servlet": '[["{}"]]', "table": '[("{}")]', "entity": '("{}")', "default": '["{}"]'}
+    lines = ["flowchart LR", "    user((User))"]
+    for node_id in shown:
+        node = graph["nodes"][node_id]
+        shape = shapes.get(node["kind"], shapes["default"])
+        lines.append(f"    {ids[node_id]}{shape.format(node['name'])}")
+    targets = {target for _, target, _ in graph["edges"]}
+    for node_id in shown:
+        node = graph["nodes"][node_id]
+        if node["kind"] == "jsp" and "WEB-INF" not in node["file"] or node["kind"] == "servlet" and node_id not in targets:
+            lines.append(f"    user --> {ids[node_id]}")
+    for source, target, label in graph["edges"]:
+        if source in ids and target in ids:
+            text = label.replace('"', "#quot;")
+            arrow = f' -->|"{text}"| ' if label else " --> "
+            lines.append(f"    {ids[source]}{arrow}{ids[target]}")
+    for kind in ("jsp", "servlet", "dao", "table"):
+        members = [ids[node_id] for node_id in shown if graph["nodes"][node_id]["kind"] == kind]
+        if members:
+            lines.append(f"    class {','.join(members)} {kind}")
+    lines += ["    classDef jsp fill:#e3f2fd,stroke:#1e88e5", "    classDef servlet fill:#fff3e0,stroke:#fb8c00",
+              "    classDef dao fill:#ede7f6,stroke:#5e35b1", "    classDef table fill:#e8f5e9,stroke:#43a047"]
+    return "\n".join(lines), len(shown), total
+
+def request_flows(graph):
+    """Describe each servlet as text: URLs and methods, the classes it calls, tables reached and views it forwards to."""
+    nodes, outgoing = graph["nodes"], {}
+    for source, target, label in graph["edges"]:
+        outgoing.setdefault(source, []).append((target, label))
+    flows = []
+    for node_id, node in sorted(nodes.items(), key=lambda item: item[1]["name"]):
+        if node["kind"] != "servlet":
+            continue
+        urls = ", ".join(f"`{pattern}`" for pattern in node["mappings"]) or "(no mapping found)"
+        methods = "/".join(node["http_methods"]) or "any method"
+        steps = []
+        for target, label in outgoing.get(node_id, []):
+            target_node = nodes[target]
+            if target_node["kind"] == "jsp" or label in ("forward", "redirect", "include"):
+                steps.append(f"{label.replace(', ', '/') or 'uses'} to {target_node['name']}")
+            elif target_node["kind"] == "table":
+                steps.append(f"queries {target_node['name']} ({label})")
+            else:
+                tables = [f"{table} ({', '.join(ops)})" for table, ops in target_node.get("tables", {}).items()]
+                steps.append(f"calls {target_node['name']}" + (f" {label}" if label else "")
+                             + (f" -> {', '.join(tables)}" if tables else ""))
+        flows.append(f"- {urls} ({methods}) -> {node['name']}" + (": " + "; ".join(steps) if steps else ""))
+    return flows
+
+def component_lines(graph, limit=10):
+    """Markdown bullets listing the components of the graph by kind, for the inventory."""
+    lines = []
+    by_kind = {}
+    for node in graph["nodes"].values():
+        by_kind.setdefault(node["kind"], []).append(node)
+    for kind in KIND_ORDER:
+        members = sorted(by_kind.get(kind, []), key=lambda node: node["name"])
+        if not members:
+            continue
+        described = []
+        for node in members[:limit]:
+            extra = node.get("mappings") or list(node.get("tables", {}))
+            described.append(f"{node['name']} ({', '.join(extra)})" if extra else node["name"])
+        more = f" and {len(members) - limit} more" if len(members) > limit else ""
+        lines.append(f"- {KIND_LABELS[kind]}: {', '.join(described)}{more}")
+    return lines
+
+def format_process_flow(graph, max_nodes=MAX_DIAGRAM_NODES):
+    diagram, shown, total = render_mermaid(graph, max_nodes)
+    java_files = sum(1 for node in graph["nodes"].values() if node["kind"] not in ("jsp", "table"))
+    lines = ["# Process Flow", "",
+             f"_Generated by static analysis of {java_files} classes and "
+             f"{sum(1 for node in graph['nodes'].values() if node['kind'] == 'jsp')} JSPs (scripts/call_graph.py); no model involved._",
+             "", "```mermaid", diagram, "```", ""]
+    if total > shown:
+        lines += [f"_Showing {shown} of the {total} components on the request path; the rest are listed below._", ""]
+    flows = request_flows(graph)
+    if flows:
+        lines += ["## Request Flows", ""] + flows[:MAX_FLOWS]
+        if len(flows) > MAX_FLOWS:
+            lines.append(f"- ... and {len(flows) - MAX_FLOWS} more servlets")
+        lines.append("")
+    lines += ["## Components", ""] + (component_lines(graph) or ["- No components found"])
+    return "\n".join(lines) + "\n"
+
+def generate_process_flow(source_dir, output_path, graph_path=DEFAULT_GRAPH_PATH, index_path=DEFAULT_INDEX_PATH,
+                          reuse_index=False, max_nodes=MAX_DIAGRAM_NODES):
+    """Extract the call graph of source_dir and write the process-flow markdown; returns the graph."""
+    graph = build_graph(extract_facts(source_dir, graph_path, index_path, reuse_index))
+    os.makedirs(Path(output_path).parent, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(format_process_flow(graph, max_nodes))
+    print(f"Process flow written to {output_path} ({len(graph['nodes'])} components, {len(graph['edges'])} edges)")
+    return graph
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a static call graph of the sources and write a Mermaid process flow")
+    parser.add_argument("--source", required=True, help="Project or Java source directory (JSPs and web.xml are found under it or in src/main/webapp)")
+    parser.add_argument("--output", default="docs/processFlow.md", help="Output markdown file path")
+    parser.add_argument("--graph", default=DEFAULT_GRAPH_PATH, help="Where the per-file facts are cached by content hash")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Path of the shared source index")
+    parser.add_argument("--reuse-index", action="store_true", help="Load --index as is instead of rescanning the source tree")
+    parser.add_argument("--max-nodes", type=int, default=MAX_DIAGRAM_NODES, help="Largest number of components drawn in the diagram")
+    args = parser.parse_args()
+    generate_process_flow(args.source, args.output, args.graph, args.index, args.reuse_index, args.max_nodes)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import json
+import xml.etree.ElementTree as ET
+from collections import Counter
+from pathlib import Path
+
+SOURCE_MARKERS = ("src/main/java/", "src/test/java/", "src/")
+
+def short_file_name(name):
+    """Trim a Checkstyle file path to the part below the source root, e.g. 'com/example/Dao.java'."""
+    posix = name.replace("\\", "/")
+    for marker in SOURCE_MARKERS:
+        if marker in posix:
+            return posix.split(marker, 1)[1]
+    return posix
+
+def rule_name(source):
+    """Turn a check class such as '...checks.sizes.LineLengthCheck' into 'LineLength'."""
+    name = (source or "unknown").rsplit(".", 1)[-1]
+    return name[:-5] if name.endswith("Check") and len(name) > 5 else name
+
+def read_checkstyle_report(report_path):
+    """Stream a Checkstyle XML report and aggregate violations per file.
+
+    Elements are discarded as soon as they are counted, so memory stays flat
+    no matter how large the report is. Returns one entry per file with
+    violations, most violations first:
+    {"file", "path", "total", "severity": {severity: n}, "rules": {rule: n}}.
+    """
+    files = []
+    current = None
+    root = None
+    for event, elem in ET.iterparse(report_path, events=("start", "end")):
+        if root is None:
+            root = elem
+        if event == "start":
+            if elem.tag == "file":
+                current = {"path": elem.get("name", ""), "severity": Counter(), "rules": Counter()}
+            continue
+        if elem.tag == "error" and current is not None:
+            current["severity"][elem.get("severity", "error")] += 1
+            current["rules"][rule_name(elem.get("source"))] += 1
+        elif elem.tag == "file" and current is not None:
+            total = sum(current["severity"].values())
+            if total:
+                files.append({
+                    "file": short_file_name(current["path"]),
+                    "path": current["path"],
+                    "total": total,
+                    "severity": dict(current["severity"]),
+                    "rules": dict(current["rules"].most_common()),
+                })
+            current = None
+            root.clear()
+        elem.clear()
+    files.sort(key=lambda entry: (-entry["total"], entry["file"]))
+    return files
+
+def format_file_summary(entry, top_rules=3):
+    """Render one aggregated file entry as a single compact line for prompts."""
+    severities = ", ".join(f"{name}: {count}" for name, count in sorted(entry["severity"].items()))
+    rules = ", ".join(f"{name} x{count}" for name, count in list(entry["rules"].items())[:top_rules])
+    return f"File: {entry['file']}, Violations: {entry['total']} ({severities}), Top rules: {rules}"
+
+def totals(entries):
+    """Aggregate per-file entries into report-wide counts by severity and rule."""
+    severity, rules = Counter(), Counter()
+    for entry in entries:
+        severity.update(entry["severity"])
+        rules.update(entry["rules"])
+    return {"files": len(entries), "severity": dict(severity), "rules": dict(rules.most_common())}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("report", type=Path, help="Checkstyle XML report")
+    args = parser.parse_args()
+    entries = read_checkstyle_report(args.report)
+    print(json.dumps({"totals": totals(entries), "files": entries}, indent=2))
@@ -0,0 +1,136 @@
+import bisect
+import math
+import os
+import re
+
+# Input budget per model request, in tokens. Leaves room for the prompt template and the completion.
+DEFAULT_CHUNK_TOKENS = int(os.environ.get("LLM_CHUNK_TOKENS", "6000"))
+CHARS_PER_TOKEN = 4
+
+_encoder = None
+
+def count_tokens(text):
+    """Count tokens with tiktoken when installed, otherwise estimate from the character count."""
+    global _encoder
+    if not text:
+        return 0
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoder = False
+    if _encoder:
+        return len(_encoder.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+_STRIP_LITERALS = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|//.*$')
+
+def _brace_delta(line):
+    code = _STRIP_LITERALS.sub("", line)
+    return code.count("{") - code.count("}")
+
+def _segments(lines):
+    """Split source lines into segments ending at class or member boundaries (brace depth 0 or 1)."""
+    segments, start, depth = [], 0, 0
+    for i, line in enumerate(lines):
+        before = depth
+        depth = max(0, depth + _brace_delta(line))
+        closed_member = before > depth and depth <= 1
+        blank_at_top = not line.strip() and depth <= 1
+        if closed_member or blank_at_top:
+            segments.append(lines[start:i + 1])
+            start = i + 1
+    if start < len(lines):
+        segments.append(lines[start:])
+    return ["".join(segment) for segment in segments if "".join(segment).strip()]
+
+def _hard_split(text, max_tokens):
+    """Split text on line boundaries (or characters, for a single huge line) to fit max_tokens."""
+    parts, current, current_tokens = [], "", 0
+    for line in text.splitlines(keepends=True):
+        while count_tokens(line) > max_tokens:
+            cut = max_tokens * CHARS_PER_TOKEN
+            if current:
+                parts.append(current)
+                current, current_tokens = "", 0
+            parts.append(line[:cut])
+            line = line[cut:]
+        line_tokens = count_tokens(line)
+        if current and current_tokens + line_tokens > max_tokens:
+            parts.append(current)
+            current, current_tokens = "", 0
+        current += line
+        current_tokens += line_tokens
+    if current:
+        parts.append(current)
+    return parts
+
+def split_source(text, max_tokens=DEFAULT_CHUNK_TOKENS):
+    """Split source code into parts of at most max_tokens, cutting on class/method boundaries.
+
+    Consecutive members are packed together, so the number of parts is as small as
+    the budget allows; no content is dropped.
+    """
+    if count_tokens(text) <= max_tokens:
+        return [text]
+    parts, current, current_tokens = [], "", 0
+    for segment in _segments(text.splitlines(keepends=True)):
+        segment_tokens = count_tokens(segment)
+        if segment_tokens > max_tokens:
+            if current:
+                parts.append(current)
+                current, current_tokens = "", 0
+            parts.extend(_hard_split(segment, max_tokens))
+        elif current and current_tokens + segment_tokens > max_tokens:
+            parts.append(current)
+            current, current_tokens = segment, segment_tokens
+        else:
+            current += segment
+            current_tokens += segment_tokens
+    if current:
+        parts.append(current)
+    return parts
+
+def split_text(text, max_tokens=DEFAULT_CHUNK_TOKENS):
+    """Split plain text on line boundaries into parts of at most max_tokens."""
+    if count_tokens(text) <= max_tokens:
+        return [text]
+    return _hard_split(text, max_tokens)
+
+def pack_files(files, max_tokens=DEFAULT_CHUNK_TOKENS):
+    """Pack (name, code) pairs into request-sized chunks.
+
+    Large files are split with split_source; pieces are then placed best-fit
+    in decreasing size order so small files share requests. Each chunk is a
+    list of (label, code) pairs in original file order, where label is the
+    file name with a "part i/n" suffix for split files.
+    """
+    pieces = []
+    for index, (name, code) in enumerate(files):
+        parts = split_source(code, max_tokens)
+        for part_no, part in enumerate(parts, start=1):
+            label = name if len(parts) == 1 else f"{name} (part {part_no}/{len(parts)})"
+            pieces.append((index, part_no, label, part, count_tokens(part) + count_tokens(label) + 8))
+
+    # Open bins sorted by remaining room, so the tightest fitting bin is found by bisection.
+    bins, open_bins = [], []
+    for piece in sorted(pieces, key=lambda p: -p[4]):
+        size = piece[4]
+        pos = bisect.bisect_left(open_bins, (size, -1))
+        if pos < len(open_bins):
+            room, bin_index = open_bins.pop(pos)
+        else:
+            room, bin_index = max_tokens, len(bins)
+            bins.append([])
+        bins[bin_index].append(piece)
+        if room - size > 0:
+            bisect.insort(open_bins, (room - size, bin_index))
+
+    chunks = [sorted(pieces_in_bin, key=lambda p: (p[0], p[1])) for pieces_in_bin in bins]
+    chunks.sort(key=lambda chunk: (chunk[0][0], chunk[0][1]))
+    return [[(label, part) for _, _, label, part, _ in chunk] for chunk in chunks]
+
+def format_chunk(chunk):
+    """Render a packed chunk as one prompt body with a file header per piece."""
+    return "\n\n".join(f"// File: {label}\n{code}" for label, code in chunk)
@@ -2,9 +2,19 @@ import argparse
 import os
 import time
 import logging
-import openai
 
-from openai import AzureOpenAI
+from concurrent.futures import ThreadPoolExecutor
+from llm_cache import cache_key, content_hash, get_cache
+from artifacts import RecordStream, checkpoint_path, iter_records, merge_records, records_path, write_records
+from incremental import changed_files, merge_sections, read_sections, resolve_since
+from source_index import DEFAULT_INDEX_PATH, load_index, source_files
+from rule_engine import get_engine
+from run_metrics import get_recorder, in_context
+from chunking import DEFAULT_CHUNK_TOKENS, count_tokens, pack_files, split_source
+from llm_settings import model_settings
+from llm_client import ModelError, complete, get_backend
+from parallel_scan import DEFAULT_PROCESSES, scan_files
+from similarity import DEDUP_ENABLED, DEFAULT_THRESHOLD, cluster_sources, fan_out
 
 from pathlib import Path
 
@@ -18,9 +28,26 @@ logging.basicConfig(
     ]
 )
 logger = logging.getLogger(__name__)
-endpoint = os.environ.get("AZURE_OPENAI_ENDPOINT")
-api_key = os.environ.get("AZURE_OPENAI_KEY")
-deployment = os.environ.get("AZURE_OPENAI_DEPLOYMENT")
+backend, deployment = model_settings()
+
+SYSTEM_PROMPT = "You are a software architect who summarizes Java code."
+SUMMARY_PROMPT_TEMPLATE = (
+    "You are a software architect. Summarize the following Java code in plain English, "
+    "highlighting its purpose and any architectural or security concerns:\n\n"
+    "{code}"
+)
+MERGE_PROMPT_TEMPLATE = (
+    "You are a software architect. The following summaries each describe consecutive parts of the same "
+    "Java file. Combine them into one plain-English summary of the whole file, highlighting its purpose "
+    "and any architectural or security concerns:\n\n"
+    "{summaries}"
+)
+TEMPERATURE = 0.3
+MAX_TOKENS = 512
+# The prompts and fallback describe Java; other languages in the shared index are left out.
+SUMMARY_EXTENSIONS = [".java"]
+
+DEFAULT_WORKERS = int(os.environ.get("SUMMARY_WORKERS", "4"))
 
 def read_java_file(file_path):
     """Read content of a Java file."""
@@ -34,136 +61,347 @@ def read_java_file(file_path):
         logger.error(f"Failed to read {file_path}: {str(e)}")
         return ""
 
-def truncate_text(text, max_chars=8000):
-    """Truncate text to fit model context limit."""
-    if len(text) <= max_chars:
-        return text
-    logger.warning(f"Truncating input text to {max_chars} characters")
-    return text[:max_chars] + "... [truncated]"
+def request_completion(prompt, file_name, usage=None):
+    """Send one summary prompt through the shared model client (see llm_client.py); return the text or None on failure."""
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    try:
+        return complete(messages, file_name, MAX_TOKENS, TEMPERATURE, usage)
+    except ModelError as e:
+        logger.error(f"Model backend {get_backend().name!r} failed for {file_name}: {str(e)}")
+        return None
+
+def summarize_in_parts(code, file_name, max_tokens=DEFAULT_CHUNK_TOKENS, usage=None):
+    """Summarize a file too large for one request by splitting it on class/method boundaries.
+
+    Each part is summarized separately and the partial summaries are merged,
+    in budget-sized groups, until a single summary remains.
+    """
+    parts = split_source(code, max_tokens)
+    logger.info(f"{file_name} exceeds {max_tokens} tokens, summarizing {len(parts)} parts")
+    partials = []
+    for i, part in enumerate(parts, start=1):
+        partial = request_completion(SUMMARY_PROMPT_TEMPLATE.format(code=part), f"{file_name} (part {i}/{len(parts)})",
+                                     usage)
+        if partial is None:
+            return None
+        partials.append(partial)
+    while len(partials) > 1:
+        groups = pack_files([(f"Part {i}", text) for i, text in enumerate(partials, start=1)], max_tokens)
+        if len(groups) >= len(partials):
+            return "\n\n".join(partials)
+        merged = []
+        for group in groups:
+            text = "\n\n".join(f"{label}: {summary}" for label, summary in group)
+            summary = request_completion(MERGE_PROMPT_TEMPLATE.format(summaries=text), file_name, usage)
+            if summary is None:
+                return None
+            merged.append(summary)
+        partials = merged
+    return partials[0]
+
+def generate_summary(code, file_name, usage=None, rules=None):
+    """Generate a summary for a Java file using the configured model backend; return (summary, source).
 
-def generate_summary(code, file_name):
-    """Generate a summary for a Java file using Azure OpenAI."""
+    ``source`` is "model", or "fallback" when the rule-based summary was used.
+    Token counts of the requests made are added to ``usage`` when it is given;
+    ``rules`` are rule ids already found in the code, reused by the fallback.
+    """
     if not code:
         logger.warning(f"No content for {file_name}, using fallback")
-        return generate_fallback_summary(code, file_name)
-
-    if not endpoint or not api_key or not deployment:
-        logger.warning("Azure OpenAI credentials not set, using fallback")
-        return generate_fallback_summary(code, file_name)
-
-    openai.api_type = "azure"
-    openai.api_base = endpoint
-    openai.api_version = "2024-12-01-preview"
-    openai.api_key = api_key
-
-    prompt = (
-        "You are a software architect. Summarize the following Java code in plain English, "
-        "highlighting its purpose and any architectural or security concerns:\n\n"
-        f"{truncate_text(code)}"
-    )
-
-    client = AzureOpenAI(
-        api_key=api_key,
-        azure_endpoint=endpoint,
-        api_version="2024-12-01-preview"
-    )
-
-    for attempt in range(3):
-        try:
-            response = client.chat.completions.create(
-                model=deployment,
-                messages=[
-                    {"role": "system", "content": "You are a software architect who summarizes Java code."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=512
-            )
-            summary = response.choices[0].message.content.strip()
-            logger.info(f"Generated summary for {file_name}: {summary[:50]}...")
-            return summary
-        except Exception as e:
-            logger.error(f"Azure OpenAI error for {file_name} (attempt {attempt + 1}): {str(e)}")
-            time.sleep(2 ** attempt)
-
-    logger.warning(f"Azure OpenAI failed for {file_name}, using fallback")
-    return generate_fallback_summary(code, file_name)
-
-def generate_fallback_summary(code, file_name):
+        return generate_fallback_summary(code, file_name, rules), "fallback"
+
+    if backend is None:
+        logger.warning("No model configured, using fallback")
+        return generate_fallback_summary(code, file_name, rules), "fallback"
+
+    cache = get_cache()
+    key = cache_key(code, SYSTEM_PROMPT + SUMMARY_PROMPT_TEMPLATE + MERGE_PROMPT_TEMPLATE, deployment, TEMPERATURE,
+                    max_tokens=MAX_TOKENS, chunk_tokens=DEFAULT_CHUNK_TOKENS)
+    cached = cache.get(key)
+    if cached is not None:
+        logger.info(f"Cache hit for {file_name}")
+        get_recorder().record("model_call", file_name, cache_hit=True)
+        return cached, "model"
+
+    if count_tokens(code) <= DEFAULT_CHUNK_TOKENS:
+        summary = request_completion(SUMMARY_PROMPT_TEMPLATE.format(code=code), file_name, usage)
+    else:
+        summary = summarize_in_parts(code, file_name, usage=usage)
+    if summary is not None:
+        logger.info(f"Generated summary for {file_name}: {summary[:50]}...")
+        cache.put(key, summary, file=file_name)
+        return summary, "model"
+
+    logger.warning(f"Model backend {get_backend().name!r} failed for {file_name}, using fallback")
+    return generate_fallback_summary(code, file_name, rules), "fallback"
+
+def generate_fallback_summary(code, file_name, rules=None):
     """Generate a basic summary using rule-based logic."""
-    summary = f"{file_name} is a Java class."
     if not code:
-        summary += " No code content available, possibly due to file read error."
-        return summary
-
-    if "javax.servlet" in code or "jakarta.servlet" in code:
-        summary += " It implements a servlet to handle HTTP requests and responses, indicating a legacy web architecture. Migrate to Spring Boot REST APIs for modern scalability."
-    if "java.sql" in code:
-        summary += " It uses raw JDBC for database operations, which is error-prone. Adopt Spring Data JPA with Neon for modern ORM."
-    if "HttpSession" in code:
-        summary += " It relies on HttpSession for state management, which can complicate scaling. Use stateless JWT or Spring Session."
-    if "System.out.println" in code or "log4j" in code:
-        summary += " It uses outdated logging (e.g., System.out or Log4j). Switch to SLF4J with Logback for better logging."
-    if "password" in code.lower() or "credential" in code.lower():
-        summary += " It may contain hardcoded credentials, posing a security risk. Use environment variables with Spring Security."
-    if "implements Serializable" in code:
-        summary += " It defines a serializable entity, likely a data model. Consider using Lombok to reduce boilerplate."
+        return f"{file_name} is a Java class. No code content available, possibly due to file read error."
 
+    engine = get_engine()
+    summary = rule_summary(file_name, engine.scan(code, target="code") if rules is None else rules)
     logger.info(f"Generated fallback summary for {file_name}: {summary[:50]}...")
     return summary
 
-def generate_summaries(source_dir, output_path):
-    """Generate summaries for all Java files in source_dir."""
-    logger.info(f"Processing source directory: {source_dir}")
-    source_path = Path(source_dir)
-    if not source_path.exists():
-        logger.error(f"Source directory {source_dir} does not exist")
-        raise FileNotFoundError(f"Source directory {source_dir} does not exist")
+def rule_summary(file_name, rules):
+    """Describe a file by the catalog summaries of the rules found in it."""
+    engine = get_engine()
+    texts = [engine.rule(rule_id).get("summary") for rule_id in rules]
+    return " ".join([f"{file_name} is a Java class."] + [text for text in texts if text])
 
-    summaries = []
-    java_files = list(source_path.rglob("*.java"))
-    if not java_files:
-        logger.warning(f"No Java files found in {source_dir}")
+def summarize_file(file_path, source_path, sha256=None):
+    """Read and summarize a single Java file, returning its summary entry.
 
-    for file_path in java_files:
-        relative_path = file_path.relative_to(source_path.parent)
-        logger.info(f"Processing file: {relative_path}")
+    Besides the file and summary, the entry carries the content hash (``sha256``
+    from the source index when given), whether the summary came from the model
+    or the rule-based fallback (``source``), the legacy-pattern rules found in
+    the code, token usage and elapsed time; it is written as one record of the
+    codebert-summary.jsonl artifact.
+    """
+    relative_path = file_path.relative_to(source_path.parent)
+    logger.info(f"Processing file: {relative_path}")
+    start = time.perf_counter()
+    usage = {"prompt_tokens": 0, "completion_tokens": 0}
+    with get_recorder().timed("file", str(relative_path)) as event:
         code = read_java_file(file_path)
         if not code:
-            summaries.append({
-                "file": str(relative_path),
-                "summary": f"{relative_path} could not be read, possibly due to file access issues."
-            })
-            continue
-        summary = generate_summary(code, str(relative_path))
-        summaries.append({"file": str(relative_path), "summary": summary})
-
-    if not summaries:
-        logger.warning("No summaries generated, adding default")
-        summaries.append({
-            "file": "N/A",
-            "summary": "No Java files found or processed successfully in the source directory. Ensure the directory contains valid Java files and Azure OpenAI credentials are set."
+            event["status"] = "unreadable"
+            summary, source, rules = f"{relative_path} could not be read, possibly due to file access issues.", "fallback", []
+        else:
+            rules = list(get_engine().scan(code, target="code"))
+            summary, source = generate_summary(code, str(relative_path), usage, rules)
+        event.update(usage)
+    return {
+        "file": str(relative_path),
+        "sha256": sha256 or content_hash(code),
+        "summary": summary,
+        "source": source,
+        "rules": rules,
+        "prompt_tokens": usage["prompt_tokens"],
+        "completion_tokens": usage["completion_tokens"],
+        "elapsed": round(time.perf_counter() - start, 4),
+    }
+
+def summarize_fallback(java_files, hashes, source_path, processes=DEFAULT_PROCESSES):
+    """Summarize files from the rule catalog alone, scanning them across ``processes`` processes.
+
+    Used when no model is configured; see parallel_scan.py for chunking,
+    memory-mapped reads of large files and the ordered merge. ``hashes``
+    maps each path to its content hash from the source index.
+    """
+    recorder = get_recorder()
+    entries = []
+    for path, hits, status, elapsed in scan_files(java_files, processes=processes):
+        relative_path = str(path.relative_to(source_path.parent))
+        if status == "ok":
+            summary, rules = rule_summary(relative_path, hits), list(hits)
+        else:
+            status = "unreadable"
+            summary, rules = f"{relative_path} could not be read, possibly due to file access issues.", []
+        recorder.record("file", relative_path, elapsed, status=status)
+        entries.append({
+            "file": relative_path,
+            "sha256": hashes[path],
+            "summary": summary,
+            "source": "fallback",
+            "rules": rules,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "elapsed": elapsed,
         })
+    return entries
 
+def find_near_duplicates(java_files, threshold=DEFAULT_THRESHOLD):
+    """Return {path: (representative path, similarity)} for files that are near-duplicates of an earlier file."""
+    sources = ((path, read_java_file(path)) for path in java_files)
+    return cluster_sources(((path, code) for path, code in sources if code), threshold)
+
+def fan_out_summary(file_path, source_path, representative, similarity, entry, sha256=None):
+    """Build the summary entry of a near-duplicate from its representative's entry without a model call."""
+    relative_path = file_path.relative_to(source_path.parent)
+    start = time.perf_counter()
+    with get_recorder().timed("file", str(relative_path)) as event:
+        code = read_java_file(file_path)
+        rules = list(get_engine().scan(code, target="code"))
+        summary = fan_out(entry["summary"], entry["file"], str(relative_path),
+                          read_java_file(representative), code, similarity)
+        event["status"] = "duplicate"
+    return {
+        "file": str(relative_path),
+        "sha256": sha256 or content_hash(code),
+        "summary": summary,
+        "source": entry["source"],
+        "rules": rules,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "elapsed": round(time.perf_counter() - start, 4),
+        "duplicate_of": entry["file"],
+        "similarity": round(similarity, 3),
+    }
+
+def format_entry(entry):
+    """Render one summary entry as a markdown section."""
+    return f"File: {entry['file']}\nSummary: {entry['summary']}\n\n"
+
+def write_summaries(output_path, blocks):
+    """Write the summary markdown from formatted entry blocks, consumed one at a time."""
     output_path = Path(output_path)
     logger.info(f"Writing summaries to: {output_path}")
     os.makedirs(output_path.parent, exist_ok=True)
     try:
         with open(output_path, "w", encoding="utf-8") as f:
             f.write("# Java Code Summaries\n\n")
-            for entry in summaries:
-                f.write(f"File: {entry['file']}\n")
-                f.write(f"Summary: {entry['summary']}\n\n")
+            for block in blocks:
+                f.write(block)
         logger.info(f"Successfully wrote summaries to {output_path}")
     except Exception as e:
         logger.error(f"Failed to write to {output_path}: {str(e)}")
         raise
 
+def generate_summaries(source_dir, output_path, workers=DEFAULT_WORKERS, since=None,
+                       index_path=DEFAULT_INDEX_PATH, reuse_index=False, dedupe=DEDUP_ENABLED,
+                       processes=DEFAULT_PROCESSES, resume=False):
+    """Generate summaries for all Java files in source_dir.
+
+    Files are summarized by up to ``workers`` threads. Each summary is streamed
+    to a checkpoint (codebert-summary.jsonl.partial) as it completes, and the
+    outputs are assembled from it in the original file order at the end; with
+    ``resume``, files already in the checkpoint with unchanged content are
+    skipped, except those that got the rule-based fallback while a model is
+    configured (e.g. during an endpoint outage), which are retried. With ``since``, only
+    files changed since that git revision are summarized and merged into the
+    existing output. Files come from the shared source index (see source_index.py).
+    A codebert-summary.jsonl artifact with one record per file is written next
+    to the markdown. With ``dedupe`` and a model configured, near-duplicate
+    files (see similarity.py) are not sent to the model: each reuses its
+    cluster representative's summary with a note on how it differs, unless
+    the representative has no model summary (its call failed), in which case
+    the duplicate is summarized on its own. Without a
+    model, files are summarized from the rule catalog by up to ``processes``
+    processes. Returns the summary entries generated in this run (read back
+    lazily from the JSONL artifact after a full run).
+    """
+    logger.info(f"Processing source directory: {source_dir}")
+    source_path = Path(source_dir)
+    if not source_path.exists():
+        logger.error(f"Source directory {source_dir} does not exist")
+        raise FileNotFoundError(f"Source directory {source_dir} does not exist")
+
+    source_path = source_path.resolve()
+    index = load_index(source_path, index_path, reuse=reuse_index)
+    hashes = {path: record["sha256"] for path, record in source_files(index, SUMMARY_EXTENSIONS)}
+    java_files = list(hashes)
+    if not java_files:
+        logger.warning(f"No source files found in {source_dir}")
+
+    changes = None
+    since = resolve_since(since)
+    if since and Path(output_path).exists():
+        changes = changed_files(since, source_path)
+    if changes is not None:
+        changed, deleted = changes
+        java_files = [p for p in java_files if p.resolve() in changed]
+
+    keys = {path: str(path.relative_to(source_path.parent)) for path in java_files}
+    stream = RecordStream(checkpoint_path(output_path), resume=resume)
+
+    def resumable(path):
+        if not stream.done(keys[path], hashes[path]):
+            return False
+        # A fallback summary only stands in for the model's; retry it once a model is configured.
+        return backend is None or stream.get(keys[path]).get("source") == "model"
+
+    pending = [path for path in java_files if not resumable(path)]
+    if len(pending) < len(java_files):
+        logger.info(f"Resuming: {len(java_files) - len(pending)} file(s) already summarized in {stream.path}")
+
+    if backend is None:
+        logger.warning("No model configured (Azure OpenAI settings, or LLM_BACKEND=local with LOCAL_MODEL), using fallback")
+        logger.info(f"Summarizing {len(pending)} files with up to {processes} process(es)")
+        for entry in summarize_fallback(pending, hashes, source_path, processes):
+            stream.append(entry)
+    else:
+        duplicates = {}
+        if dedupe and pending and len(java_files) > 1:
+            # Cluster the whole file set so a resumed run picks the same representatives.
+            duplicates = find_near_duplicates(java_files)
+            logger.info(f"Found {len(duplicates)} near-duplicate file(s) among {len(java_files)}")
+        representatives = [path for path in pending if path not in duplicates]
+
+        workers = max(1, workers)
+
+        def summarize_all(paths):
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # Workers checkpoint each summary as soon as it completes.
+                for _ in executor.map(in_context(lambda path: stream.append(summarize_file(path, source_path, hashes[path]))),
+                                      paths):
+                    pass
+
+        logger.info(f"Summarizing {len(representatives)} files with {workers} worker(s)")
+        summarize_all(representatives)
+        orphans = []
+        for path in pending:
+            if path not in duplicates:
+                continue
+            representative, similarity = duplicates[path]
+            entry = stream.get(keys[representative])
+            if entry is None or entry.get("source") != "model":
+                orphans.append(path)
+                continue
+            stream.append(fan_out_summary(path, source_path, representative, similarity, entry, hashes[path]))
+        if orphans:
+            logger.warning(f"Summarizing {len(orphans)} near-duplicate file(s) individually because their representative has no model summary")
+            summarize_all(orphans)
+
+    order = [keys[path] for path in java_files]
+    if changes is not None:
+        base = source_path.parent
+        removed = {str(p.relative_to(base)) for p in deleted if p.is_relative_to(base)}
+        _, existing = read_sections(output_path, "File: ")
+        existing.pop("N/A", None)
+        summaries = list(stream.records(order))
+        updates = {entry["file"]: format_entry(entry) for entry in summaries}
+        write_summaries(output_path, merge_sections(existing, updates, removed).values())
+        merge_records(records_path(output_path), {entry["file"]: entry for entry in summaries}, removed)
+        logger.info(f"Merged {len(updates)} updated and {len(removed)} removed summaries into {output_path}")
+    else:
+        if not order:
+            logger.warning("No summaries generated, adding default")
+            stream.append({
+                "file": "N/A",
+                "summary": "No Java files found or processed successfully in the source directory. Ensure the directory contains valid Java files and a model is configured."
+            })
+            order = ["N/A"]
+        write_summaries(output_path, (format_entry(entry) for entry in stream.records(order)))
+        write_records(records_path(output_path), stream.records(order))
+        summaries = iter_records(records_path(output_path))
+    stream.close(remove=True)
+    get_cache().report(logger.info)
+    get_engine().report(logger.info)
+    return summaries
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("source_dir", help="Directory containing Java source files")
     parser.add_argument("--output", required=True, help="Output path for summary markdown file")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Number of files summarized concurrently (default: SUMMARY_WORKERS or 4)")
+    parser.add_argument("--since", help="Only re-summarize files changed since this git revision and merge into --output")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Path of the shared source index")
+    parser.add_argument("--reuse-index", action="store_true", help="Load --index as is instead of rescanning the source tree")
+    parser.add_argument("--no-dedupe", action="store_true", help="Summarize near-duplicate files individually")
+    parser.add_argument("--processes", type=int, default=DEFAULT_PROCESSES,
+                        help="Processes used by the rule-based fallback (default: FALLBACK_PROCESSES or one per core)")
+    parser.add_argument("--resume", action="store_true", help="Skip files already summarized by an interrupted run")
     args = parser.parse_args()
-    generate_summaries(args.source_dir, args.output)
+    generate_summaries(args.source_dir, args.output, workers=args.workers, since=args.since,
+                       index_path=args.index, reuse_index=args.reuse_index, dedupe=DEDUP_ENABLED and not args.no_dedupe,
+                       processes=args.processes, resume=args.resume)
+    get_recorder().write(log=logger.info)
 
 # This script generates summaries for Java files using Azure OpenAI, with robust error handling and logging.
\ No newline at end of file
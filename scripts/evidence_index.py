@@ -0,0 +1,178 @@
+import json
+import math
+import os
+import re
+import zlib
+from pathlib import Path
+
+from artifacts import iter_records, write_records
+from llm_cache import content_hash
+
+# Kept under .cache so CI can persist it next to the LLM response cache and update it incrementally.
+DEFAULT_EVIDENCE_DIR = os.environ.get("EVIDENCE_INDEX_DIR", ".cache/evidence-index")
+# "auto" retrieves per-category evidence only when the gap context needs more than one prompt; "always" or "off".
+RETRIEVAL_MODE = os.environ.get("GAPS_RETRIEVAL", "auto").strip().lower()
+# A sentence-transformers model name (run on CPU) to embed evidence; hashed TF-IDF is used when unset or unavailable.
+EMBEDDING_MODEL = os.environ.get("EVIDENCE_EMBEDDING_MODEL", "")
+HASH_DIM = int(os.environ.get("EVIDENCE_HASH_DIM", "1024"))
+EMBED_BATCH = 64
+SEARCH_BLOCK = 8192
+
+_WORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+STOPWORDS = frozenset("a an and are as at be by for from has in is it its of on or that the this to uses with".split())
+
+def tokenize(text):
+    """Lower-cased words, with camelCase and snake_case identifiers split into their parts."""
+    return [w for w in (m.lower() for m in _WORD.findall(text)) if len(w) > 1 and w not in STOPWORDS]
+
+class HashedTfidf:
+    """Feature-hashed term frequencies; IDF weights are applied at search time from the stored matrix."""
+
+    weighted = True
+
+    def __init__(self, dim=HASH_DIM):
+        self.dim = dim
+        self.name = f"hashed-tfidf-{dim}"
+
+    def embed(self, texts):
+        import numpy as np
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for token in tokenize(text):
+                bucket = zlib.crc32(token.encode("utf-8")) % self.dim
+                counts[bucket] = counts.get(bucket, 0) + 1
+            for bucket, count in counts.items():
+                matrix[row, bucket] = 1 + math.log(count)
+        return matrix
+
+class SentenceEmbedder:
+    """Dense, normalized embeddings from a local sentence-transformers model on CPU."""
+
+    weighted = False
+
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.name = f"st-{model_name}"
+
+    def embed(self, texts):
+        return self.model.encode(list(texts), batch_size=EMBED_BATCH, normalize_embeddings=True,
+                                 convert_to_numpy=True, show_progress_bar=False)
+
+def get_embedder(model_name=EMBEDDING_MODEL):
+    """Return the configured embedder, falling back to hashed TF-IDF if the model cannot be loaded."""
+    if model_name:
+        try:
+            return SentenceEmbedder(model_name)
+        except Exception as e:
+            print(f"Warning: Embedding model {model_name} unavailable ({str(e)}), using hashed TF-IDF")
+    return HashedTfidf()
+
+class EvidenceIndex:
+    """Evidence documents embedded into a NumPy matrix on disk (matrix.npy + documents.jsonl + meta.json).
+
+    Documents are dicts with an ``id`` and ``text``; rows are keyed by id
+    and content hash, so an update only embeds new or changed documents and
+    copies the other rows. Search streams the memory-mapped matrix in blocks.
+    """
+
+    def __init__(self, directory=DEFAULT_EVIDENCE_DIR, embedder=None):
+        self.directory = Path(directory)
+        self.embedder = embedder or get_embedder()
+        self.rows = {}
+        self.matrix = None
+        meta_path = self.directory / "meta.json"
+        if meta_path.exists() and (self.directory / "matrix.npy").exists():
+            import numpy as np
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("embedder") == self.embedder.name:
+                self.matrix = np.load(self.directory / "matrix.npy", mmap_mode="r")
+                for row, record in enumerate(iter_records(self.directory / "documents.jsonl")):
+                    self.rows[record["id"]] = (row, record["sha256"])
+
+    def update(self, documents, prune=True):
+        """Embed new or changed documents and save; with ``prune``, rows of documents not given are dropped.
+
+        Returns (reused, embedded) row counts.
+        """
+        import numpy as np
+        documents = {doc["id"]: doc for doc in documents}
+        hashes = {doc_id: content_hash(doc["text"]) for doc_id, doc in documents.items()}
+        keep = [doc_id for doc_id, (_, sha256) in self.rows.items()
+                if (doc_id not in documents and not prune) or hashes.get(doc_id) == sha256]
+        fresh = [doc_id for doc_id in documents if doc_id not in keep]
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.directory / "matrix.tmp.npy"
+        width = self.matrix.shape[1] if self.matrix is not None else None
+        parts = []
+        for start in range(0, len(fresh), EMBED_BATCH * 16):
+            batch = fresh[start:start + EMBED_BATCH * 16]
+            parts.append(np.asarray(self.embedder.embed([documents[doc_id]["text"] for doc_id in batch]), dtype=np.float16))
+            width = parts[-1].shape[1]
+        if width is None:
+            width = getattr(self.embedder, "dim", 1)
+        matrix = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float16, shape=(len(keep) + len(fresh), width))
+        for start in range(0, len(keep), SEARCH_BLOCK):
+            rows = [self.rows[doc_id][0] for doc_id in keep[start:start + SEARCH_BLOCK]]
+            matrix[start:start + len(rows)] = self.matrix[rows]
+        offset = len(keep)
+        for part in parts:
+            matrix[offset:offset + len(part)] = part
+            offset += len(part)
+        matrix.flush()
+        del matrix
+        sha256 = {doc_id: self.rows[doc_id][1] for doc_id in keep}
+        sha256.update({doc_id: hashes[doc_id] for doc_id in fresh})
+        order = keep + fresh
+        self.matrix = None
+        os.replace(tmp_path, self.directory / "matrix.npy")
+        write_records(self.directory / "documents.jsonl", ({"id": doc_id, "sha256": sha256[doc_id]} for doc_id in order))
+        with open(self.directory / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"embedder": self.embedder.name, "documents": len(order)}, f)
+        self.matrix = np.load(self.directory / "matrix.npy", mmap_mode="r")
+        self.rows = {doc_id: (row, sha256[doc_id]) for row, doc_id in enumerate(order)}
+        return len(keep), len(fresh)
+
+    def _idf(self, np):
+        if not self.embedder.weighted:
+            return None
+        df = np.zeros(self.matrix.shape[1], dtype=np.float64)
+        for start in range(0, self.matrix.shape[0], SEARCH_BLOCK):
+            df += (self.matrix[start:start + SEARCH_BLOCK] != 0).sum(axis=0)
+        return (np.log((1 + self.matrix.shape[0]) / (1 + df)) + 1).astype(np.float32)
+
+    def search(self, queries, k=20, ids=None):
+        """Return, for each query text, up to ``k`` (id, score) pairs by cosine similarity, best first.
+
+        ``ids`` restricts the results to those documents (e.g. the evidence of
+        the current run); documents with a zero score are never returned.
+        """
+        import numpy as np
+        if self.matrix is None or not self.rows:
+            return [[] for _ in queries]
+        allowed = None
+        if ids is not None:
+            allowed = np.zeros(self.matrix.shape[0], dtype=bool)
+            allowed[[self.rows[doc_id][0] for doc_id in ids if doc_id in self.rows]] = True
+        idf = self._idf(np)
+        query_matrix = np.asarray(self.embedder.embed(list(queries)), dtype=np.float32)
+        if idf is not None:
+            query_matrix = query_matrix * idf
+        query_matrix /= np.maximum(np.linalg.norm(query_matrix, axis=1, keepdims=True), 1e-9)
+        scores = np.zeros((len(queries), self.matrix.shape[0]), dtype=np.float32)
+        for start in range(0, self.matrix.shape[0], SEARCH_BLOCK):
+            block = np.asarray(self.matrix[start:start + SEARCH_BLOCK], dtype=np.float32)
+            if idf is not None:
+                block = block * idf
+            block /= np.maximum(np.linalg.norm(block, axis=1, keepdims=True), 1e-9)
+            scores[:, start:start + len(block)] = query_matrix @ block.T
+        if allowed is not None:
+            scores[:, ~allowed] = 0
+        by_row = {row: doc_id for doc_id, (row, _) in self.rows.items()}
+        results = []
+        for row_scores in scores:
+            top = np.argsort(-row_scores, kind="stable")[:k]
+            results.append([(by_row[int(row)], float(row_scores[row])) for row in top if row_scores[row] > 0])
+        return results
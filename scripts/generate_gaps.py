@@ -1,15 +1,32 @@
 import argparse
 import os
-import json
 import re
-import time
 from pathlib import Path
-from openai import AzureOpenAI
+from chunking import DEFAULT_CHUNK_TOKENS, count_tokens, split_text
+from source_index import DEFAULT_INDEX_PATH, load_index, source_files
+from sonar_report import aggregate_by_component, find_page_files, load_sonar_issues
+from checkstyle_report import format_file_summary, read_checkstyle_report
+from rule_engine import format_location, get_engine
+from run_metrics import get_recorder
+from incremental import changed_files, matches_path, mentions_any, read_bullets, resolve_since
+from artifacts import iter_records, records_path, write_records
+from llm_settings import model_settings
+from llm_client import ModelError, complete, get_backend
+from analyze_queries import query_gaps
+from parallel_scan import DEFAULT_PROCESSES, scan_files
+from evidence_index import DEFAULT_EVIDENCE_DIR, RETRIEVAL_MODE, EvidenceIndex
 
 # -------------------- Parsing Functions --------------------
 
 def parse_codebert_summary(report_path):
+    """Load summary records from codebert-summary.jsonl, or scrape codebert-summary.md for older reports."""
     summary_path = Path(report_path) / "codebert-summary.md"
+    jsonl_path = records_path(summary_path)
+    if jsonl_path.exists():
+        try:
+            return [record for record in iter_records(jsonl_path) if "file" in record and "summary" in record]
+        except Exception as e:
+            print(f"Error: Failed to read {jsonl_path}: {str(e)}, falling back to {summary_path}")
     if not summary_path.exists():
         print(f"Warning: {summary_path} not found, relying on fallback.")
         return []
@@ -23,41 +40,84 @@ def parse_codebert_summary(report_path):
                 elif line.startswith("Summary: ") and current_file:
                     summary = line.replace("Summary: ", "").strip()
                     summaries.append({"file": current_file, "summary": summary})
+                elif line.strip() and summaries and summaries[-1]["file"] == current_file:
+                    # Continuation of a multi-line summary.
+                    summaries[-1]["summary"] += "\n" + line.rstrip("\n")
     except Exception as e:
         print(f"Error: Failed to parse {summary_path}: {str(e)}")
     return summaries
 
 def parse_sonar_report(report_path):
-    sonar_path = Path(report_path) / "sonar-report.json"
-    if not sonar_path.exists():
-        print(f"Warning: {sonar_path} not found, relying on fallback.")
+    if not find_page_files(report_path):
+        print(f"Warning: {Path(report_path) / 'sonar-report.json'} not found, relying on fallback.")
         return []
     try:
-        with open(sonar_path, encoding="utf-8") as f:
-            data = json.load(f)
-            return data.get("issues", [])
+        return load_sonar_issues(report_path)
     except Exception as e:
-        print(f"Error: Failed to parse {sonar_path}: {str(e)}")
+        print(f"Error: Failed to parse Sonar report in {report_path}: {str(e)}")
+        return []
+
+def parse_checkstyle_report(report_path):
+    checkstyle_path = Path(report_path) / "checkstyle-report.xml"
+    if not checkstyle_path.exists():
+        print(f"Warning: {checkstyle_path} not found, skipping Checkstyle violations.")
+        return []
+    try:
+        return read_checkstyle_report(checkstyle_path)
+    except Exception as e:
+        print(f"Error: Failed to parse {checkstyle_path}: {str(e)}")
+        return []
+
+def parse_query_analysis(report_path):
+    """Load the per-statement records written by analyze_queries.py, if it ran."""
+    records_file = Path(report_path) / "query-analysis.jsonl"
+    if not records_file.exists():
+        print(f"Warning: {records_file} not found, skipping query plan evidence.")
         return []
+    return list(iter_records(records_file))
 
 # -------------------- Context & Prompt Builders --------------------
 
-def truncate_text(text, max_chars=4000):
-    return text if len(text) <= max_chars else text[:max_chars] + "... [truncated]"
+SONAR_ISSUES_PER_COMPONENT = 5
 
-def build_context(summaries, sonar_issues, industry, entity_name):
-    context = f"Industry: {industry}\nEntity: {entity_name}\n\nCode Analysis:\n"
+def build_context_header(industry, entity_name):
+    return f"Industry: {industry}\nEntity: {entity_name}\n\n"
+
+def build_context(summaries, sonar_issues, industry, entity_name, checkstyle=None, queries=None):
+    context = build_context_header(industry, entity_name) + "Code Analysis:\n"
     for summary in summaries:
         context += f"File: {summary['file']}\nSummary: {summary['summary']}\n\n"
     context += "SonarQube Issues:\n"
-    for issue in sonar_issues:
-        context += f"Component: {issue.get('component', 'unknown')}, Type: {issue.get('type', 'unknown')}, Message: {issue.get('message', 'No message')}\n"
-    return truncate_text(context)
+    for component, entry in aggregate_by_component(sonar_issues).items():
+        context += format_sonar_component(component, entry)
+    if checkstyle:
+        context += "\nCheckstyle Violations:\n"
+        for entry in checkstyle:
+            context += format_file_summary(entry) + "\n"
+    flagged = query_gaps(queries or [])
+    if flagged:
+        context += "\nQuery Plan Findings (measured with EXPLAIN ANALYZE where available):\n"
+        for gap in flagged:
+            context += f"{gap}\n"
+    return context
+
+def format_sonar_component(component, entry):
+    types = ", ".join(f"{name}: {count}" for name, count in entry["types"].most_common())
+    text = f"Component: {component}, Issues: {entry['total']} ({types})\n"
+    for issue in entry["issues"][:SONAR_ISSUES_PER_COMPONENT]:
+        text += f"  - Type: {issue.get('type', 'unknown')}, Message: {issue.get('message', 'No message')} (x{issue.get('count', 1)})\n"
+    return text
 
-def build_prompt(context, industry, entity_name):
+def split_context(context, industry, entity_name, max_tokens=DEFAULT_CHUNK_TOKENS):
+    """Split the analysis context into token-budgeted parts, each starting with the industry/entity header."""
+    header = build_context_header(industry, entity_name)
+    parts = split_text(context, max_tokens)
+    return [part if part.startswith(header) else header + part for part in parts]
+
+def build_prompt(context, industry, entity_name, focus="modernizing legacy Java servlets, JSP, JDBC, and outdated libraries"):
     return f"""You are a software modernization expert. Based on the following code analysis and SonarQube issues, identify modernization gaps for a {industry} application managing {entity_name} entities.
 
-Focus on modernizing legacy Java servlets, JSP, JDBC, and outdated libraries.
+Focus on {focus}.
 
 List modernization gaps in the following format:
 Gap: <description>
@@ -76,126 +136,244 @@ Context:
 {context}
 """
 
+# -------------------- Evidence Retrieval --------------------
+
+# (name, prompt focus, retrieval query); the queries follow the rule catalog's gap rules plus the report types.
+GAP_CATEGORIES = [
+    ("web layer", "servlet-based request handling and JSP views",
+     "servlet HttpServlet doGet doPost request response dispatcher forward JSP view page rendering web layer"),
+    ("data access", "raw JDBC, SQL handling and slow or unindexed queries",
+     "JDBC DriverManager connection PreparedStatement Statement ResultSet SQL query database sequential scan index"),
+    ("state and security", "session state, hardcoded credentials and other security issues",
+     "HttpSession session attribute state hardcoded password credentials secret authentication vulnerability security"),
+    ("design and dependencies", "tight coupling, missing dependency injection and outdated libraries",
+     "new instance dependency injection coupling static singleton factory utility serializable entity outdated library log4j logging"),
+    ("code quality", "code smells, bugs and style violations reported by SonarQube and Checkstyle",
+     "code smell bug duplicated complexity unused exception checkstyle violations style naming javadoc"),
+]
+EVIDENCE_PER_CATEGORY = int(os.environ.get("EVIDENCE_PER_CATEGORY", "50"))
+
+def build_evidence(summaries, sonar_issues, checkstyle=None, queries=None):
+    """Turn summaries and report entries into evidence documents ({"id", "text"}) for the evidence index."""
+    documents = [{"id": f"summary:{s['file']}", "text": f"File: {s['file']}\nSummary: {s['summary']}\n"} for s in summaries]
+    for component, entry in aggregate_by_component(sonar_issues).items():
+        documents.append({"id": f"sonar:{component}", "text": "SonarQube: " + format_sonar_component(component, entry)})
+    for entry in checkstyle or []:
+        documents.append({"id": f"checkstyle:{entry['file']}", "text": "Checkstyle: " + format_file_summary(entry) + "\n"})
+    for gap in query_gaps(queries or []):
+        documents.append({"id": f"query:{gap}", "text": f"Query plan finding: {gap}\n"})
+    return list({doc["id"]: doc for doc in documents}.values())
+
+def build_category_contexts(documents, industry, entity_name, evidence_dir=DEFAULT_EVIDENCE_DIR, prune=True,
+                            max_tokens=DEFAULT_CHUNK_TOKENS):
+    """Retrieve the top evidence for each gap category into one token-budgeted context per category.
+
+    The evidence index under ``evidence_dir`` is updated first (only new or
+    changed documents are embedded; ``prune`` drops documents no longer
+    present). Returns [(name, focus, context)], or None when the index is
+    unavailable (NumPy missing) so the caller can split the full context.
+    """
+    try:
+        index = EvidenceIndex(evidence_dir)
+        reused, embedded = index.update(documents, prune=prune)
+        results = index.search([query for _, _, query in GAP_CATEGORIES], k=EVIDENCE_PER_CATEGORY,
+                               ids=[doc["id"] for doc in documents])
+    except ImportError as e:
+        print(f"Warning: Evidence index unavailable ({str(e)}), analyzing the full context in parts.")
+        return None
+    print(f"Evidence index ({index.embedder.name}): {embedded} documents embedded, {reused} reused")
+    texts = {doc["id"]: doc["text"] for doc in documents}
+    header = build_context_header(industry, entity_name) + "Evidence:\n"
+    contexts = []
+    for (name, focus, _), hits in zip(GAP_CATEGORIES, results):
+        context, used = header, count_tokens(header)
+        for doc_id, _ in hits:
+            cost = count_tokens(texts[doc_id])
+            if used + cost <= max_tokens:
+                context += texts[doc_id]
+                used += cost
+        if context != header:
+            contexts.append((name, focus, context))
+    return contexts
+
 # -------------------- Gap Extraction & Generation --------------------
 
+CHECKSTYLE_GAP_THRESHOLD = int(os.environ.get("CHECKSTYLE_GAP_THRESHOLD", "10"))
+
 def extract_gaps_from_response(result_text):
     pattern = r"(?:-?\s*Gap:.*?Recommendation:.*?)(?=\n|$)"
     return re.findall(pattern, result_text, re.IGNORECASE | re.DOTALL)
 
-def call_azure_openai_model(client, deployment, prompt, max_attempts=3):
+def call_azure_openai_model(prompt, max_attempts=3, name="gaps"):
+    """Ask the model for gaps through the shared client; re-ask when a reply has no parsable gaps, None on failure."""
+    messages = [
+        {"role": "system", "content": "You are a software modernization expert."},
+        {"role": "user", "content": prompt}
+    ]
     for attempt in range(max_attempts):
         try:
-            response = client.chat.completions.create(
-                model=deployment,
-                messages=[
-                    {"role": "system", "content": "You are a software modernization expert."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=800,
-                temperature=0.7
-            )
-            result_text = response.choices[0].message.content.strip()
-            print("Raw response from Azure OpenAI:\n", result_text)
-            gaps = extract_gaps_from_response(result_text)
-            if gaps:
-                return gaps
-            print("Warning: No valid gaps extracted from Azure OpenAI output.")
-            time.sleep(2 ** attempt)
-        except Exception as e:
-            print(f"Error: Azure OpenAI error (attempt {attempt + 1}): {str(e)}")
-            if "rate limit" in str(e).lower() or "429" in str(e):
-                time.sleep(2 ** attempt)
-                continue
-            break
+            result_text = complete(messages, name, 800, 0.7)
+        except ModelError as e:
+            print(f"Error: Model backend {get_backend().name!r} failed: {str(e)}")
+            return None
+        print(f"Raw response from model backend {get_backend().name!r}:\n", result_text)
+        gaps = extract_gaps_from_response(result_text)
+        if gaps:
+            return gaps
+        print(f"Warning: No valid gaps extracted from model output (attempt {attempt + 1}).")
     return None
 
-def generate_gaps_from_model(summaries, sonar_issues, source_dir, entity_name, industry):
-    endpoint = os.environ.get("AZURE_OPENAI_ENDPOINT")
-    key = os.environ.get("AZURE_OPENAI_KEY")
-    deployment = os.environ.get("AZURE_OPENAI_DEPLOYMENT")
+def generate_gaps_from_model(summaries, sonar_issues, source_dir, entity_name, industry, checkstyle=None, queries=None,
+                             retrieval=RETRIEVAL_MODE, evidence_dir=DEFAULT_EVIDENCE_DIR, prune=True):
+    """Ask the model for gaps over the analysis context.
+
+    A context that fits one prompt is sent as is. A larger one (or any, with
+    ``retrieval`` "always") gets one focused prompt per gap category holding
+    the evidence retrieved for it; with ``retrieval`` "off" or without NumPy
+    the full context is split into consecutive parts instead.
+    """
+    backend, _ = model_settings()
 
-    if not endpoint or not key or not deployment:
-        print("Error: One or more Azure OpenAI environment variables are not set. Using fallback.")
+    if backend is None:
+        print("Error: No model configured (Azure OpenAI environment variables, or LLM_BACKEND=local with LOCAL_MODEL). Using fallback.")
         return None
 
-    try:
-        client = AzureOpenAI(
-            api_key=key,
-            api_version="2024-12-01-preview",  # Use the latest version
-            azure_endpoint=endpoint
-        )
-    except Exception as e:
-        print(f"Error: Failed to initialize Azure OpenAI client: {str(e)}")
+    context = build_context(summaries, sonar_issues, industry, entity_name, checkstyle, queries)
+    parts = split_context(context, industry, entity_name)
+    contexts = None
+    if retrieval == "always" or (retrieval == "auto" and len(parts) > 1):
+        contexts = build_category_contexts(build_evidence(summaries, sonar_issues, checkstyle, queries), industry,
+                                           entity_name, evidence_dir, prune=prune)
+    if contexts is not None:
+        print(f"Analyzing retrieved evidence in {len(contexts)} focused gap categories.")
+        prompts = [(build_prompt(text, industry, entity_name, focus), f"gaps {name}") for name, focus, text in contexts]
+    else:
+        if len(parts) > 1:
+            print(f"Context exceeds {DEFAULT_CHUNK_TOKENS} tokens, analyzing it in {len(parts)} parts.")
+        prompts = [(build_prompt(part, industry, entity_name), f"gaps part {i}/{len(parts)}")
+                   for i, part in enumerate(parts, start=1)]
+    gaps = []
+    for prompt, name in prompts:
+        part_gaps = call_azure_openai_model(prompt, name=name)
+        if part_gaps:
+            gaps.extend(part_gaps)
+    if not gaps:
         return None
+    # Measured query findings are evidence, so they are kept even if the model leaves them out.
+    return list(dict.fromkeys(gaps + query_gaps(queries or [])))
 
-    context = build_context(summaries, sonar_issues, industry, entity_name)
-    prompt = build_prompt(context, industry, entity_name)
-    return call_azure_openai_model(client, deployment, prompt)
+def generate_fallback_gaps(summaries, sonar_issues, source_dir, only=None, index_path=DEFAULT_INDEX_PATH, reuse_index=False,
+                           checkstyle=None, queries=None, processes=DEFAULT_PROCESSES):
+    """Derive gaps from the rule catalog, Sonar, Checkstyle and query findings without a model.
 
-def generate_fallback_gaps(summaries, sonar_issues, source_dir):
+    Without summaries, the source files themselves are scanned across
+    ``processes`` processes (see parallel_scan.py).
+    """
     gaps = []
+    engine = get_engine()
     for summary in summaries:
-        s = summary["summary"].lower()
-        f = summary["file"]
-        if "servlet" in s:
-            gaps.append(f"Gap: {f} uses legacy servlet architecture. Recommendation: Migrate to Spring Boot REST APIs.")
-        if "dependency injection" in s:
-            gaps.append(f"Gap: {f} lacks dependency injection. Recommendation: Adopt Spring Framework for DI.")
-        if "jsp" in s:
-            gaps.append(f"Gap: {f} uses JSP for rendering. Recommendation: Migrate to modern frontend framework like React or Angular.")
-        if "jdbc" in s:
-            gaps.append(f"Gap: {f} uses raw JDBC. Recommendation: Adopt Spring Data JPA with Neon for modern ORM.")
-        if "logging" in s:
-            gaps.append(f"Gap: {f} uses outdated logging. Recommendation: Adopt SLF4J with Logback.")
+        for rule_id in engine.scan(summary["summary"], target="summary"):
+            gaps.append(engine.rule(rule_id)["gap"].format(file=summary["file"]))
     for issue in sonar_issues:
         if issue.get("type") == "CODE_SMELL":
-            gaps.append(f"Gap: Code smell in {issue.get('component', 'unknown')}: {issue.get('message', 'No message')}. Recommendation: Refactor code.")
+            occurrences = f" ({issue['count']} occurrences)" if issue.get("count", 1) > 1 else ""
+            gaps.append(f"Gap: Code smell in {issue.get('component', 'unknown')}: {issue.get('message', 'No message')}{occurrences}. Recommendation: Refactor code.")
+    for entry in checkstyle or []:
+        if entry["total"] >= CHECKSTYLE_GAP_THRESHOLD:
+            top = ", ".join(list(entry["rules"])[:3])
+            gaps.append(f"Gap: {entry['file']} has {entry['total']} Checkstyle violations (mostly {top}). Recommendation: Enforce a shared code style in the build and fix violations incrementally.")
+    gaps.extend(query_gaps(queries or []))
     if not summaries and os.path.exists(source_dir):
         try:
-            for root, _, files in os.walk(source_dir):
-                for file in files:
-                    if file.endswith(".java"):
-                        file_path = Path(root) / file
-                        try:
-                            with open(file_path, encoding="utf-8") as f:
-                                content = f.read()
-                                if "javax.servlet" in content:
-                                    gaps.append(f"Gap: {file} uses legacy servlet architecture. Recommendation: Migrate to Spring Boot REST APIs.")
-                                if "java.sql" in content:
-                                    gaps.append(f"Gap: {file} uses raw JDBC. Recommendation: Adopt Spring Data JPA with Neon.")
-                                if "HttpSession" in content:
-                                    gaps.append(f"Gap: {file} uses HttpSession for state management. Recommendation: Use stateless JWT or Spring Session.")
-                                if "System.out.println" in content or "log4j" in content:
-                                    gaps.append(f"Gap: {file} uses outdated logging. Recommendation: Adopt SLF4J with Logback.")
-                                if "password" in content.lower() or "credential" in content.lower():
-                                    gaps.append(f"Gap: {file} may contain hardcoded credentials. Recommendation: Use environment variables with Spring Security.")
-                        except Exception as e:
-                            print(f"Error: Failed to parse {file_path}: {str(e)}")
+            index = load_index(source_dir, index_path, reuse=reuse_index)
+            paths = [path for path, _ in source_files(index, [".java"]) if only is None or path in only]
+            for file_path, hits, _, _ in scan_files(paths, processes=processes):
+                for rule_id, lines in hits.items():
+                    gap = engine.rule(rule_id).get("gap")
+                    if gap:
+                        gaps.append(gap.format(file=format_location(file_path.name, lines)))
         except Exception as e:
-            print(f"Error: Failed to walk source directory {source_dir}: {str(e)}")
-    if not gaps:
+            print(f"Error: Failed to index source directory {source_dir}: {str(e)}")
+    engine.report()
+    if not gaps and only is None:
         gaps.append("Gap: No modernization gaps identified due to missing analysis data. Recommendation: Ensure codebert_summary.md and SonarQube analysis are available.")
     return gaps
 
 # -------------------- Main Orchestration --------------------
 
-def generate_gaps(reports_dir, output_path, entity_name="Policy", industry="Insurance", source_dir="PolicyManagementJSP/src/main/java"):
-    codebert_summaries = parse_codebert_summary(reports_dir)
+def gap_record(text, source):
+    """Split a 'Gap: ... Recommendation: ...' line into a structured record for gaps.jsonl."""
+    gap, _, recommendation = text.strip().lstrip("-").strip().partition("Recommendation:")
+    gap = gap.strip()
+    if gap.lower().startswith("gap:"):
+        gap = gap[4:].strip()
+    return {"gap": gap, "recommendation": recommendation.strip(), "source": source}
+
+def merge_gaps(output_path, new_gaps, touched):
+    """Keep existing gaps that do not mention a touched file and append the new ones, without duplicates."""
+    _, existing = read_bullets(output_path)
+    kept = [
+        bullet[2:] for bullet in existing
+        if not mentions_any(bullet, touched) and "No modernization gaps identified" not in bullet
+    ]
+    return list(dict.fromkeys(kept + new_gaps))
+
+def generate_gaps(reports_dir, output_path, entity_name="Policy", industry="Insurance", source_dir="PolicyManagementJSP/src/main/java", since=None,
+                  index_path=DEFAULT_INDEX_PATH, reuse_index=False, summaries=None, queries=None,
+                  processes=DEFAULT_PROCESSES, retrieval=RETRIEVAL_MODE, evidence_dir=DEFAULT_EVIDENCE_DIR):
+    """Generate the gap analysis.
+
+    ``summaries`` and ``queries`` may be passed in memory instead of being
+    read from codebert-summary.jsonl and query-analysis.jsonl. ``processes``
+    bounds the fallback's source scan; ``retrieval`` and ``evidence_dir``
+    control the per-category evidence retrieval (see evidence_index.py).
+    """
+    codebert_summaries = parse_codebert_summary(reports_dir) if summaries is None else list(summaries)
     sonar_issues = parse_sonar_report(reports_dir)
-    gaps = generate_gaps_from_model(codebert_summaries, sonar_issues, source_dir, entity_name, industry)
-    if not gaps:
+    checkstyle = parse_checkstyle_report(reports_dir)
+    queries = parse_query_analysis(reports_dir) if queries is None else list(queries)
+
+    changes = None
+    since = resolve_since(since)
+    if since and os.path.exists(output_path):
+        changes = changed_files(since, source_dir)
+    if changes is not None:
+        changed, deleted = changes
+        codebert_summaries = [s for s in codebert_summaries if matches_path(s["file"], changed)]
+        sonar_issues = [i for i in sonar_issues if matches_path(i.get("component", ""), changed)]
+        checkstyle = [entry for entry in checkstyle if matches_path(entry["file"], changed)]
+        queries = [record for record in queries if matches_path(record["file"], changed)]
+
+    if changes is not None and not changed:
+        gaps = []
+    else:
+        gaps = generate_gaps_from_model(codebert_summaries, sonar_issues, source_dir, entity_name, industry, checkstyle,
+                                        queries, retrieval=retrieval, evidence_dir=evidence_dir, prune=changes is None)
+    source = "model"
+    if not gaps and (changes is None or changed):
+        source = "fallback"
         print("Warning: No gaps generated from model, using fallback.")
-        gaps = generate_fallback_gaps(codebert_summaries, sonar_issues, source_dir)
+        gaps = generate_fallback_gaps(codebert_summaries, sonar_issues, source_dir,
+                                      only=changed if changes is not None else None,
+                                      index_path=index_path, reuse_index=reuse_index, checkstyle=checkstyle,
+                                      queries=queries, processes=processes)
+    new_gaps = set(gaps)
+    if changes is not None:
+        gaps = merge_gaps(output_path, gaps, changed | deleted)
+        print(f"Merged gaps for {len(changed)} changed and {len(deleted)} deleted files")
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     try:
         with open(output_path, "w", encoding="utf-8") as f:
             f.write("# Modernization Gaps\n\n")
             for gap in gaps:
                 f.write(f"- {gap}\n")
+        write_records(records_path(output_path),
+                      (gap_record(gap, source if gap in new_gaps else "previous") for gap in gaps))
         print(f"Generated gaps written to {output_path}")
     except Exception as e:
         print(f"Error: Failed to write to {output_path}: {str(e)}")
         raise
+    return gaps
 
 def main():
     parser = argparse.ArgumentParser()
@@ -203,14 +381,30 @@ def main():
     parser.add_argument("--output", required=True, help="Output path for gaps.md")
     parser.add_argument("--entity-name", default="Policy", help="Entity name (e.g., Policy)")
     parser.add_argument("--industry", default="Insurance", help="Industry (e.g., Insurance)")
+    parser.add_argument("--source-dir", default="PolicyManagementJSP/src/main/java", help="Directory containing Java source files")
+    parser.add_argument("--since", help="Only re-analyze files changed since this git revision and merge into --output")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Path of the shared source index")
+    parser.add_argument("--reuse-index", action="store_true", help="Load --index as is instead of rescanning the source tree")
+    parser.add_argument("--processes", type=int, default=DEFAULT_PROCESSES,
+                        help="Processes used to scan sources in the fallback (default: FALLBACK_PROCESSES or one per core)")
+    parser.add_argument("--retrieval", choices=["auto", "always", "off"], default=RETRIEVAL_MODE,
+                        help="Per-category evidence retrieval: auto uses it when the context needs more than one prompt (default: GAPS_RETRIEVAL or auto)")
+    parser.add_argument("--evidence-index", default=DEFAULT_EVIDENCE_DIR, help="Directory of the evidence embedding index")
     args = parser.parse_args()
     generate_gaps(
         reports_dir=args.analysis_reports,
         output_path=args.output,
         entity_name=args.entity_name,
         industry=args.industry,
-        source_dir="PolicyManagementJSP/src/main/java"
+        source_dir=args.source_dir,
+        since=args.since,
+        index_path=args.index,
+        reuse_index=args.reuse_index,
+        processes=args.processes,
+        retrieval=args.retrieval,
+        evidence_dir=args.evidence_index
     )
+    get_recorder().write()
 
 if __name__ == "__main__":
     main()
@@ -1,28 +1,46 @@
 import os
+import time
 import argparse
+from collections import Counter
 from pathlib import Path
-from openai import AzureOpenAI
+from llm_cache import cache_key, content_hash, get_cache
+from artifacts import records_path, write_records
+from llm_settings import model_settings
+from llm_client import ModelError, complete, get_backend
+from source_index import DEFAULT_INDEX_PATH, load_index, parse_structure, source_files
+from rule_engine import get_engine
+from run_metrics import get_recorder
+from chunking import DEFAULT_CHUNK_TOKENS, format_chunk, pack_files
+from call_graph import DEFAULT_GRAPH_PATH, build_graph, component_lines, extract_facts
 
-def read_java_files(source_dir):
-    """Read all Java files from the source directory and return their contents."""
+SYSTEM_PROMPT = "You are a software architect."
+TEMPERATURE = 0.4
+MAX_TOKENS = 1000
+INVENTORY_EXTENSIONS = [".java", ".kt", ".scala", ".groovy"]
+
+def read_java_files(source_dir, index_path=DEFAULT_INDEX_PATH, reuse_index=False):
+    """Read all source files listed in the shared index and return (relative path, content) pairs."""
     code_snippets = []
-    for root, _, files in os.walk(source_dir):
-        for file in files:
-            supported_extensions = [".java", ".kt", ".scala", ".groovy"]
-            if any(file.endswith(ext) for ext in supported_extensions):
-                file_path = Path(root) / file
-                try:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        code = f.read()
-                        code_snippets.append(f"// File: {file}\n{code}")
-                except Exception as e:
-                    print(f"Warning: Failed to read {file_path}: {str(e)}")
-    return "\n\n".join(code_snippets)
-
-def build_prompt(codebase_text):
-    """Construct a prompt to instruct the model to generate a system inventory."""
+    index = load_index(source_dir, index_path, reuse=reuse_index)
+    for file_path, record in source_files(index, INVENTORY_EXTENSIONS):
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                code = f.read()
+                if code.strip():
+                    code_snippets.append((record["path"], code))
+        except Exception as e:
+            print(f"Warning: Failed to read {file_path}: {str(e)}")
+    return code_snippets
+
+def build_prompt(codebase_text, part=None):
+    """Construct a prompt to instruct the model to generate a system inventory.
+
+    ``part`` is an optional (index, total) pair used when the codebase is split
+    across several requests; the model then inventories only that portion.
+    """
+    scope = "Java codebase" if part is None else f"portion ({part[0]} of {part[1]}) of a Java codebase"
     return f"""
-You are a software architect. Analyze the following Java codebase and generate a system inventory in markdown format.
+You are a software architect. Analyze the following {scope} and generate a system inventory in markdown format.
 
 The inventory should include:
 - Components (e.g., frameworks, libraries, architecture style)
@@ -37,32 +55,140 @@ Codebase:
 Return only the markdown content.
 """
 
-def call_azure_openai(prompt):
-    """Call Azure OpenAI to generate the system inventory."""
-    endpoint = os.environ.get("AZURE_OPENAI_ENDPOINT")
-    key = os.environ.get("AZURE_OPENAI_KEY")
-    deployment = os.environ.get("AZURE_OPENAI_DEPLOYMENT")
-
-    if not endpoint or not key or not deployment:
-        raise EnvironmentError("Missing one or more Azure OpenAI environment variables.")
-
-    client = AzureOpenAI(
-        api_key=key,
-        api_version="2024-02-15-preview",
-        azure_endpoint=endpoint
-    )
-
-    response = client.chat.completions.create(
-        model=deployment,
-        messages=[
-            {"role": "system", "content": "You are a software architect."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.4,
-        max_tokens=1000
-    )
-
-    return response.choices[0].message.content.strip()
+def build_reduce_prompt(partial_inventories):
+    """Construct a prompt that merges partial inventories into one system inventory."""
+    joined = "\n\n---\n\n".join(partial_inventories)
+    return f"""
+You are a software architect. The following markdown inventories each describe part of the same Java codebase.
+Merge them into a single system inventory in markdown format with the same sections
+(Components, Features, Database, Dependencies, Issues). Combine duplicates and keep every distinct item.
+
+Partial inventories:
+{joined}
+
+Return only the markdown content.
+"""
+
+def inventory_chunk(chunk, part, records=None):
+    """Inventory one chunk of files; with ``records``, append a record describing the request."""
+    text = format_chunk(chunk)
+    usage = {"prompt_tokens": 0, "completion_tokens": 0}
+    start = time.perf_counter()
+    if part is None:
+        inventory = call_azure_openai(build_prompt(text), usage=usage)
+    else:
+        inventory = call_azure_openai(build_prompt(text, part=part), name=f"inventory part {part[0]}/{part[1]}", usage=usage)
+    if records is not None:
+        records.append(dict({
+            "part": part[0] if part else 1,
+            "files": list(dict.fromkeys(label for label, _ in chunk)),
+            "sha256": content_hash(text),
+            "inventory": inventory,
+            "elapsed": round(time.perf_counter() - start, 4),
+        }, **usage))
+    return inventory
+
+def generate_inventory(files, max_tokens=DEFAULT_CHUNK_TOKENS, records=None):
+    """Map-reduce the inventory over token-budgeted chunks of the codebase.
+
+    Small files are packed together and large ones split on class/method
+    boundaries, so every line of source reaches the model in the fewest
+    requests. Partial inventories are merged in groups that fit the budget
+    until one remains. With ``records``, one record per chunk (files, content
+    hash, partial inventory, token usage, timing) is appended to it.
+    """
+    chunks = pack_files(files, max_tokens)
+    print(f"Packed {len(files)} files into {len(chunks)} request(s) of up to {max_tokens} tokens")
+    if len(chunks) == 1:
+        return inventory_chunk(chunks[0], None, records)
+
+    partials = [inventory_chunk(chunk, (i, len(chunks)), records) for i, chunk in enumerate(chunks, start=1)]
+    while len(partials) > 1:
+        groups = pack_files([(f"Inventory {i}", text) for i, text in enumerate(partials, start=1)], max_tokens)
+        if len(groups) >= len(partials):
+            print("Warning: Partial inventories too large to merge further, concatenating them.")
+            return "\n\n".join(partials)
+        print(f"Merging {len(partials)} partial inventories in {len(groups)} request(s)")
+        partials = [call_azure_openai(build_reduce_prompt([text for _, text in group]), name="inventory merge")
+                    for group in groups]
+    return partials[0]
+
+def call_azure_openai(prompt, name="inventory", usage=None):
+    """Call the configured model to generate the system inventory; token counts are stored in ``usage`` if given.
+
+    Goes through the shared backend (see llm_client.py) and raises ModelError when the call fails.
+    """
+    backend, deployment = model_settings()
+
+    if backend is None:
+        raise EnvironmentError("No model configured (Azure OpenAI environment variables, or LLM_BACKEND=local with LOCAL_MODEL).")
+
+    cache = get_cache()
+    entry_key = cache_key(prompt, SYSTEM_PROMPT, deployment, TEMPERATURE, max_tokens=MAX_TOKENS)
+    cached = cache.get(entry_key)
+    if cached is not None:
+        print("Cache hit, skipping model call")
+        get_recorder().record("model_call", name, cache_hit=True)
+        return cached
+
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    markdown_text = complete(messages, name, MAX_TOKENS, TEMPERATURE, usage)
+    cache.put(entry_key, markdown_text)
+    return markdown_text
+
+FALLBACK_ROLES = [
+    ("Web layer (servlets)", "servlet"),
+    ("Data access (raw JDBC)", "raw_jdbc"),
+    ("Domain entities", "serializable_entity"),
+]
+
+def _names(paths, limit=10):
+    names = [Path(path).name for path in paths]
+    return ", ".join(names[:limit]) + (f" and {len(names) - limit} more" if len(names) > limit else "")
+
+def generate_fallback_inventory(files, records=None, components=None):
+    """Build a rule-based inventory from each file's declared types, imports and legacy-pattern matches.
+
+    Used when no model is configured (or in offline mode). ``components``
+    are the call graph's component bullets, listed in place of the rule-based
+    roles when given. With ``records``, one record per file (path, content
+    hash, classes, rules) is appended to it.
+    """
+    engine = get_engine()
+    packages, dependencies, by_rule = Counter(), Counter(), {}
+    for path, code in files:
+        structure = parse_structure(code)
+        rules = list(engine.scan(code, target="code"))
+        packages[structure["package"] or "(default package)"] += 1
+        dependencies.update({".".join(name.split(".")[:2]) for name in structure["imports"]})
+        for rule_id in rules:
+            by_rule.setdefault(rule_id, []).append(path)
+        if records is not None:
+            records.append({"file": path, "sha256": content_hash(code), "classes": structure["classes"], "rules": rules})
+
+    lines = ["## System Inventory", "", "### Components"]
+    lines.append(f"- {len(files)} source files in {len(packages)} package(s)")
+    if components:
+        lines += components
+    else:
+        for label, rule_id in FALLBACK_ROLES:
+            if rule_id in by_rule:
+                lines.append(f"- {label}: {_names(by_rule[rule_id])}")
+    lines += ["", "### Dependencies"]
+    lines += [f"- {name} (imported by {count} file{'s' if count > 1 else ''})" for name, count in dependencies.most_common(15)]
+    lines += ["", "### Issues"]
+    for rule_id in engine.order:
+        text = engine.rule(rule_id).get("summary")
+        if rule_id in by_rule and text:
+            finding = text.split(". ")[0].removeprefix("It ")
+            lines.append(f"- {finding[:1].upper()}{finding[1:]}: {_names(by_rule[rule_id], 5)}")
+    if lines[-1] == "### Issues":
+        lines.append("- No legacy patterns detected by the rule catalog")
+    lines += ["", "_Generated without a model from the rule catalog; features and database schema are not inferred._"]
+    return "\n".join(lines) + "\n"
 
 def write_output(markdown_text, output_path):
     """Write the markdown output to a file."""
@@ -71,20 +197,57 @@ def write_output(markdown_text, output_path):
         f.write(markdown_text)
     print(f"System inventory written to {output_path}")
 
+def static_components(source_dir, index_path=DEFAULT_INDEX_PATH, graph_path=DEFAULT_GRAPH_PATH):
+    """Return the component bullets of the static call graph (see call_graph.py), or None if it cannot be built."""
+    try:
+        return component_lines(build_graph(extract_facts(source_dir, graph_path, index_path, reuse_index=True)))
+    except Exception as e:
+        print(f"Warning: Failed to build the call graph for {source_dir}: {str(e)}")
+        return None
+
+def create_inventory(source_dir, output_path, index_path=DEFAULT_INDEX_PATH, reuse_index=False, graph_path=DEFAULT_GRAPH_PATH,
+                     graph=None):
+    """Read the indexed sources, generate the inventory and write it with its JSONL records; returns the markdown or None.
+
+    The component list comes from the static call graph: ``graph`` when
+    given (e.g. by the pipeline's processflow step), else it is built here,
+    reusing the per-file facts cached at ``graph_path``.
+    """
+    files = read_java_files(source_dir, index_path, reuse_index)
+    if not files:
+        print("No Java files found or all files are empty.")
+        return None
+
+    components = component_lines(graph) if graph is not None else static_components(source_dir, index_path, graph_path)
+    records = []
+    backend, _ = model_settings()
+    if backend is None:
+        print("Warning: No model configured, using rule-based inventory.")
+        markdown_text = generate_fallback_inventory(files, records, components)
+    else:
+        try:
+            markdown_text = generate_inventory(files, records=records)
+            if components:
+                markdown_text = markdown_text.rstrip() + "\n\n### Components (static analysis)\n" + "\n".join(components) + "\n"
+        except ModelError as e:
+            print(f"Warning: Model backend {get_backend().name!r} failed ({str(e)}), using rule-based inventory.")
+            records = []
+            markdown_text = generate_fallback_inventory(files, records, components)
+    write_output(markdown_text, output_path)
+    write_records(records_path(output_path), records)
+    get_cache().report()
+    return markdown_text
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--source", required=True, help="Directory containing Java source files")
     parser.add_argument("--output", required=True, help="Output markdown file path")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Path of the shared source index")
+    parser.add_argument("--reuse-index", action="store_true", help="Load --index as is instead of rescanning the source tree")
+    parser.add_argument("--graph", default=DEFAULT_GRAPH_PATH, help="Where call_graph.py caches per-file facts")
     args = parser.parse_args()
-
-    codebase_text = read_java_files(args.source)
-    if not codebase_text.strip():
-        print("No Java files found or all files are empty.")
-        return
-
-    prompt = build_prompt(codebase_text)
-    markdown_text = call_azure_openai(prompt)
-    write_output(markdown_text, args.output)
+    create_inventory(args.source, args.output, args.index, args.reuse_index, args.graph)
+    get_recorder().write()
 
 if __name__ == "__main__":
     main()
@@ -1,11 +1,21 @@
 import os
+import json
+import time
 import argparse
+from collections import Counter
 from pathlib import Path
-from openai import AzureOpenAI
+from llm_cache import cache_key, get_cache
+from source_index import DEFAULT_INDEX_PATH, load_index, source_files
+from run_metrics import get_recorder
+from chunking import DEFAULT_CHUNK_TOKENS, count_tokens, format_chunk, pack_files
+from incremental import changed_files, merge_sections, read_sections, resolve_since
+from artifacts import RecordStream, checkpoint_path, iter_records, merge_records, records_path, write_records
+from llm_settings import model_settings
+from llm_client import ModelError, complete, get_backend
+from similarity import DEDUP_ENABLED, cluster_sources, fan_out
 
-def extract_requirements_from_code(code, entity, industry, client, deployment):
-    """Call Azure OpenAI to extract requirements from code."""
-    prompt = f"""
+SYSTEM_PROMPT = "You are a software analyst."
+REQUIREMENTS_PROMPT_TEMPLATE = """
 You are a software analyst. Given the following Java code for a {industry} system managing {entity} entities, extract both functional and non-functional requirements.
 
 Return the output in this format:
@@ -20,75 +30,300 @@ Non-Functional Requirements:
 Code:
 {code}
 """
+BATCH_PROMPT_TEMPLATE = """
+You are a software analyst. Given the following Java files for a {industry} system managing {entity} entities, extract both functional and non-functional requirements for each file.
+Each file starts with a "// File: <path>" line.
+
+Return only a JSON object keyed by file path, in this format:
+{{
+  "<path>": {{
+    "functional": ["<requirement>", "<requirement>"],
+    "non_functional": ["<requirement>", "<requirement>"]
+  }}
+}}
+
+Files:
+{files}
+"""
+TEMPERATURE = 0.3
+MAX_TOKENS = 800
+BATCH_MAX_TOKENS = 4000
+BATCH_MAX_FILES = int(os.environ.get("REQUIREMENTS_BATCH_FILES", "8"))
+REQUIREMENTS_EXTENSIONS = [".java", ".cs", ".py", ".js", ".ts"]
+
+def extract_requirements_from_code(code, entity, industry, deployment, name="requirements", usage=None):
+    """Call the configured model to extract requirements from code; token counts are stored in ``usage`` if given."""
+    cache = get_cache()
+    key = cache_key(code, SYSTEM_PROMPT + REQUIREMENTS_PROMPT_TEMPLATE, deployment, TEMPERATURE,
+                    max_tokens=MAX_TOKENS, entity=entity, industry=industry)
+    cached = cache.get(key)
+    if cached is not None:
+        print("Cache hit, skipping model call")
+        get_recorder().record("model_call", name, cache_hit=True)
+        return cached
+
+    prompt = REQUIREMENTS_PROMPT_TEMPLATE.format(industry=industry, entity=entity, code=code)
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
     try:
-        response = client.chat.completions.create(
-            model=deployment,
-            messages=[
-                {"role": "system", "content": "You are a software analyst."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=800,
-            temperature=0.3
-        )
-        result_text = response.choices[0].message.content.strip()
-        print("Raw Azure OpenAI response:\n", result_text)
-        return result_text
-    except Exception as e:
-        print(f"Error during Azure OpenAI call: {str(e)}")
+        result_text = complete(messages, name, MAX_TOKENS, TEMPERATURE, usage)
+    except ModelError as e:
+        print(f"Error during {get_backend().name} model call: {str(e)}")
         return None
+    print(f"Raw {get_backend().name} model response:\n", result_text)
+    cache.put(key, result_text)
+    return result_text
+
+def parse_batch_response(result_text, paths):
+    """Parse a JSON batch response into {path: requirements markdown}; unknown or malformed entries are skipped."""
+    text = result_text.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text[text.index("\n") + 1:] if "\n" in text else ""
+    try:
+        data = json.loads(text[text.index("{"):text.rindex("}") + 1])
+    except ValueError as e:
+        print(f"Warning: Could not parse batch response as JSON: {str(e)}")
+        return {}
+    results = {}
+    for path in paths:
+        entry = data.get(path)
+        if not isinstance(entry, dict):
+            continue
+        functional = [str(r) for r in entry.get("functional", [])]
+        non_functional = [str(r) for r in entry.get("non_functional", [])]
+        lines = ["Functional Requirements:"]
+        lines += [f"- FR{i}: {r}" for i, r in enumerate(functional, start=1)]
+        lines += ["", "Non-Functional Requirements:"]
+        lines += [f"- NFR{i}: {r}" for i, r in enumerate(non_functional, start=1)]
+        results[path] = "\n".join(lines)
+    return results
 
-def generate_requirements(source_path, entity_name, industry, output_path):
-    endpoint = os.environ.get("AZURE_OPENAI_ENDPOINT")
-    key = os.environ.get("AZURE_OPENAI_KEY")
-    deployment = os.environ.get("AZURE_OPENAI_DEPLOYMENT")
+def extract_requirements_batch(batch, entity, industry, deployment, usage=None):
+    """Extract requirements for several small files in one request.
 
-    if not endpoint or not key or not deployment:
-        print("Error: One or more Azure OpenAI environment variables are not set.")
-        return
+    ``batch`` is a list of (relative path, code) pairs. Returns {path: requirements};
+    files missing from the response are left out so the caller can retry them singly.
+    Token counts of the batch request are stored in ``usage`` if given.
+    """
+    cache = get_cache()
+    results, pending = {}, []
+    for path, code in batch:
+        cached = cache.get(cache_key(code, SYSTEM_PROMPT + BATCH_PROMPT_TEMPLATE, deployment, TEMPERATURE,
+                                     entity=entity, industry=industry))
+        if cached is not None:
+            get_recorder().record("model_call", path, cache_hit=True)
+            results[path] = cached
+        else:
+            pending.append((path, code))
+    if not pending:
+        return results
+
+    prompt = BATCH_PROMPT_TEMPLATE.format(industry=industry, entity=entity, files=format_chunk(pending))
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    try:
+        result_text = complete(messages, f"batch of {len(pending)}: {pending[0][0]}, ...",
+                               min(BATCH_MAX_TOKENS, MAX_TOKENS * len(pending)), TEMPERATURE, usage)
+        print(f"Raw {get_backend().name} model batch response for {len(pending)} files:\n", result_text)
+    except ModelError as e:
+        print(f"Error during {get_backend().name} model batch call: {str(e)}")
+        return results
 
-    client = AzureOpenAI(
-        api_key=key,
-        api_version="2024-12-01-preview",
-        azure_endpoint=endpoint
-    )
-
-    requirements = []
-    for root, _, files in os.walk(source_path):
-        print("Found Files count\n", files.count)
-        for file in files:
-            # Support multiple code file formats
-            supported_extensions = [".java", ".cs", ".py", ".js", ".ts"]
-            if any(file.endswith(ext) for ext in supported_extensions):
-                file_path = Path(root) / file
-                try:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        code = f.read()
-                        if not code.strip():
-                            continue
-                        print("Trigerred Azure OpenAI:\n", file_path)
-                        result = extract_requirements_from_code(code, entity_name, industry, client, deployment)
-                        if result:
-                            requirements.append(f"### File: {file}\n{result}\n")
-                except Exception as e:
-                    print(f"Error reading {file_path}: {str(e)}")
+    parsed = parse_batch_response(result_text, [path for path, _ in pending])
+    for path, code in pending:
+        if path in parsed:
+            cache.put(cache_key(code, SYSTEM_PROMPT + BATCH_PROMPT_TEMPLATE, deployment, TEMPERATURE,
+                                entity=entity, industry=industry), parsed[path])
+            results[path] = parsed[path]
+    return results
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+def plan_batches(sources, max_tokens=DEFAULT_CHUNK_TOKENS, max_files=BATCH_MAX_FILES):
+    """Group small files into token-budgeted batches; return (batches, files to analyze singly)."""
+    small_limit = max_tokens // 4
+    small = [(path, code) for path, code in sources if count_tokens(code) <= small_limit]
+    large = [(path, code) for path, code in sources if count_tokens(code) > small_limit]
+    batches = []
+    for chunk in pack_files(small, max_tokens):
+        batches.extend(chunk[i:i + max_files] for i in range(0, len(chunk), max_files))
+    return batches, large
+
+def write_requirements(output_path, industry, entity_name, sections):
+    """Write the requirements markdown from its sections, consumed one at a time."""
     with open(output_path, "w", encoding="utf-8") as f:
         f.write(f"# {industry} {entity_name} Requirements\n\n")
-        if requirements:
-            f.write("\n".join(requirements))
-        else:
+        written = False
+        for section in sections:
+            f.write(("\n" if written else "") + section)
+            written = True
+        if not written:
             f.write("No requirements extracted.")
 
+def generate_requirements(source_path, entity_name, industry, output_path, since=None, batch=False,
+                          index_path=DEFAULT_INDEX_PATH, reuse_index=False, dedupe=DEDUP_ENABLED, resume=False):
+    """Extract requirements for every source file, or only files changed since a git revision.
+
+    With ``batch``, small files are grouped into multi-file requests sized to the
+    token budget and the per-file JSON answers are split back into sections.
+    A requirements.jsonl artifact with one record per file (path, content hash,
+    requirements, token usage, timing) is written next to the markdown; batched
+    requests are attributed evenly to their files. With ``dedupe``, only one
+    file per cluster of near-duplicates (see similarity.py) is sent to the
+    model and the others reuse its requirements with a note on how they
+    differ. Each file's record is streamed to requirements.jsonl.partial as
+    soon as it is extracted and the outputs are assembled from it in source
+    order; with ``resume``, files already there with unchanged content are
+    skipped. Returns the requirement records of this run (read back lazily
+    from the JSONL artifact after a full run).
+    """
+    backend, deployment = model_settings()
+
+    if backend is None:
+        print("Error: No model configured (Azure OpenAI environment variables, or LLM_BACKEND=local with LOCAL_MODEL).")
+        return
+
+    changes = None
+    since = resolve_since(since)
+    if since and os.path.exists(output_path):
+        changes = changed_files(since, source_path)
+
+    sources, hashes = [], {}
+    index = load_index(source_path, index_path, reuse=reuse_index)
+    for file_path, record in source_files(index, REQUIREMENTS_EXTENSIONS):
+        if changes is not None and file_path not in changes[0]:
+            continue
+        hashes[record["path"]] = record["sha256"]
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                code = f.read()
+                if code.strip():
+                    sources.append((record["path"], code))
+        except Exception as e:
+            print(f"Error reading {file_path}: {str(e)}")
+
+    stream = RecordStream(checkpoint_path(output_path), resume=resume)
+    pending = [(path, code) for path, code in sources if not stream.done(path, hashes[path])]
+    if len(pending) < len(sources):
+        print(f"Resuming: {len(sources) - len(pending)} file(s) already analyzed in {stream.path}")
+
+    # Cluster every source, not just pending ones, so a resumed run picks the same representatives.
+    duplicates = cluster_sources(sources) if dedupe and pending else {}
+    if duplicates:
+        print(f"Found {len(duplicates)} near-duplicate file(s); sending {len(sources) - len(duplicates)} to the model")
+    representatives = [(path, code) for path, code in pending if path not in duplicates]
+
+    def save(path, result, **stats):
+        stream.append(dict({"file": path, "sha256": hashes[path], "requirements": result}, **stats))
+
+    singles = list(representatives)
+    if batch:
+        batches, singles = plan_batches(representatives)
+        print(f"Batching {sum(len(b) for b in batches)} small files into {len(batches)} request(s)")
+        for files_in_batch in batches:
+            usage = {"prompt_tokens": 0, "completion_tokens": 0}
+            start = time.perf_counter()
+            batch_results = extract_requirements_batch(files_in_batch, entity_name, industry, deployment, usage)
+            elapsed = time.perf_counter() - start
+            for path, result in batch_results.items():
+                save(path, result,
+                     prompt_tokens=usage["prompt_tokens"] // len(files_in_batch),
+                     completion_tokens=usage["completion_tokens"] // len(files_in_batch),
+                     elapsed=round(elapsed / len(files_in_batch), 4))
+            singles += [(path, code) for path, code in files_in_batch if path not in batch_results]
+    def extract_single(path, code):
+        print(f"Triggered {get_backend().name} model:\n", path)
+        usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        start = time.perf_counter()
+        with get_recorder().timed("file", path) as event:
+            result = extract_requirements_from_code(code, entity_name, industry, deployment, name=path,
+                                                    usage=usage)
+            if not result:
+                event["status"] = "error"
+        if result:
+            save(path, result, elapsed=round(time.perf_counter() - start, 4), **usage)
+
+    for path, code in singles:
+        extract_single(path, code)
+
+    codes = dict(sources)
+    orphans = []
+    for path, _ in pending:
+        if path not in duplicates:
+            continue
+        representative, similarity = duplicates[path]
+        source = stream.get(representative)
+        if source is None:
+            orphans.append((path, codes[path]))
+            continue
+        save(path, fan_out(source["requirements"], representative, path, codes[representative], codes[path], similarity),
+             prompt_tokens=0, completion_tokens=0, elapsed=0.0,
+             duplicate_of=representative, similarity=round(similarity, 3))
+        get_recorder().record("file", path, status="duplicate")
+    # A failed representative has nothing to fan out, so its duplicates go to the model on their own.
+    if orphans:
+        print(f"Sending {len(orphans)} near-duplicate file(s) individually because their representative failed")
+    for path, code in orphans:
+        extract_single(path, code)
+
+    # Sections are headed by file name, or by relative path when several files in the tree share the name.
+    order = [path for path, _ in sources if path in stream]
+    name_counts = Counter(Path(record["path"]).name for record in index["files"])
+
+    def label(path):
+        name = Path(path).name
+        return name if name_counts[name] <= 1 else path
+
+    def sections():
+        for path in order:
+            yield label(path), f"### File: {label(path)}\n{stream.get(path)['requirements']}\n"
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    if changes is not None:
+        _, existing = read_sections(output_path, "### File: ")
+        existing = {k: v.rstrip("\n") + "\n" for k, v in existing.items()}
+        root = Path(source_path).resolve()
+        labels = {label(path) for path in order}
+        # A deleted file's section is under its relative path, or under its name if no remaining file has that name.
+        removed = {p.relative_to(root).as_posix() for p in changes[1] if p.is_relative_to(root)}
+        removed |= {p.name for p in changes[1] if not name_counts[p.name]}
+        # A rewritten file whose name is unique again replaces its section under the relative path.
+        removed |= {path for path in order if label(path) != path}
+        requirements = merge_sections(existing, dict(sections()), removed - labels)
+        write_requirements(output_path, industry, entity_name, requirements.values())
+        records = list(stream.records(order))
+        merge_records(records_path(output_path), {record["file"]: record for record in records},
+                      {p.relative_to(root).as_posix() for p in changes[1] if p.is_relative_to(root)})
+        print(f"Merged {len(requirements)} requirement sections into {output_path}")
+    else:
+        write_requirements(output_path, industry, entity_name, (section for _, section in sections()))
+        write_records(records_path(output_path), stream.records(order))
+        records = iter_records(records_path(output_path))
+    stream.close(remove=True)
+    get_cache().report()
+    return records
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--source", required=True, help="Path to source directory containing .cs files")
+    parser.add_argument("--source", required=True, help="Path to source directory")
     parser.add_argument("--entity", required=True, help="Entity name (e.g., Policy)")
     parser.add_argument("--industry", required=True, help="Industry name (e.g., Insurance)")
     parser.add_argument("--output", required=True, help="Output markdown file path")
+    parser.add_argument("--since", help="Only re-analyze files changed since this git revision and merge into --output")
+    parser.add_argument("--batch", action="store_true", help="Group small files into multi-file requests")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Path of the shared source index")
+    parser.add_argument("--reuse-index", action="store_true", help="Load --index as is instead of rescanning the source tree")
+    parser.add_argument("--no-dedupe", action="store_true", help="Send near-duplicate files to the model individually")
+    parser.add_argument("--resume", action="store_true", help="Skip files already analyzed by an interrupted run")
     args = parser.parse_args()
 
-    generate_requirements(args.source, args.entity, args.industry, args.output)
+    generate_requirements(args.source, args.entity, args.industry, args.output, since=args.since, batch=args.batch,
+                          index_path=args.index, reuse_index=args.reuse_index,
+                          dedupe=DEDUP_ENABLED and not args.no_dedupe, resume=args.resume)
+    get_recorder().write()
 
     # Example launch.json configuration for VS Code debugging
     # Place this in a .vscode/launch.json file in your project root
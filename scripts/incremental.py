@@ -0,0 +1,114 @@
+import re
+import subprocess
+from collections import OrderedDict
+from pathlib import Path
+
+def resolve_since(since):
+    """Return the revision to diff against, or None when a full run is required.
+
+    Push events report an all-zero 'before' SHA for new branches, and manual runs
+    may pass an empty value; both mean there is nothing to diff against.
+    """
+    if not since or not since.strip() or set(since.strip()) == {"0"}:
+        return None
+    return since.strip()
+
+def _git(args, cwd):
+    result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, check=True)
+    return result.stdout
+
+def changed_files(since, source_dir):
+    """Return (changed, deleted) sets of resolved paths under source_dir since a git revision.
+
+    Changes are computed against the working tree, so uncommitted edits and new
+    untracked files are included. Returns None if the diff cannot be computed,
+    in which case callers should fall back to a full run.
+    """
+    source_dir = Path(source_dir).resolve()
+    try:
+        root = Path(_git(["rev-parse", "--show-toplevel"], source_dir).strip())
+        relative_dir = source_dir.relative_to(root).as_posix() or "."
+        diff = _git(["diff", "--name-status", "-M", since, "--", relative_dir], root)
+        untracked = _git(["ls-files", "--others", "--exclude-standard", "--", relative_dir], root)
+    except (subprocess.CalledProcessError, FileNotFoundError, ValueError) as e:
+        print(f"Warning: Failed to compute changes since {since}: {str(e)}. Running full analysis.")
+        return None
+
+    changed, deleted = set(), set()
+    for line in diff.splitlines():
+        parts = line.split("\t")
+        status = parts[0][:1]
+        if status == "D":
+            deleted.add((root / parts[1]).resolve())
+        elif status == "R":
+            deleted.add((root / parts[1]).resolve())
+            changed.add((root / parts[2]).resolve())
+        elif len(parts) > 1:
+            changed.add((root / parts[1]).resolve())
+    for line in untracked.splitlines():
+        if line.strip():
+            changed.add((root / line).resolve())
+    print(f"Incremental mode: {len(changed)} changed and {len(deleted)} deleted files since {since}")
+    return changed, deleted
+
+def matches_path(name, paths):
+    """Return True if a report name (relative path, file name or 'project:path' key) refers to one of paths."""
+    name_parts = Path(name.split(":")[-1].strip()).parts
+    if not name_parts:
+        return False
+    return any(path.parts[-len(name_parts):] == name_parts for path in paths)
+
+# -------------------- Markdown Section Merging --------------------
+
+def read_sections(path, marker):
+    """Split a markdown report into its preamble and an ordered mapping of sections.
+
+    A section starts at a line beginning with ``marker`` (e.g. "File: " or
+    "### File: ") and its key is the remainder of that line.
+    """
+    path = Path(path)
+    preamble, sections, current = [], OrderedDict(), None
+    if not path.exists():
+        return "", sections
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith(marker):
+                current = line[len(marker):].strip()
+                sections[current] = [line]
+            elif current is None:
+                preamble.append(line)
+            else:
+                sections[current].append(line)
+    return "".join(preamble), OrderedDict((k, "".join(v)) for k, v in sections.items())
+
+def merge_sections(existing, updates, removed_keys=()):
+    """Replace updated sections in place, drop removed ones and append new ones at the end."""
+    merged = OrderedDict()
+    for key, block in existing.items():
+        if key in removed_keys:
+            continue
+        merged[key] = updates.get(key, block)
+    for key, block in updates.items():
+        if key not in merged:
+            merged[key] = block
+    return merged
+
+def read_bullets(path):
+    """Return the preamble and list items ('- ...' blocks, including continuation lines) of a markdown file."""
+    path = Path(path)
+    preamble, bullets = [], []
+    if not path.exists():
+        return "", bullets
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("- "):
+                bullets.append(line)
+            elif bullets and line.strip():
+                bullets[-1] += line
+            elif not bullets:
+                preamble.append(line)
+    return "".join(preamble), [b.rstrip("\n") for b in bullets]
+
+def mentions_any(text, paths):
+    """Return True if text mentions the file name of any of paths."""
+    return any(re.search(rf"\b{re.escape(path.name)}\b", text) for path in paths)
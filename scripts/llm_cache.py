@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# Cache location and limits; the directory is restored between GitHub Actions runs via actions/cache.
+CACHE_DIR = os.environ.get("LLM_CACHE_DIR", ".cache/llm")
+MAX_AGE_DAYS = float(os.environ.get("LLM_CACHE_MAX_AGE_DAYS", "30"))
+MAX_SIZE_MB = float(os.environ.get("LLM_CACHE_MAX_MB", "256"))
+
+def content_hash(text):
+    """Return the SHA-256 hex digest of a text value."""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+def cache_key(content, template, deployment, temperature, **extra):
+    """Build a cache key from the input content, prompt template and model settings.
+
+    Any prompt parameter that changes the response (entity, industry, max_tokens, ...)
+    should be passed as a keyword argument so it becomes part of the key.
+    """
+    payload = {
+        "content": content_hash(content),
+        "template": content_hash(template),
+        "deployment": deployment,
+        "temperature": temperature,
+    }
+    payload.update(extra)
+    return content_hash(json.dumps(payload, sort_keys=True, default=str))
+
+class ResponseCache:
+    """Content-addressed store of model responses, one JSON file per entry."""
+
+    def __init__(self, directory=CACHE_DIR, max_age_days=MAX_AGE_DAYS, max_size_mb=MAX_SIZE_MB, enabled=True):
+        self.directory = Path(directory)
+        self.max_age = max_age_days * 86400
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        """Return the cached response for key, or None on a miss."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.max_age:
+                path.unlink()
+                raise FileNotFoundError(path)
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            # Touch the entry so size-based eviction drops least recently used entries first.
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry.get("response")
+
+    def put(self, key, response, **meta):
+        """Store a response under key; metadata is kept alongside for inspection."""
+        if not self.enabled or response is None:
+            return
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"response": response, "created": time.time(), **meta}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Failed to write cache entry {path}: {str(e)}")
+            return
+        with self._lock:
+            self.writes += 1
+
+    def evict(self):
+        """Remove expired entries, then the least recently used ones until under the size limit."""
+        if not self.enabled or not self.directory.exists():
+            return 0
+        now = time.time()
+        entries = []
+        removed = 0
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+                if now - stat.st_mtime > self.max_age:
+                    path.unlink()
+                    removed += 1
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+            except OSError:
+                continue
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+                removed += 1
+            except OSError:
+                continue
+        with self._lock:
+            self.evicted += removed
+        return removed
+
+    def stats(self):
+        """Return hit/miss counters for this process."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evicted": self.evicted,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def report(self, log=print):
+        """Evict stale entries and log the cache statistics."""
+        self.evict()
+        stats = self.stats()
+        log(f"LLM cache ({self.directory}): {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['writes']} writes, {stats['evicted']} evicted, hit rate {stats['hit_rate']:.0%}")
+        return stats
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Return the process-wide response cache (disabled when LLM_CACHE_DISABLED=1)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(enabled=os.environ.get("LLM_CACHE_DISABLED") != "1")
+        return _cache
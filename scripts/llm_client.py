@@ -0,0 +1,337 @@
+import contextlib
+import os
+import random
+import re
+import threading
+import time
+
+from chunking import count_tokens
+from llm_settings import azure_settings, model_settings
+from run_metrics import get_recorder, usage_of
+
+API_VERSION = "2024-12-01-preview"
+# Client-side budgets per minute; 0 leaves a budget unset until an x-ratelimit-limit-* header sizes it.
+REQUESTS_PER_MINUTE = int(os.environ.get("LLM_REQUESTS_PER_MINUTE", "0"))
+TOKENS_PER_MINUTE = int(os.environ.get("LLM_TOKENS_PER_MINUTE", "0"))
+MAX_ATTEMPTS = int(os.environ.get("LLM_MAX_ATTEMPTS", "3"))
+BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", "1"))
+# A call that would have to wait longer than this (e.g. a quota Retry-After) gives up instead.
+MAX_WAIT = float(os.environ.get("LLM_MAX_WAIT", "60"))
+REQUEST_TIMEOUT = float(os.environ.get("LLM_REQUEST_TIMEOUT", "120"))
+BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.environ.get("LLM_BREAKER_COOLDOWN", "60"))
+# Requests in flight at once across every thread of the process (e.g. all repos of a batch); 0 leaves it uncapped.
+MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "0"))
+
+# Auth, permission and unknown-deployment errors will not recover by retrying.
+FATAL_STATUSES = (401, 403, 404)
+
+class ModelError(Exception):
+    """A model call failed for good; callers take their fallback path."""
+
+class CircuitOpenError(ModelError):
+    """The endpoint is considered unhealthy, so the call was not attempted."""
+
+class TokenBucket:
+    """Refills ``per_minute`` units evenly over a minute; the level may go negative to queue later callers."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def reserve(self, amount, now):
+        """Take ``amount`` units and return the seconds to wait until they are covered."""
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level * 60 / self.capacity)
+
+    def observe(self, remaining, limit=None):
+        """Adopt the server's view: a known limit resizes the bucket, the remaining count caps its level."""
+        if limit:
+            self.capacity = float(limit)
+        self.level = min(self.level, float(remaining))
+
+class RateLimiter:
+    """Shared requests-per-minute and tokens-per-minute budgets plus a pause set by 429 responses."""
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE):
+        self.buckets = {
+            "requests": TokenBucket(requests_per_minute) if requests_per_minute else None,
+            "tokens": TokenBucket(tokens_per_minute) if tokens_per_minute else None,
+        }
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens, max_wait=MAX_WAIT):
+        """Block until one request of ``tokens`` fits the budgets; raise ModelError if that takes over ``max_wait``."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self.paused_until - now)
+            for name, amount in (("requests", 1), ("tokens", tokens)):
+                bucket = self.buckets[name]
+                if bucket is not None:
+                    wait = max(wait, bucket.reserve(amount, now))
+        if wait > max_wait:
+            raise ModelError(f"rate limit would delay the call by {wait:.0f}s")
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def observe(self, headers):
+        """Adapt to x-ratelimit-* response headers.
+
+        A limit header sizes the bucket; the remaining count caps its level.
+        Azure often sends only the remaining counts, which say nothing about
+        the window size, so without a bucket an exhausted budget just pauses
+        callers until the reset time (1 second if none is given).
+        """
+        pause = 0.0
+        with self._lock:
+            for name in ("requests", "tokens"):
+                remaining = _int_header(headers, f"x-ratelimit-remaining-{name}")
+                if remaining is None:
+                    continue
+                limit = _int_header(headers, f"x-ratelimit-limit-{name}")
+                if self.buckets[name] is None and limit:
+                    self.buckets[name] = TokenBucket(limit)
+                if self.buckets[name] is not None:
+                    self.buckets[name].observe(remaining, limit)
+                elif remaining <= 0:
+                    pause = max(pause, parse_duration(headers.get(f"x-ratelimit-reset-{name}")) or 1.0)
+        if pause:
+            self.pause(pause)
+
+    def pause(self, seconds):
+        """Hold every caller back for ``seconds`` (a Retry-After applies to the whole deployment)."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures (or one fatal error) and lets one trial call through per cooldown.
+
+    ``trial`` is the id of the thread making the trial call; the trial must
+    end in success(), failure() or release(), or the circuit stays open.
+    """
+
+    def __init__(self, threshold=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.trial is None and time.monotonic() - self.opened_at >= self.cooldown:
+                self.trial = threading.get_ident()
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                print("Model endpoint recovered, closing the circuit breaker")
+            self.failures, self.opened_at, self.trial = 0, None, None
+
+    def failure(self, fatal=False):
+        with self._lock:
+            self.failures += 1
+            if fatal or self.trial is not None or self.failures >= self.threshold:
+                if self.opened_at is None or self.trial is not None:
+                    print(f"Warning: Model endpoint unhealthy after {self.failures} failure(s), "
+                          f"using fallbacks for the next {self.cooldown:.0f}s")
+                self.opened_at, self.trial = time.monotonic(), None
+
+    def release(self):
+        """End this thread's unsettled trial call (e.g. a 4xx, a rate-limit wait); the circuit stays open for another cooldown."""
+        with self._lock:
+            if self.trial == threading.get_ident():
+                self.opened_at, self.trial = time.monotonic(), None
+
+_client = None
+_limiter = None
+_breaker = None
+_backend = None
+_slots = threading.BoundedSemaphore(MAX_CONCURRENCY) if MAX_CONCURRENCY > 0 else None
+_lock = threading.Lock()
+
+def get_client():
+    """Return the process-wide Azure OpenAI client; the SDK's own retries are off because complete() retries."""
+    global _client
+    with _lock:
+        if _client is None:
+            endpoint, key, _ = azure_settings()
+            from openai import AzureOpenAI
+            _client = AzureOpenAI(api_key=key, azure_endpoint=endpoint, api_version=API_VERSION,
+                                  max_retries=0, timeout=REQUEST_TIMEOUT)
+        return _client
+
+class AzureBackend:
+    """Chat completions from the Azure OpenAI deployment, through the shared client and request slots."""
+
+    name = "azure"
+    remote = True
+
+    def generate(self, messages, max_tokens, temperature):
+        """Return (text, (prompt_tokens, completion_tokens)); rate-limit headers are passed to the shared limiter."""
+        _, _, deployment = azure_settings()
+        completions = get_client().chat.completions
+        raw = getattr(completions, "with_raw_response", None)
+        request = dict(model=deployment, messages=messages, max_tokens=max_tokens, temperature=temperature)
+        with request_slot():
+            if raw is not None:
+                result = raw.create(**request)
+                get_limiter().observe(result.headers)
+                response = result.parse()
+            else:
+                response = completions.create(**request)
+        return (response.choices[0].message.content or "").strip(), usage_of(response)
+
+def get_backend():
+    """Return the process-wide backend chosen by LLM_BACKEND: Azure OpenAI, or a local CPU model (local_backend.py)."""
+    global _backend
+    with _lock:
+        if _backend is None:
+            backend, _ = model_settings()
+            if backend == "local":
+                from local_backend import LocalBackend
+                _backend = LocalBackend()
+            else:
+                _backend = AzureBackend()
+        return _backend
+
+def get_limiter():
+    global _limiter
+    with _lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
+
+def get_breaker():
+    global _breaker
+    with _lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker()
+        return _breaker
+
+def set_max_concurrency(limit):
+    """Cap the requests in flight across the process at ``limit`` (0 or less removes the cap)."""
+    global _slots
+    with _lock:
+        _slots = threading.BoundedSemaphore(limit) if limit > 0 else None
+
+def request_slot():
+    """Context manager holding one of the shared request slots for the duration of a request."""
+    with _lock:
+        slots = _slots
+    return slots if slots is not None else contextlib.nullcontext()
+
+def _int_header(headers, name):
+    try:
+        return int(float(headers.get(name)))
+    except (TypeError, ValueError):
+        return None
+
+def parse_duration(value):
+    """Parse reset durations such as '1s', '6m0s' or '250ms' into seconds; None if absent or malformed."""
+    if not value:
+        return None
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", str(value))
+    if not parts:
+        return _int_header({"v": value}, "v")
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * units[unit] for number, unit in parts)
+
+def error_headers(error):
+    response = getattr(error, "response", None)
+    return getattr(response, "headers", None) or {}
+
+def retry_after(error):
+    """Seconds requested by a Retry-After(-ms) header on the error's response, or None."""
+    headers = error_headers(error)
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after") is not None:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+def backoff(attempt, base=BACKOFF_BASE):
+    """Full-jitter exponential backoff: a random delay up to base * 2**attempt."""
+    return random.uniform(0, base * 2 ** attempt)
+
+def complete(messages, name, max_tokens, temperature, usage=None, attempts=MAX_ATTEMPTS):
+    """Send one chat completion to the configured backend; return the reply text.
+
+    Remote calls go through the shared rate limiter. Rate limits, server
+    errors and timeouts are retried with jittered backoff (honoring
+    Retry-After, which also pauses every other caller); every call is
+    recorded in the run metrics and its token counts are added to ``usage``
+    when given. Raises CircuitOpenError without calling the backend while the
+    breaker is open and ModelError when the call gives up, so callers can
+    fall back.
+    """
+    breaker, limiter, backend = get_breaker(), get_limiter(), get_backend()
+    if not breaker.allow():
+        get_recorder().record("model_call", name, status="circuit_open")
+        raise CircuitOpenError("model endpoint marked unhealthy")
+    estimate = sum(count_tokens(m["content"]) for m in messages) + max_tokens
+    with get_recorder().timed("model_call", name) as call:
+        try:
+            for attempt in range(attempts):
+                call["retries"] = attempt
+                try:
+                    if backend.remote:
+                        limiter.acquire(estimate)
+                    text, (call["prompt_tokens"], call["completion_tokens"]) = backend.generate(messages, max_tokens, temperature)
+                    if usage is not None:
+                        usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + call["prompt_tokens"]
+                        usage["completion_tokens"] = usage.get("completion_tokens", 0) + call["completion_tokens"]
+                    breaker.success()
+                    return text
+                except ModelError:
+                    call["status"] = "failed"
+                    raise
+                except Exception as e:
+                    status = getattr(e, "status_code", None)
+                    print(f"Error: Model call {name} failed (attempt {attempt + 1}/{attempts}): {str(e)}")
+                    if status in FATAL_STATUSES:
+                        breaker.failure(fatal=True)
+                        call["status"] = "failed"
+                        raise ModelError(str(e)) from e
+                    if status is not None and status < 500 and status not in (408, 429):
+                        call["status"] = "failed"
+                        raise ModelError(str(e)) from e
+                    limiter.observe(error_headers(e))
+                    if status == 429:
+                        # Throttling means the endpoint is up; wait as told (or back off) without tripping the breaker.
+                        delay = retry_after(e)
+                        delay = backoff(attempt) if delay is None else delay + random.uniform(0, BACKOFF_BASE)
+                        if delay > MAX_WAIT:
+                            breaker.failure(fatal=True)
+                            call["status"] = "failed"
+                            raise ModelError(f"rate limited for {delay:.0f}s") from e
+                        limiter.pause(delay)
+                        continue
+                    breaker.failure()
+                    if not breaker.allow():
+                        call["status"] = "failed"
+                        raise CircuitOpenError("model endpoint marked unhealthy") from e
+                    if attempt + 1 < attempts:
+                        time.sleep(backoff(attempt))
+            call["status"] = "failed"
+        finally:
+            # A trial call that ends without success() or failure() (a 4xx, a limiter error, only 429s) must not
+            # leave the breaker waiting for it forever.
+            breaker.release()
+    raise ModelError(f"model call {name} failed after {attempts} attempt(s)")
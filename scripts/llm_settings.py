@@ -0,0 +1,46 @@
+import os
+
+# PIPELINE_OFFLINE=1 forces every step onto its rule-based fallback: no SDK is
+# imported and no network call is made, even when credentials are present.
+# LLM_BACKEND=local runs prompts on a local CPU model instead of Azure OpenAI.
+OFFLINE_ENV = "PIPELINE_OFFLINE"
+
+def offline_mode():
+    """Return True when the pure-offline mode is switched on."""
+    return os.environ.get(OFFLINE_ENV, "").strip().lower() in ("1", "true", "yes")
+
+def azure_settings():
+    """Return (endpoint, key, deployment) for Azure OpenAI; all None in offline mode.
+
+    Callers treat any missing value as "no model available" and take their
+    fallback path, so the openai package is only imported once a request
+    is actually going to be sent.
+    """
+    if offline_mode():
+        return None, None, None
+    return (
+        os.environ.get("AZURE_OPENAI_ENDPOINT"),
+        os.environ.get("AZURE_OPENAI_KEY"),
+        os.environ.get("AZURE_OPENAI_DEPLOYMENT"),
+    )
+
+def backend_name():
+    """Return the model backend chosen by LLM_BACKEND: "azure" (default) or "local"."""
+    return os.environ.get("LLM_BACKEND", "azure").strip().lower() or "azure"
+
+def model_settings():
+    """Return (backend, model) for the configured model, or (None, None) when none is available.
+
+    ``model`` identifies the model in cache keys and step fingerprints: the
+    Azure deployment name, or "local:<LOCAL_MODEL>" for the local CPU
+    backend, which needs no credentials. Offline mode disables both.
+    """
+    if offline_mode():
+        return None, None
+    if backend_name() == "local":
+        local_model = os.environ.get("LOCAL_MODEL")
+        return ("local", f"local:{local_model}") if local_model else (None, None)
+    endpoint, key, deployment = azure_settings()
+    if not endpoint or not key or not deployment:
+        return None, None
+    return "azure", deployment
@@ -0,0 +1,87 @@
+import mmap
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from rule_engine import get_engine
+
+# The rule-based fallback spreads files over this many processes (0 = one per core).
+DEFAULT_PROCESSES = int(os.environ.get("FALLBACK_PROCESSES", "0")) or os.cpu_count() or 1
+CHUNK_FILES = int(os.environ.get("FALLBACK_CHUNK_FILES", "256"))
+# Files at least this large are scanned through a read-only memory map instead of being read into memory.
+MMAP_MIN_BYTES = int(os.environ.get("FALLBACK_MMAP_BYTES", str(1 << 20)))
+
+_pool = None
+_lock = threading.Lock()
+
+def get_pool(processes):
+    """Return the process-wide scan pool, started on first use and kept for later scans.
+
+    Reusing it spares every later scan in the process (another step, or the
+    next repo of a batch) the cost of spawning workers and loading the rule
+    catalog again; its size is fixed by the first caller.
+    """
+    global _pool
+    with _lock:
+        if _pool is None:
+            # Spawned, not forked: the orchestrator runs steps in threads, and a forked child could
+            # inherit a lock (logging, the engine singleton) held by another thread.
+            _pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def scan_file(path, target="code", mmap_min_bytes=MMAP_MIN_BYTES):
+    """Return ({rule_id: lines}, status) for one file.
+
+    Small files are decoded as UTF-8 like the serial path (undecodable files
+    are "unreadable"); large ones are matched directly on an mmap of the
+    raw bytes, so only the pages the regex touches are resident.
+    """
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return {}, "empty"
+            if size < mmap_min_bytes:
+                return get_engine().scan(f.read().decode("utf-8"), target), "ok"
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return get_engine().scan(mapped, target), "ok"
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Error: Failed to scan {path}: {str(e)}")
+        return {}, "unreadable"
+
+def scan_chunk(paths, target="code", mmap_min_bytes=MMAP_MIN_BYTES):
+    """Scan a chunk of files in a worker process; return [(hits, status, elapsed)] in input order."""
+    results = []
+    for path in paths:
+        start = time.perf_counter()
+        hits, status = scan_file(path, target, mmap_min_bytes)
+        results.append((hits, status, round(time.perf_counter() - start, 4)))
+    return results
+
+def scan_files(paths, target="code", processes=DEFAULT_PROCESSES, chunk_files=CHUNK_FILES,
+               mmap_min_bytes=MMAP_MIN_BYTES):
+    """Scan files with the rule engine across a process pool; yield (path, hits, status, elapsed) in input order.
+
+    Files are sent to the workers in chunks of ``chunk_files`` and the
+    chunk results are merged back in submission order, so the output is the
+    same for any number of processes. The parent engine's rule statistics
+    are updated with the workers' hits. One process (or a single chunk) scans
+    inline without starting a pool; otherwise the shared pool of get_pool()
+    is used.
+    """
+    paths = list(paths)
+    chunks = [paths[i:i + chunk_files] for i in range(0, len(paths), max(1, chunk_files))]
+    engine = get_engine()
+    if processes <= 1 or len(chunks) <= 1:
+        for path in paths:
+            start = time.perf_counter()
+            hits, status = scan_file(path, target, mmap_min_bytes)
+            yield path, hits, status, round(time.perf_counter() - start, 4)
+        return
+    results = get_pool(processes).map(scan_chunk, chunks, [target] * len(chunks), [mmap_min_bytes] * len(chunks))
+    for chunk, chunk_results in zip(chunks, results):
+        for path, (hits, status, elapsed) in zip(chunk, chunk_results):
+            engine.count(hits)
+            yield path, hits, status, elapsed
@@ -0,0 +1,522 @@
+import argparse
+import gzip
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from checkstyle_report import rule_name, short_file_name
+from evidence_index import tokenize
+from sonar_report import aggregate_by_component, find_page_files, load_sonar_issues
+
+DEFAULT_SITE_DIR = os.environ.get("DOCS_SITE_DIR", "site")
+DEFAULT_FILES_PATH = "files.json"
+BUNDLE_VERSION = 1
+# Uncompressed HTML per fragment; the viewer fetches one fragment at a time.
+PAGE_BYTES = int(os.environ.get("DOCS_PAGE_KB", "256")) * 1024
+# Checkstyle and Sonar tables are cut into sections of at most this many rows, so one file cannot make a huge page.
+ROWS_PER_SECTION = 500
+SUMMARY_ROWS = 200
+SNIPPET_CHARS = 160
+RENDERER_FILES = ["publish_docs.py", "checkstyle_report.py", "sonar_report.py", "evidence_index.py"]
+
+# -------------------- Markdown --------------------
+
+_FENCE = re.compile(r"^\s*(```|~~~)\s*([\w+-]*)")
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_RULE = re.compile(r"^\s*([-*_])(?:\s*\1){2,}\s*$")
+_LIST_ITEM = re.compile(r"^(\s*)(?:[-*+]|(\d+)[.)])\s+(.*)$")
+_TABLE_RULE = re.compile(r"^\s*\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)*\|?\s*$")
+_INLINE = re.compile(r"`([^`]+)`|\*\*(.+?)\*\*|__(.+?)__|\*([^*\s][^*]*?)\*|(?<!\w)_(\S.*?)_(?!\w)|\[([^\]]+)\]\(([^)\s]+)\)")
+_SAFE_LINK = re.compile(r"^(?:https?:|mailto:|#|[\w./-])", re.IGNORECASE)
+
+def render_inline(text):
+    """Escape a line of markdown and render code spans, bold, italics and links."""
+    parts, position = [], 0
+    for match in _INLINE.finditer(text):
+        parts.append(html.escape(text[position:match.start()]))
+        code, bold, bold_alt, italic, italic_alt, label, href = match.groups()
+        if code is not None:
+            parts.append(f"<code>{html.escape(code)}</code>")
+        elif bold is not None or bold_alt is not None:
+            parts.append(f"<strong>{render_inline(bold or bold_alt)}</strong>")
+        elif italic is not None or italic_alt is not None:
+            parts.append(f"<em>{render_inline(italic or italic_alt)}</em>")
+        elif _SAFE_LINK.match(href) and not href.lower().startswith("javascript:"):
+            parts.append(f"<a href=\"{html.escape(href)}\">{render_inline(label)}</a>")
+        else:
+            parts.append(html.escape(match.group(0)))
+        position = match.end()
+    parts.append(html.escape(text[position:]))
+    return "".join(parts)
+
+def _table_cells(line):
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+def _render_list(items):
+    """Render (indent, ordered, text) items, nesting deeper-indented items in the previous one."""
+    out, stack = [], []
+    for indent, ordered, text in items:
+        while stack and indent < stack[-1][0]:
+            out.append(f"</li></{stack.pop()[1]}>")
+        if not stack or indent > stack[-1][0]:
+            tag = "ol" if ordered else "ul"
+            stack.append((indent, tag))
+            out.append(f"<{tag}><li>")
+        else:
+            out.append("</li><li>")
+        out.append(render_inline(text))
+    while stack:
+        out.append(f"</li></{stack.pop()[1]}>")
+    return "".join(out)
+
+def render_markdown(text):
+    """Render the markdown the generators write (headings, lists, tables, fenced code, paragraphs) to HTML.
+
+    Raw HTML in the input is escaped, so model output cannot inject markup
+    into the viewer. Mermaid blocks become <pre class="mermaid"> for the
+    viewer to draw.
+    """
+    lines = text.splitlines()
+    out, paragraph, items = [], [], []
+    i = 0
+
+    def flush():
+        if paragraph:
+            out.append("<p>" + "\n".join(render_inline(line.strip()) for line in paragraph) + "</p>")
+            paragraph.clear()
+        if items:
+            out.append(_render_list(items))
+            items.clear()
+
+    while i < len(lines):
+        line = lines[i]
+        fence = _FENCE.match(line)
+        if fence:
+            flush()
+            body = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith(fence.group(1)):
+                body.append(lines[i])
+                i += 1
+            code = html.escape("\n".join(body))
+            if fence.group(2) == "mermaid":
+                out.append(f"<pre class=\"mermaid\">{code}</pre>")
+            else:
+                language = f" class=\"language-{html.escape(fence.group(2))}\"" if fence.group(2) else ""
+                out.append(f"<pre><code{language}>{code}</code></pre>")
+            i += 1
+            continue
+        if not line.strip():
+            flush()
+        elif _HEADING.match(line):
+            flush()
+            hashes, title = _HEADING.match(line).groups()
+            out.append(f"<h{len(hashes)}>{render_inline(title)}</h{len(hashes)}>")
+        elif _RULE.match(line) and not items:
+            flush()
+            out.append("<hr>")
+        elif "|" in line and i + 1 < len(lines) and _TABLE_RULE.match(lines[i + 1]) and "-" in lines[i + 1]:
+            flush()
+            rows = [f"<tr>{''.join(f'<th>{render_inline(c)}</th>' for c in _table_cells(line))}</tr>"]
+            i += 2
+            while i < len(lines) and "|" in lines[i] and lines[i].strip():
+                rows.append(f"<tr>{''.join(f'<td>{render_inline(c)}</td>' for c in _table_cells(lines[i]))}</tr>")
+                i += 1
+            out.append("<table>" + "".join(rows) + "</table>")
+            continue
+        elif _LIST_ITEM.match(line):
+            if paragraph:
+                flush()
+            indent, number, item = _LIST_ITEM.match(line).groups()
+            items.append((len(indent.expandtabs(4)), number is not None, item))
+        elif items and line[:1].isspace():
+            indent, ordered, item = items[-1]
+            items[-1] = (indent, ordered, f"{item} {line.strip()}")
+        elif line.startswith(">"):
+            flush()
+            out.append(f"<blockquote>{render_inline(line.lstrip('> '))}</blockquote>")
+        else:
+            if items:
+                flush()
+            paragraph.append(line)
+        i += 1
+    flush()
+    return "\n".join(out)
+
+def split_sections(text, default_title, max_chars=PAGE_BYTES // 2):
+    """Split markdown before each heading (levels 1-3) and each 'File:' line, outside fenced code.
+
+    Returns (title, markdown) pairs; sections are the units that are paged
+    and that search results point to. A section longer than ``max_chars``
+    (e.g. one list of thousands of gaps) continues in a new section with the
+    same title at the next list item or blank line.
+    """
+    sections, current, title, fenced, size = [], [], default_title, None, 0
+    for line in text.splitlines():
+        fence = _FENCE.match(line)
+        if fence and fenced is None:
+            fenced = fence.group(1)
+        elif fenced and line.strip().startswith(fenced):
+            fenced = None
+        elif fenced is None:
+            heading = _HEADING.match(line)
+            file_line = line.startswith("File:")
+            if (heading and len(heading.group(1)) <= 3) or file_line:
+                if any(l.strip() for l in current):
+                    sections.append((title, "\n".join(current)))
+                current, size = [], 0
+                title = heading.group(2) if heading else line[5:].strip()
+                title = re.sub(r"^File:\s*", "", title)
+            elif size > max_chars and (not line.strip() or _LIST_ITEM.match(line)):
+                sections.append((title, "\n".join(current)))
+                current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if any(l.strip() for l in current):
+        sections.append((title, "\n".join(current)))
+    return sections
+
+# -------------------- Paged Fragments --------------------
+
+class PageWriter:
+    """Packs rendered sections into gzip-compressed HTML fragments of about ``page_bytes`` each.
+
+    Fragments are named page-<n>.html.gz and written with a fixed gzip
+    timestamp, so republishing unchanged content produces identical files.
+    """
+
+    def __init__(self, directory, page_bytes=PAGE_BYTES, first_page=1):
+        self.directory = Path(directory)
+        self.page_bytes = page_bytes
+        self.page = first_page
+        self.parts, self.size = [], 0
+        self.raw_bytes = self.compressed_bytes = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def add(self, anchor, section_html):
+        """Append one section and return the page number it lands on."""
+        block = f"<section id=\"{anchor}\">\n{section_html}\n</section>\n"
+        if self.parts and self.size + len(block) > self.page_bytes:
+            self.flush()
+        self.parts.append(block)
+        self.size += len(block)
+        return self.page
+
+    def write_page(self, page, text):
+        data = text.encode("utf-8")
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        with open(self.directory / f"page-{page}.html.gz", "wb") as f:
+            f.write(compressed)
+        self.raw_bytes += len(data)
+        self.compressed_bytes += len(compressed)
+
+    def flush(self):
+        if self.parts:
+            self.write_page(self.page, "".join(self.parts))
+            self.page += 1
+            self.parts, self.size = [], 0
+
+    def close(self):
+        """Write the last fragment and return the number of the last page."""
+        if self.parts:
+            self.flush()
+        return self.page - 1
+
+def _snippet(text):
+    return " ".join(re.sub(r"[#*`>|]+", " ", text).split())[:SNIPPET_CHARS]
+
+def _doc(kind, title, text, page, anchor):
+    return {"kind": kind, "title": title, "text": text, "page": page, "anchor": anchor}
+
+def _role(path):
+    name = Path(path).name.lower()
+    for role in ("gaps", "requirements", "summary"):
+        if role in name:
+            return role
+    return "section"
+
+def publish_markdown(path, writer, title):
+    """Render a markdown report section by section; returns its search documents.
+
+    Gap bullets, requirement bullets and per-file summaries become gap,
+    requirement and file documents; other reports are searchable by section.
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    role = _role(path)
+    docs = []
+    for number, (section_title, markdown) in enumerate(split_sections(text, title, writer.page_bytes // 2), start=1):
+        anchor = f"s{number}"
+        page = writer.add(anchor, render_markdown(markdown))
+        bullets = [match.group(3) for match in map(_LIST_ITEM.match, markdown.splitlines()) if match]
+        if role == "gaps":
+            for bullet in bullets:
+                gap = re.sub(r"^Gap:\s*", "", bullet.split("Recommendation:")[0]).strip()
+                docs.append(_doc("gap", gap[:80], bullet, page, anchor))
+        elif role == "requirements":
+            file_name = re.sub(r"^File:\s*", "", section_title)
+            for bullet in bullets:
+                label = bullet.split(":", 1)[0] if ":" in bullet[:12] else ""
+                docs.append(_doc("requirement", f"{file_name} {label}".strip(), bullet, page, anchor))
+        elif role == "summary" and section_title != title:
+            docs.append(_doc("file", section_title, markdown, page, anchor))
+        elif section_title != title:
+            docs.append(_doc("section", section_title, markdown, page, anchor))
+    return docs
+
+def _table(headers, rows):
+    head = "".join(f"<th>{html.escape(h)}</th>" for h in headers)
+    body = "".join("<tr>" + "".join(f"<td>{html.escape(str(cell))}</td>" for cell in row) + "</tr>" for row in rows)
+    return f"<table><tr>{head}</tr>{body}</table>"
+
+def _summary_page(title, lead, counts, entries, slug):
+    """Page 1 of a tool report: totals, then the largest entries linked to their detail sections."""
+    lines = [f"<h1>{html.escape(title)}</h1>", f"<p>{html.escape(lead)}</p>"]
+    for heading, counter in counts:
+        lines.append(f"<h3>{html.escape(heading)}</h3>")
+        lines.append(_table([heading, "Count"], sorted(counter.items(), key=lambda item: -item[1])))
+    lines.append("<h3>Largest entries</h3><ul>")
+    for name, total, page, anchor in sorted(entries, key=lambda e: -e[1])[:SUMMARY_ROWS]:
+        lines.append(f"<li><a href=\"#{slug}/{page}/{anchor}\">{html.escape(name)}</a> ({total})</li>")
+    lines.append("</ul>")
+    if len(entries) > SUMMARY_ROWS:
+        lines.append(f"<p>{len(entries) - SUMMARY_ROWS} more on the following pages.</p>")
+    return f"<section id=\"summary\">\n{''.join(lines)}\n</section>\n"
+
+def _rows_sections(writer, anchor_prefix, heading, headers, rows):
+    """Add a table as sections of at most ROWS_PER_SECTION rows; returns (first page, first anchor)."""
+    first = None
+    for start in range(0, max(len(rows), 1), ROWS_PER_SECTION):
+        anchor = f"{anchor_prefix}-{start // ROWS_PER_SECTION}" if start else anchor_prefix
+        suffix = f" (rows {start + 1}-{min(start + ROWS_PER_SECTION, len(rows))})" if start else ""
+        page = writer.add(anchor, f"<h3>{html.escape(heading)}{suffix}</h3>" + _table(headers, rows[start:start + ROWS_PER_SECTION]))
+        first = first or (page, anchor)
+    return first
+
+def publish_checkstyle(path, writer, title, slug):
+    """Stream a Checkstyle XML report into one table per file; page 1 summarizes it.
+
+    Like read_checkstyle_report, elements are discarded once rendered, so a
+    report of any size is published with flat memory.
+    """
+    severity, rules, entries, docs = {}, {}, [], []
+    rows, current, root = [], None, None
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if root is None:
+            root = elem
+        if event == "start":
+            if elem.tag == "file":
+                current, rows = short_file_name(elem.get("name", "")), []
+            continue
+        if elem.tag == "error" and current is not None:
+            rule = rule_name(elem.get("source"))
+            level = elem.get("severity", "error")
+            severity[level] = severity.get(level, 0) + 1
+            rules[rule] = rules.get(rule, 0) + 1
+            rows.append((elem.get("line", ""), level, rule, elem.get("message", "")))
+        elif elem.tag == "file" and current is not None:
+            if rows:
+                anchor = f"f{len(entries) + 1}"
+                page, anchor = _rows_sections(writer, anchor, f"{current} ({len(rows)})", ["Line", "Severity", "Rule", "Message"], rows)
+                entries.append((current, len(rows), page, anchor))
+                top = sorted({r[2] for r in rows})
+                docs.append(_doc("file", current, f"{len(rows)} Checkstyle violations: {', '.join(top)}", page, anchor))
+            current = None
+            root.clear()
+        elem.clear()
+    lead = f"{sum(severity.values())} violations in {len(entries)} files."
+    return docs, _summary_page(title, lead, [("Severity", severity), ("Rule", rules)], entries, slug)
+
+def publish_sonar(paths, writer, title, slug):
+    """Render deduplicated Sonar issues as one table per component; page 1 summarizes them."""
+    components = aggregate_by_component(load_sonar_issues(paths[0] if len(paths) == 1 else paths[0].parent))
+    types, entries, docs = {}, [], []
+    for number, (component, entry) in enumerate(components.items(), start=1):
+        for name, count in entry["types"].items():
+            types[name] = types.get(name, 0) + count
+        rows = [(issue["rule"], issue["type"], issue["severity"], issue["message"], issue["count"]) for issue in entry["issues"]]
+        name = component.split(":", 1)[-1]
+        page, anchor = _rows_sections(writer, f"c{number}", f"{name} ({entry['total']})",
+                                      ["Rule", "Type", "Severity", "Message", "Count"], rows)
+        entries.append((name, entry["total"], page, anchor))
+        docs.append(_doc("file", name, " ".join(issue["message"] for issue in entry["issues"][:20]), page, anchor))
+    lead = f"{sum(types.values())} issues in {len(entries)} components."
+    return docs, _summary_page(title, lead, [("Type", types)], entries, slug)
+
+def publish_text(path, writer):
+    """Publish any other file as escaped preformatted text, one page-sized block at a time."""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        number = 0
+        while True:
+            block = f.read(PAGE_BYTES // 2)
+            if not block:
+                break
+            number += 1
+            writer.add(f"b{number}", f"<pre>{html.escape(block)}</pre>")
+    return []
+
+# -------------------- Bundle --------------------
+
+def slugify(path):
+    """Name a report's fragment directory after its path, e.g. 'docs/claims/gaps.md' -> 'docs-claims-gaps'."""
+    return re.sub(r"[^a-z0-9]+", "-", str(Path(path).with_suffix("")).lower()).strip("-")
+
+def source_paths(path):
+    """Return the files a report is built from (Sonar exports may be split into page files)."""
+    path = Path(path)
+    if path.name.startswith("sonar-report"):
+        # The newest export wins (see find_page_files), wherever the listed path points.
+        return find_page_files(path.parent)
+    return [path] if path.is_file() else []
+
+def digest_files(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(str(path).encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+def renderer_version():
+    """Identify the code that renders fragments, so a renderer change republishes every report."""
+    scripts = Path(__file__).resolve().parent
+    return f"{BUNDLE_VERSION}:{digest_files([scripts / name for name in RENDERER_FILES])[:16]}"
+
+def load_reports(files_path, docs_dir):
+    """List the reports to publish: the viewer's files.json entries, then any other markdown under ``docs_dir``.
+
+    Picking up docs/<repo>/*.md and the portfolio roll-up means batch runs
+    are published without editing files.json.
+    """
+    reports, seen = [], set()
+    if files_path and Path(files_path).exists():
+        base = Path(files_path).parent
+        with open(files_path, encoding="utf-8") as f:
+            for entry in json.load(f):
+                path = os.path.normpath(base / entry["path"])
+                reports.append({"name": entry.get("name") or Path(path).stem, "path": path})
+                seen.add(path)
+    if docs_dir and Path(docs_dir).is_dir():
+        for path in sorted(Path(docs_dir).rglob("*.md")):
+            path = os.path.normpath(path)
+            if path not in seen:
+                relative = Path(path).relative_to(Path(docs_dir)).with_suffix("")
+                name = " / ".join(part.replace("-", " ").title() for part in relative.parts)
+                reports.append({"name": name, "path": path})
+                seen.add(path)
+    return reports
+
+def publish_report(report, slug, site_dir, page_bytes):
+    """Render one report into site_dir/<slug>/ and return (pages, raw bytes, compressed bytes, search documents)."""
+    directory = Path(site_dir) / slug
+    shutil.rmtree(directory, ignore_errors=True)
+    path = Path(report["path"])
+    suffix = path.suffix.lower()
+    if suffix == ".xml" and "checkstyle" in path.name.lower():
+        writer = PageWriter(directory, page_bytes, first_page=2)
+        docs, summary = publish_checkstyle(path, writer, report["name"], slug)
+        writer.write_page(1, summary)
+    elif path.name.startswith("sonar-report"):
+        writer = PageWriter(directory, page_bytes, first_page=2)
+        docs, summary = publish_sonar(source_paths(path), writer, report["name"], slug)
+        writer.write_page(1, summary)
+    else:
+        writer = PageWriter(directory, page_bytes)
+        docs = publish_markdown(path, writer, report["name"]) if suffix == ".md" else publish_text(path, writer)
+    pages = max(writer.close(), 1)
+    if not (directory / "page-1.html.gz").exists():
+        writer.write_page(1, "<p>This report is empty.</p>")
+    with open(directory / "search-docs.json", "w", encoding="utf-8") as f:
+        json.dump(docs, f)
+    return pages, writer.raw_bytes, writer.compressed_bytes, docs
+
+def build_search_index(reports_docs):
+    """Build the inverted index: documents as [kind, title, report, page, anchor, snippet] and delta-encoded postings per term."""
+    docs, postings = [], {}
+    for report_number, report_docs in enumerate(reports_docs):
+        for doc in report_docs:
+            doc_id = len(docs)
+            docs.append([doc["kind"], doc["title"], report_number, doc["page"], doc["anchor"], _snippet(doc["text"])])
+            for term in set(tokenize(f"{doc['title']} {doc['text']}")):
+                postings.setdefault(term, []).append(doc_id)
+    terms = {}
+    for term in sorted(postings):
+        ids = postings[term]
+        terms[term] = [ids[0]] + [b - a for a, b in zip(ids, ids[1:])]
+    return {"version": BUNDLE_VERSION, "docs": docs, "terms": terms}
+
+def publish(files_path=DEFAULT_FILES_PATH, docs_dir="docs", site_dir=DEFAULT_SITE_DIR, page_bytes=PAGE_BYTES, force=False):
+    """Pre-render every report into site_dir and write its manifest and search index; returns the manifest.
+
+    Reports whose sources are unchanged since the last publish keep their
+    fragments and search documents; directories of reports that are no
+    longer listed are removed.
+    """
+    site_dir = Path(site_dir)
+    site_dir.mkdir(parents=True, exist_ok=True)
+    renderer = renderer_version()
+    manifest_path = site_dir / "manifest.json"
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            previous = {entry["id"]: entry for entry in json.load(f).get("reports", [])}
+    except (OSError, ValueError):
+        previous = {}
+
+    entries, reports_docs = [], []
+    for report in load_reports(files_path, docs_dir):
+        paths = source_paths(report["path"])
+        if not paths:
+            print(f"Warning: {report['path']} not found, leaving {report['name']} out of the bundle")
+            continue
+        slug = slugify(report["path"])
+        sha256 = digest_files(paths)
+        old = previous.get(slug)
+        docs_path = site_dir / slug / "search-docs.json"
+        if (not force and old and old.get("sha256") == sha256 and old.get("page_bytes") == page_bytes
+                and old.get("renderer") == renderer and docs_path.exists()):
+            with open(docs_path, encoding="utf-8") as f:
+                docs = json.load(f)
+            entry = old
+            print(f"{report['path']} unchanged, keeping {old['pages']} page(s)")
+        else:
+            start = time.perf_counter()
+            pages, raw, compressed, docs = publish_report(report, slug, site_dir, page_bytes)
+            entry = {"id": slug, "sha256": sha256, "page_bytes": page_bytes, "renderer": renderer, "pages": pages,
+                     "bytes": raw, "gzip_bytes": compressed}
+            print(f"Published {report['path']}: {pages} page(s), {raw // 1024} KB HTML, {compressed // 1024} KB gzip, "
+                  f"{len(docs)} search entries in {time.perf_counter() - start:.1f}s")
+        entries.append(dict(entry, name=report["name"], source=str(report["path"])))
+        reports_docs.append(docs)
+
+    index = build_search_index(reports_docs)
+    with open(site_dir / "search.json.gz", "wb") as f:
+        f.write(gzip.compress(json.dumps(index, separators=(",", ":")).encode("utf-8"), compresslevel=9, mtime=0))
+    for slug in set(previous) - {entry["id"] for entry in entries}:
+        shutil.rmtree(site_dir / slug, ignore_errors=True)
+    manifest = {"version": BUNDLE_VERSION, "reports": entries, "search": "search.json.gz",
+                "documents": len(index["docs"]), "terms": len(index["terms"])}
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Docs bundle written to {site_dir} ({len(entries)} reports, {len(index['docs'])} search entries, "
+          f"{len(index['terms'])} terms)")
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render the docs and reports into paged, gzipped HTML with a search index for index.html")
+    parser.add_argument("--files", default=DEFAULT_FILES_PATH, help="The viewer's list of reports")
+    parser.add_argument("--docs-dir", default="docs", help="Also publish any other markdown under this directory")
+    parser.add_argument("--output", default=DEFAULT_SITE_DIR, help="Bundle directory read by index.html")
+    parser.add_argument("--page-kb", type=int, default=PAGE_BYTES // 1024, help="Uncompressed HTML per fragment")
+    parser.add_argument("--force", action="store_true", help="Re-render reports even if their sources are unchanged")
+    args = parser.parse_args()
+    publish(args.files, args.docs_dir, args.output, args.page_kb * 1024, args.force)
+
+if __name__ == "__main__":
+    main()
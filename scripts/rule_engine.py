@@ -0,0 +1,126 @@
+import json
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+
+DEFAULT_RULES_PATH = os.environ.get(
+    "LEGACY_RULES_PATH", str(Path(__file__).resolve().parent / "rules" / "legacy_rules.json")
+)
+
+def load_catalog(path=DEFAULT_RULES_PATH):
+    """Load the rule catalog from JSON, or YAML when the path ends in .yml/.yaml and PyYAML is installed."""
+    with open(path, encoding="utf-8") as f:
+        if str(path).endswith((".yml", ".yaml")):
+            import yaml
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    return data.get("rules", [])
+
+class RuleEngine:
+    """Declarative legacy-pattern rules compiled into one regex per target.
+
+    Each rule lists literal ``patterns`` (or regular expressions with
+    ``"regex": true``) and applies either to source code or to summary text.
+    All rules of a target are combined into a single alternation with one
+    named group per rule, so a file is scanned in one pass. The alternation
+    reports only one rule per offset, so each search resumes one character
+    after the previous match rather than at its end (a rule starting inside
+    another rule's match is still found) and the other rules are tried at
+    that offset with their own regex. Per rule, matches do not overlap, as
+    with a separate finditer per rule. Text may also be a bytes-like buffer
+    such as an mmap, matched with a bytes copy of the same regexes.
+    """
+
+    def __init__(self, rules):
+        self.rules = {rule["id"]: rule for rule in rules}
+        self.order = [rule["id"] for rule in rules]
+        self.file_counts = Counter()
+        self.match_counts = Counter()
+        self._lock = threading.Lock()
+        self._compiled = {}
+        self._binary = {}
+        self._groups = {}
+        self._single = {}
+        for target in sorted({rule.get("target", "code") for rule in rules}):
+            alternatives = []
+            for i, rule in enumerate(r for r in rules if r.get("target", "code") == target):
+                group = f"r{i}"
+                self._groups.setdefault(target, {})[group] = rule["id"]
+                patterns = rule["patterns"] if rule.get("regex") else [re.escape(p) for p in rule["patterns"]]
+                flags = "(?i:" if rule.get("ignore_case") else "(?:"
+                body = f"{flags}{'|'.join(patterns)})"
+                alternatives.append(f"(?P<{group}>{body})")
+                self._single.setdefault(target, []).append((group, re.compile(body), re.compile(body.encode("utf-8"))))
+            self._compiled[target] = re.compile("|".join(alternatives))
+            self._binary[target] = re.compile("|".join(alternatives).encode("utf-8"))
+
+    def scan(self, text, target="code"):
+        """Return {rule_id: [line numbers]} for every rule of target that matches text, in catalog order."""
+        binary = not isinstance(text, str)
+        pattern = (self._binary if binary else self._compiled).get(target)
+        if pattern is None or not len(text):
+            return {}
+        groups = self._groups[target]
+        single = self._single[target]
+        hits, ends = {}, {}
+        line, last = 1, 0
+        match = pattern.search(text)
+        while match is not None:
+            start = match.start()
+            # mmap has no count(); slicing copies only the gap between two matches.
+            line += text[last:start].count(b"\n") if binary else text.count("\n", last, start)
+            last = start
+            for group, regex, binary_regex in single:
+                if ends.get(group, 0) > start:
+                    continue
+                found = match if group == match.lastgroup else (binary_regex if binary else regex).match(text, start)
+                if found is None:
+                    continue
+                ends[group] = max(found.end(), start + 1)
+                hits.setdefault(groups[group], []).append(line)
+            match = pattern.search(text, start + 1)
+        self.count(hits)
+        return {rule_id: hits[rule_id] for rule_id in self.order if rule_id in hits}
+
+    def count(self, hits):
+        """Add one file's {rule_id: lines} to the per-rule statistics (also used for hits scanned in other processes)."""
+        with self._lock:
+            for rule_id, lines in hits.items():
+                self.file_counts[rule_id] += 1
+                self.match_counts[rule_id] += len(lines)
+
+    def rule(self, rule_id):
+        return self.rules[rule_id]
+
+    def report(self, log=print):
+        """Log how many files and matches each rule produced in this process."""
+        with self._lock:
+            if not self.file_counts:
+                return {}
+            log("Rule matches (files / hits): " + ", ".join(
+                f"{rule_id}={self.file_counts[rule_id]}/{self.match_counts[rule_id]}"
+                for rule_id in self.order if rule_id in self.file_counts
+            ))
+            return {rule_id: {"files": self.file_counts[rule_id], "matches": self.match_counts[rule_id]}
+                    for rule_id in self.file_counts}
+
+def format_location(file_name, lines, limit=5):
+    """Render a file name with the first few matching line numbers, e.g. 'Dao.java (lines 3, 9)'."""
+    lines = sorted(set(lines))
+    shown = ", ".join(str(n) for n in lines[:limit])
+    more = ", ..." if len(lines) > limit else ""
+    return f"{file_name} (line{'s' if len(lines) > 1 else ''} {shown}{more})"
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine(path=DEFAULT_RULES_PATH):
+    """Return the process-wide rule engine, compiling the catalog on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = RuleEngine(load_catalog(path))
+        return _engine
@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from artifacts import iter_records, records_path, write_records
+from evidence_index import DEFAULT_EVIDENCE_DIR, tokenize
+from generate_gaps import GAP_CATEGORIES
+from llm_client import set_max_concurrency
+from parallel_scan import DEFAULT_PROCESSES
+from run_pipeline import build_steps, run_pipeline, source_fingerprint
+from source_index import load_index
+
+DEFAULT_ROLLUP_PATH = "docs/portfolio-gaps.md"
+TOP_RECOMMENDATIONS = 5
+
+# -------------------- Manifest --------------------
+
+def repo_name(source):
+    """Name a repo after its checkout directory, e.g. 'claims/src/main/java' -> 'claims'."""
+    path = Path(source).resolve()
+    if path.parts[-3:] == ("src", "main", "java"):
+        path = path.parents[2]
+    return path.name
+
+def load_manifest(manifest_path):
+    """Read a batch manifest and return one settings dict per repo.
+
+    The manifest is {"defaults": {...}, "repos": [{...}, ...]} or just the
+    list of repos. Each repo needs a ``source`` directory (relative paths are
+    resolved against the manifest's directory); ``name``, ``entity``,
+    ``industry``, ``dsn``, ``batch`` and ``since`` are optional and fall back
+    to ``defaults``, then to the command line. Names default to the checkout
+    directory and must be unique, since they name the output directories.
+    """
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {"repos": manifest}
+    base = Path(manifest_path).resolve().parent
+    repos, names = [], set()
+    for entry in manifest.get("repos", []):
+        if "source" not in entry:
+            raise ValueError(f"Manifest entry without a source: {entry}")
+        repo = dict(manifest.get("defaults", {}), **entry)
+        repo["source"] = str(base / repo["source"])
+        repo.setdefault("name", repo_name(repo["source"]))
+        if repo["name"] in names:
+            raise ValueError(f"Duplicate repo name {repo['name']} in {manifest_path}; give the entries distinct names")
+        names.add(repo["name"])
+        repos.append(repo)
+    return repos
+
+# -------------------- Running --------------------
+
+def repo_args(repo, args):
+    """Build the run_pipeline arguments of one repo, with its outputs under reports/<repo>/ and docs/<repo>/."""
+    reports_dir = Path(args.reports_dir) / repo["name"]
+    return Namespace(
+        source=repo["source"],
+        entity=repo.get("entity", args.entity),
+        industry=repo.get("industry", args.industry),
+        reports_dir=str(reports_dir),
+        docs_dir=str(Path(args.docs_dir) / repo["name"]),
+        dsn=repo.get("dsn", args.dsn),
+        since=repo.get("since"),
+        batch=repo.get("batch", args.batch),
+        workers=args.workers,
+        no_dedupe=args.no_dedupe,
+        processes=args.processes,
+        index=str(reports_dir / "source-index.json"),
+        evidence_index=str(Path(DEFAULT_EVIDENCE_DIR) / repo["name"]),
+        resume=args.resume,
+    )
+
+def run_repo(repo, args, only=None):
+    """Run the step graph for one repo; return {step: status}."""
+    name = repo["name"]
+    if not os.path.isdir(repo["source"]):
+        print(f"[{name}] Error: Source directory {repo['source']} not found")
+        return {"pipeline": "failed"}
+    print(f"[{name}] Analyzing {repo['source']}")
+    settings = repo_args(repo, args)
+    try:
+        index = load_index(settings.source, settings.index)
+        status = run_pipeline(build_steps(settings), source_fingerprint(index),
+                              str(Path(settings.reports_dir) / "pipeline-state.json"),
+                              workers=args.parallel, force=args.force, only=only,
+                              metrics_dir=str(Path(settings.reports_dir) / "run-metrics"))
+    except Exception as e:
+        print(f"[{name}] Failed: {str(e)}")
+        return {"pipeline": "failed"}
+    print(f"[{name}] Status: " + ", ".join(f"{step}={value}" for step, value in status.items()))
+    return status
+
+def run_batch(repos, args, only=None):
+    """Run every repo of the manifest in one process; return {repo: {step: status}}.
+
+    Up to ``args.parallel_repos`` repos run at a time. They share the model
+    client, rate limiter and circuit breaker, the fallback's scan process
+    pool and a cap of ``args.workers`` model requests in flight across the
+    whole portfolio, so adding repos does not multiply the load on the
+    endpoint.
+    """
+    set_max_concurrency(args.workers)
+    with ThreadPoolExecutor(max_workers=max(1, args.parallel_repos)) as executor:
+        statuses = list(executor.map(lambda repo: run_repo(repo, args, only), repos))
+    return {repo["name"]: status for repo, status in zip(repos, statuses)}
+
+# -------------------- Portfolio Roll-up --------------------
+
+def classify_gap(text):
+    """Assign a gap to the GAP_CATEGORIES entry whose retrieval terms it shares most, or 'other'."""
+    words = set(tokenize(text))
+    best, best_score = "other", 0
+    for name, _, query in GAP_CATEGORIES:
+        score = len(words & set(tokenize(query)))
+        if score > best_score:
+            best, best_score = name, score
+    return best
+
+def collect_gaps(repos, docs_dir):
+    """Read each repo's gaps.jsonl and tag its records with the repo and a category."""
+    records = []
+    for repo in repos:
+        gaps_path = records_path(Path(docs_dir) / repo["name"] / "gaps.md")
+        if not gaps_path.exists():
+            print(f"Warning: {gaps_path} not found, {repo['name']} is left out of the roll-up")
+            continue
+        for record in iter_records(gaps_path):
+            category = classify_gap(f"{record['gap']} {record['recommendation']}")
+            records.append(dict(record, repo=repo["name"], category=category))
+    return records
+
+def write_rollup(repos, statuses, records, output_path):
+    """Write the portfolio gap report: per-repo status, then each category with its repos and top recommendations."""
+    names = [repo["name"] for repo in repos]
+    categories = {}
+    for record in records:
+        categories.setdefault(record["category"], []).append(record)
+    order = sorted(categories, key=lambda c: (-len({r["repo"] for r in categories[c]}), -len(categories[c]), c))
+    lines = ["# Portfolio Modernization Gaps", "",
+             f"{len(names)} repositories, {len(records)} gaps.", "",
+             "## Repositories", "",
+             "| Repository | Gaps | Steps |", "| --- | ---: | --- |"]
+    for name in names:
+        count = sum(1 for record in records if record["repo"] == name)
+        steps = ", ".join(f"{step}={value}" for step, value in statuses.get(name, {}).items())
+        lines.append(f"| {name} | {count} | {steps} |")
+    lines += ["", "## Gaps by Category", "", "| Category | Repositories | Gaps |", "| --- | ---: | ---: |"]
+    for category in order:
+        lines.append(f"| {category} | {len({r['repo'] for r in categories[category]})} | {len(categories[category])} |")
+    for category in order:
+        affected = sorted({record["repo"] for record in categories[category]}, key=names.index)
+        lines += ["", f"### {category.capitalize()}", "",
+                  f"Affects {len(affected)} of {len(names)} repositories: {', '.join(affected)}.", ""]
+        recommendations = {}
+        for record in categories[category]:
+            text = record["recommendation"] or record["gap"]
+            entry = recommendations.setdefault(text.strip().rstrip(".").lower(), {"text": text, "repos": set()})
+            entry["repos"].add(record["repo"])
+        ranked = sorted(recommendations.values(), key=lambda e: -len(e["repos"]))
+        for entry in ranked[:TOP_RECOMMENDATIONS]:
+            lines.append(f"- {entry['text']} ({len(entry['repos'])} of {len(names)} repositories)")
+    os.makedirs(Path(output_path).parent, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    write_records(records_path(output_path), records)
+    print(f"Portfolio roll-up written to {output_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the analysis pipeline over a manifest of repositories in one process")
+    parser.add_argument("--manifest", required=True, help="JSON manifest of the repositories to analyze")
+    parser.add_argument("--entity", default="Policy", help="Entity name for repos that do not set one")
+    parser.add_argument("--industry", default="Insurance", help="Industry for repos that do not set one")
+    parser.add_argument("--reports-dir", default="reports", help="Parent of the per-repo report directories")
+    parser.add_argument("--docs-dir", default="docs", help="Parent of the per-repo documentation directories")
+    parser.add_argument("--rollup", default=DEFAULT_ROLLUP_PATH, help="Output path of the portfolio gap report")
+    parser.add_argument("--steps", help="Comma-separated subset of steps to run (summary,queries,requirements,gaps,processflow,inventory)")
+    parser.add_argument("--dsn", default=os.environ.get("DATABASE_URL"), help="PostgreSQL connection string for repos that do not set one")
+    parser.add_argument("--batch", action="store_true", help="Group small files into multi-file requirements requests")
+    parser.add_argument("--workers", type=int, default=8, help="Model requests in flight across all repos")
+    parser.add_argument("--parallel-repos", type=int, default=2, help="Repos analyzed concurrently")
+    parser.add_argument("--parallel", type=int, default=2, help="Independent steps run concurrently within a repo")
+    parser.add_argument("--no-dedupe", action="store_true", help="Send near-duplicate files to the model individually")
+    parser.add_argument("--processes", type=int, default=DEFAULT_PROCESSES,
+                        help="Processes of the shared pool for rule-based fallback scans (default: FALLBACK_PROCESSES or one per core)")
+    parser.add_argument("--force", action="store_true", help="Run every step even if its inputs are unchanged")
+    parser.add_argument("--resume", action="store_true", help="Let summary and requirements skip files checkpointed by an interrupted run")
+    parser.add_argument("--publish", metavar="DIR", help="Afterwards, pre-render every repo's docs and the roll-up for index.html into DIR")
+    args = parser.parse_args()
+
+    repos = load_manifest(args.manifest)
+    only = [name.strip() for name in args.steps.split(",")] if args.steps else None
+    statuses = run_batch(repos, args, only)
+    write_rollup(repos, statuses, collect_gaps(repos, args.docs_dir), args.rollup)
+    if args.publish:
+        from publish_docs import publish
+        publish(docs_dir=args.docs_dir, site_dir=args.publish)
+    if any("failed" in status.values() for status in statuses.values()):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import contextvars
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+METRICS_DIR = os.environ.get("RUN_METRICS_DIR", "reports/run-metrics")
+# Optional prices (per 1,000 tokens) used to estimate API spend in the run report.
+PROMPT_COST_PER_1K = float(os.environ.get("PROMPT_COST_PER_1K", "0"))
+COMPLETION_COST_PER_1K = float(os.environ.get("COMPLETION_COST_PER_1K", "0"))
+
+EVENT_FIELDS = ["kind", "name", "elapsed", "retries", "prompt_tokens", "completion_tokens", "cache_hit", "status"]
+
+def usage_of(response):
+    """Return (prompt_tokens, completion_tokens) from a chat completion response, or zeros."""
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0
+
+class RunRecorder:
+    """Collects timing, retry, token and cache events for one pipeline step.
+
+    Events are either model calls ("model_call") or per-file units of work
+    ("file"); the step's wall time is measured from construction to write().
+    """
+
+    def __init__(self, step):
+        self.step = step
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.events = []
+        self._lock = threading.Lock()
+
+    def record(self, kind, name, elapsed=0.0, retries=0, prompt_tokens=0, completion_tokens=0,
+               cache_hit=False, status="ok"):
+        event = {
+            "kind": kind,
+            "name": name,
+            "elapsed": round(elapsed, 4),
+            "retries": retries,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cache_hit": cache_hit,
+            "status": status,
+        }
+        with self._lock:
+            self.events.append(event)
+        return event
+
+    @contextmanager
+    def timed(self, kind, name, **fields):
+        """Time a block; the yielded dict can be updated with retries, tokens or status before it ends."""
+        event = dict(fields)
+        start = time.perf_counter()
+        try:
+            yield event
+        except Exception:
+            event.setdefault("status", "error")
+            raise
+        finally:
+            self.record(kind, name, time.perf_counter() - start, **event)
+
+    def totals(self):
+        with self._lock:
+            calls = [e for e in self.events if e["kind"] == "model_call"]
+            files = [e for e in self.events if e["kind"] == "file"]
+        prompt_tokens = sum(e["prompt_tokens"] for e in calls)
+        completion_tokens = sum(e["completion_tokens"] for e in calls)
+        return {
+            "wall_time": round(time.perf_counter() - self._start, 3),
+            "files": len(files),
+            "duplicates": sum(1 for e in files if e["status"] == "duplicate"),
+            "model_calls": sum(1 for e in calls if not e["cache_hit"] and e["status"] != "circuit_open"),
+            "cache_hits": sum(1 for e in calls if e["cache_hit"]),
+            "retries": sum(e["retries"] for e in calls),
+            "failed_calls": sum(1 for e in calls if e["status"] not in ("ok", "circuit_open")),
+            "skipped_calls": sum(1 for e in calls if e["status"] == "circuit_open"),
+            "model_time": round(sum(e["elapsed"] for e in calls), 3),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "estimated_cost": round(prompt_tokens / 1000 * PROMPT_COST_PER_1K
+                                    + completion_tokens / 1000 * COMPLETION_COST_PER_1K, 4),
+        }
+
+    def summary_table(self, top=10):
+        """Render totals and the slowest files/calls as a plain-text table."""
+        totals = self.totals()
+        lines = [f"Run summary for {self.step}:"]
+        lines += [f"  {name:<18} {value}" for name, value in totals.items()]
+        with self._lock:
+            slowest = sorted(self.events, key=lambda e: -e["elapsed"])[:top]
+        if slowest:
+            lines.append(f"  Slowest {len(slowest)}:")
+            lines.append(f"    {'kind':<11} {'seconds':>8} {'retries':>7} {'tokens':>8}  name")
+            for e in slowest:
+                tokens = e["prompt_tokens"] + e["completion_tokens"]
+                lines.append(f"    {e['kind']:<11} {e['elapsed']:>8.2f} {e['retries']:>7} {tokens:>8}  {e['name']}")
+        return "\n".join(lines)
+
+    def write(self, directory=METRICS_DIR, log=print):
+        """Write <step>.json (totals + events) and <step>.csv (events), then log the summary table."""
+        directory = Path(directory)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with self._lock:
+                events = list(self.events)
+            with open(directory / f"{self.step}.json", "w", encoding="utf-8") as f:
+                json.dump({"step": self.step, "started": self.started, "totals": self.totals(), "events": events},
+                          f, indent=2)
+            with open(directory / f"{self.step}.csv", "w", encoding="utf-8", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=EVENT_FIELDS)
+                writer.writeheader()
+                writer.writerows(events)
+        except OSError as e:
+            log(f"Warning: Failed to write run metrics to {directory}: {str(e)}")
+        log(self.summary_table())
+
+_recorder = None
+_recorder_lock = threading.Lock()
+# The recorder of the pipeline step running in this context; see recording().
+_step_recorder = contextvars.ContextVar("step_recorder", default=None)
+
+def get_recorder(step=None):
+    """Return the running step's recorder (see recording), else the process-wide one named after the script unless step is given."""
+    global _recorder
+    current = _step_recorder.get()
+    if current is not None:
+        return current
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = RunRecorder(step or Path(sys.argv[0]).stem or "pipeline")
+        return _recorder
+
+@contextmanager
+def recording(step):
+    """Give the block its own recorder for ``step``, so steps run concurrently in one process report separately.
+
+    get_recorder() returns it in this context; worker threads started by the
+    step reach it through in_context().
+    """
+    recorder = RunRecorder(step)
+    token = _step_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _step_recorder.reset(token)
+
+def in_context(fn):
+    """Wrap fn so each call, on whatever thread, runs in a copy of the caller's context and records to its step."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
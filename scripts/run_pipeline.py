@@ -0,0 +1,261 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from source_index import DEFAULT_INDEX_PATH, load_index
+from run_metrics import METRICS_DIR, recording
+from llm_settings import model_settings
+from parallel_scan import DEFAULT_PROCESSES
+from similarity import DEDUP_ENABLED, DEFAULT_THRESHOLD
+from evidence_index import DEFAULT_EVIDENCE_DIR, EMBEDDING_MODEL, RETRIEVAL_MODE
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+DEFAULT_STATE_PATH = "reports/pipeline-state.json"
+
+class Step:
+    """One node of the pipeline graph.
+
+    ``run`` receives the in-memory results of the steps listed in ``deps``;
+    ``inputs`` returns the extra values (report files, settings) whose change
+    should force the step to run again, and ``output`` is the file it writes.
+    """
+
+    def __init__(self, name, deps, run, output, inputs=None):
+        self.name = name
+        self.deps = deps
+        self.run = run
+        self.output = output
+        self.inputs = inputs or (lambda: {})
+
+def file_digest(path):
+    """Return the SHA-256 of a file, or None when it does not exist."""
+    path = Path(path)
+    if not path.is_file():
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def source_fingerprint(index):
+    """Hash the (path, content hash) pairs of an index, so any added, removed or edited file changes it."""
+    digest = hashlib.sha256()
+    for record in sorted(index["files"], key=lambda r: r["path"]):
+        digest.update(f"{record['path']}\0{record['sha256']}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+def load_state(state_path):
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(state, state_path):
+    os.makedirs(Path(state_path).parent, exist_ok=True)
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+def build_steps(args):
+    """Describe summary -> requirements -> gaps -> processflow -> inventory as a graph.
+
+    Gaps uses the summary and query results; inventory lists the components
+    of the call graph built by processflow.
+    """
+    reports_dir = Path(args.reports_dir)
+    summary_path = reports_dir / "codebert-summary.md"
+    graph_path = reports_dir / "call-graph.json"
+    dedupe = DEDUP_ENABLED and not args.no_dedupe
+
+    def run_summary(results):
+        from codebert_summary import generate_summaries
+        return generate_summaries(args.source, summary_path, workers=args.workers, since=args.since,
+                                  index_path=args.index, reuse_index=True, dedupe=dedupe,
+                                  processes=args.processes, resume=args.resume)
+
+    def run_requirements(results):
+        from generate_requirements import generate_requirements
+        return generate_requirements(args.source, args.entity, args.industry, str(Path(args.docs_dir) / "requirements.md"),
+                                     since=args.since, batch=args.batch, index_path=args.index, reuse_index=True,
+                                     dedupe=dedupe, resume=args.resume)
+
+    def run_queries(results):
+        from analyze_queries import analyze_queries, write_report
+        records = analyze_queries(args.source, args.dsn, args.index, reuse_index=True)
+        write_report(records, reports_dir / "query-analysis.md")
+        return records
+
+    def run_gaps(results):
+        from generate_gaps import generate_gaps
+        # A skipped upstream step leaves no in-memory result; gaps then reads its saved artifact.
+        return generate_gaps(str(reports_dir), str(Path(args.docs_dir) / "gaps.md"), args.entity, args.industry,
+                             args.source, since=args.since, index_path=args.index, reuse_index=True,
+                             summaries=results.get("summary"), queries=results.get("queries"),
+                             processes=args.processes, evidence_dir=args.evidence_index)
+
+    def run_processflow(results):
+        from call_graph import generate_process_flow
+        return generate_process_flow(args.source, str(Path(args.docs_dir) / "processFlow.md"), str(graph_path),
+                                     args.index, reuse_index=True)
+
+    def run_inventory(results):
+        from generate_inventory import create_inventory
+        return create_inventory(args.source, str(Path(args.docs_dir) / "inventory.md"), args.index, reuse_index=True,
+                                graph_path=str(graph_path), graph=results.get("processflow"))
+
+    def gaps_inputs():
+        return {
+            "sonar": [file_digest(path) for path in sorted(reports_dir.glob("sonar-report*.json"))]
+                     + [file_digest(path) for path in sorted((reports_dir / "sonar-report").glob("*.json"))],
+            "checkstyle": file_digest(reports_dir / "checkstyle-report.xml"),
+            "retrieval": [RETRIEVAL_MODE, EMBEDDING_MODEL],
+        }
+
+    dedupe_settings = {"dedupe": dedupe and DEFAULT_THRESHOLD}
+    settings = dict(dedupe_settings, entity=args.entity, industry=args.industry, batch=args.batch)
+    return [
+        Step("summary", [], run_summary, summary_path, lambda: dedupe_settings),
+        Step("queries", [], run_queries, reports_dir / "query-analysis.md", lambda: {"database": bool(args.dsn)}),
+        Step("requirements", [], run_requirements, Path(args.docs_dir) / "requirements.md", lambda: settings),
+        Step("gaps", ["summary", "queries"], run_gaps, Path(args.docs_dir) / "gaps.md", lambda: dict(settings, **gaps_inputs())),
+        Step("processflow", [], run_processflow, Path(args.docs_dir) / "processFlow.md"),
+        Step("inventory", ["processflow"], run_inventory, Path(args.docs_dir) / "inventory.md"),
+    ]
+
+# Modules every step runs through (model client, cache, index, artifacts, metrics); hashed into each fingerprint.
+SHARED_FILES = ["llm_client.py", "llm_settings.py", "local_backend.py", "llm_cache.py", "artifacts.py",
+                "source_index.py", "incremental.py", "run_metrics.py"]
+SCRIPT_FILES = {
+    "summary": ["codebert_summary.py", "chunking.py", "similarity.py", "parallel_scan.py", "rule_engine.py", "rules/legacy_rules.json"],
+    "requirements": ["generate_requirements.py", "chunking.py", "similarity.py"],
+    "gaps": ["generate_gaps.py", "evidence_index.py", "analyze_queries.py", "parallel_scan.py", "rule_engine.py", "rules/legacy_rules.json", "sonar_report.py", "checkstyle_report.py"],
+    "queries": ["analyze_queries.py"],
+    "processflow": ["call_graph.py"],
+    "inventory": ["generate_inventory.py", "call_graph.py", "chunking.py", "rule_engine.py", "rules/legacy_rules.json"],
+}
+
+def step_fingerprint(step, sources, upstream):
+    """Combine everything a step's output depends on: sources, step code, settings, model and upstream steps."""
+    _, deployment = model_settings()
+    payload = {
+        "sources": sources,
+        "script": {name: file_digest(SCRIPTS_DIR / name) for name in SHARED_FILES + SCRIPT_FILES[step.name]},
+        "deployment": deployment,
+        "inputs": step.inputs(),
+        "upstream": upstream,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def run_pipeline(steps, sources, state_path=DEFAULT_STATE_PATH, workers=2, force=False, only=None, metrics_dir=METRICS_DIR):
+    """Run the step graph in one process, starting every step as soon as its dependencies finish.
+
+    Independent steps run concurrently. A step is skipped when its fingerprint
+    matches the last successful run and its output still exists; a failed step
+    causes its dependents to be skipped. A step that returns None (e.g.
+    requirements without a model) is reported as "no output" and its
+    fingerprint is not saved, so the next run tries it again. Each step that runs writes its own
+    run report, <step>.json/.csv in ``metrics_dir``. Returns {step: status}.
+    """
+    state = load_state(state_path)
+    by_name = {step.name: step for step in steps}
+    selected = set(only or by_name)
+    results, fingerprints, status = {}, {}, {}
+    pending = [step for step in steps if step.name in selected]
+    running = {}
+
+    def ready(step):
+        return all(dep in status or dep not in selected for dep in step.deps)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        while pending or running:
+            for step in [s for s in pending if ready(s)]:
+                pending.remove(step)
+                if any(status.get(dep) == "failed" for dep in step.deps):
+                    print(f"[{step.name}] Skipped because a dependency failed")
+                    status[step.name] = "failed"
+                    continue
+                upstream = {dep: fingerprints.get(dep, state.get(dep, {}).get("fingerprint")) for dep in step.deps}
+                fingerprint = step_fingerprint(step, sources, upstream)
+                fingerprints[step.name] = fingerprint
+                previous = state.get(step.name, {})
+                if not force and previous.get("fingerprint") == fingerprint and Path(step.output).exists():
+                    print(f"[{step.name}] Inputs unchanged since last run, skipping")
+                    status[step.name] = "skipped"
+                    continue
+                print(f"[{step.name}] Starting")
+                running[executor.submit(_timed_run, step, results, metrics_dir)] = step
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                try:
+                    results[step.name], elapsed = future.result()
+                except Exception as e:
+                    print(f"[{step.name}] Failed: {str(e)}")
+                    status[step.name] = "failed"
+                    state.pop(step.name, None)
+                    continue
+                if results[step.name] is None:
+                    print(f"[{step.name}] Produced no output in {elapsed:.1f}s; it will run again next time")
+                    status[step.name] = "no output"
+                    continue
+                print(f"[{step.name}] Finished in {elapsed:.1f}s")
+                status[step.name] = "ran"
+                state[step.name] = {"fingerprint": fingerprints[step.name], "finished": time.time()}
+                save_state(state, state_path)
+    return status
+
+def _timed_run(step, results, metrics_dir=METRICS_DIR):
+    start = time.perf_counter()
+    with recording(step.name) as recorder:
+        try:
+            result = step.run(results)
+        finally:
+            recorder.write(metrics_dir)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the analysis pipeline as a dependency graph in one process")
+    parser.add_argument("--source", required=True, help="Directory containing Java source files")
+    parser.add_argument("--entity", default="Policy", help="Entity name (e.g., Policy)")
+    parser.add_argument("--industry", default="Insurance", help="Industry (e.g., Insurance)")
+    parser.add_argument("--reports-dir", default="reports", help="Directory for analysis reports")
+    parser.add_argument("--docs-dir", default="docs", help="Directory for generated documentation")
+    parser.add_argument("--steps", help="Comma-separated subset of steps to run (summary,queries,requirements,gaps,processflow,inventory)")
+    parser.add_argument("--dsn", default=os.environ.get("DATABASE_URL"), help="PostgreSQL connection string for query plans")
+    parser.add_argument("--since", help="Only re-analyze files changed since this git revision")
+    parser.add_argument("--batch", action="store_true", help="Group small files into multi-file requirements requests")
+    parser.add_argument("--workers", type=int, default=4, help="Files summarized concurrently")
+    parser.add_argument("--no-dedupe", action="store_true", help="Send near-duplicate files to the model individually")
+    parser.add_argument("--processes", type=int, default=DEFAULT_PROCESSES,
+                        help="Processes for the rule-based fallback scans (default: FALLBACK_PROCESSES or one per core)")
+    parser.add_argument("--parallel", type=int, default=2, help="Independent steps run concurrently")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Path of the shared source index")
+    parser.add_argument("--state", default=DEFAULT_STATE_PATH, help="Where step fingerprints are recorded")
+    parser.add_argument("--evidence-index", default=DEFAULT_EVIDENCE_DIR, help="Directory of the gap evidence index")
+    parser.add_argument("--force", action="store_true", help="Run every step even if its inputs are unchanged")
+    parser.add_argument("--resume", action="store_true", help="Let summary and requirements skip files checkpointed by an interrupted run")
+    parser.add_argument("--publish", metavar="DIR", help="Afterwards, pre-render the docs and reports for index.html into DIR (see publish_docs.py)")
+    args = parser.parse_args()
+
+    # Scan the tree once; every step then reuses the saved index.
+    index = load_index(args.source, args.index)
+    steps = build_steps(args)
+    only = [name.strip() for name in args.steps.split(",")] if args.steps else None
+    status = run_pipeline(steps, source_fingerprint(index), args.state, workers=args.parallel,
+                          force=args.force, only=only)
+    print("Pipeline status: " + ", ".join(f"{name}={value}" for name, value in status.items()))
+    if args.publish:
+        from publish_docs import publish
+        publish(docs_dir=args.docs_dir, site_dir=args.publish)
+    if "failed" in status.values():
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,266 @@
-from supabase import create_client
+import argparse
+import io
+import itertools
+import os
+import queue
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS Policies (
+    Id SERIAL PRIMARY KEY,
+    PolicyNumber VARCHAR(50) NOT NULL,
+    CustomerName VARCHAR(100) NOT NULL,
+    Premium DECIMAL(18,2) NOT NULL,
+    IssueDate TIMESTAMP NOT NULL
+);
+"""
+SEED_ROWS = """
+INSERT INTO Policies (PolicyNumber, CustomerName, Premium, IssueDate)
+VALUES
+    ('POL-001', 'John Doe', 1200.00, '2010-01-15'),
+    ('POL-002', 'Jane Smith', 1500.00, '2010-03-20'),
+    ('POL-003', 'Acme Corp', 2500.00, '2010-06-10')
+ON CONFLICT DO NOTHING;
+"""
+COLUMNS = "PolicyNumber, CustomerName, Premium, IssueDate"
 
 def setup_supabase(url, key):
+    from supabase import create_client
     supabase = create_client(url, key)
     # Create Policies table
-    schema = """
-    CREATE TABLE IF NOT EXISTS Policies (
-        Id SERIAL PRIMARY KEY,
-        PolicyNumber VARCHAR(50) NOT NULL,
-        CustomerName VARCHAR(100) NOT NULL,
-        Premium DECIMAL(18,2) NOT NULL,
-        IssueDate TIMESTAMP NOT NULL
-    );
-    INSERT INTO Policies (PolicyNumber, CustomerName, Premium, IssueDate)
-    VALUES
-        ('POL-001', 'John Doe', 1200.00, '2010-01-15'),
-        ('POL-002', 'Jane Smith', 1500.00, '2010-03-20'),
-        ('POL-003', 'Acme Corp', 2500.00, '2010-06-10')
-    ON CONFLICT DO NOTHING;
+    supabase.rpc("execute_sql", {"query": SCHEMA + SEED_ROWS}).execute()
+
+# -------------------- Synthetic Data --------------------
+
+FIRST_NAMES = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "William", "Elizabeth",
+               "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+               "Maria", "Wei", "Fatima", "Carlos", "Aisha", "Hiroshi", "Olga", "Priya", "Mateo", "Chloe"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+              "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+              "Lee", "Perez", "Thompson", "White", "Harris", "Chen", "Patel", "Nguyen", "Kim", "Doe"]
+COMPANY_WORDS = ["Acme", "Global", "United", "Pioneer", "Summit", "Harbor", "Evergreen", "Atlas", "Liberty", "Northwind"]
+COMPANY_SUFFIXES = ["Corp", "LLC", "Inc", "Holdings", "Partners", "Group"]
+REGIONS = ["NY", "CA", "TX", "FL", "IL", "WA", "GA", "MA"]
+
+NUMBER_DISTRIBUTIONS = ("sequential", "random", "regional")
+NAME_DISTRIBUTIONS = ("zipf", "uniform")
+
+def _zipf_weights(count, exponent):
+    weights = [1 / (rank ** exponent) for rank in range(1, count + 1)]
+    return list(itertools.accumulate(weights))
+
+def generate_rows(count, start=0, seed=42, numbers="sequential", names="zipf", zipf_exponent=1.1,
+                  company_share=0.1):
+    """Yield ``count`` synthetic (PolicyNumber, CustomerName, Premium, IssueDate) rows.
+
+    ``numbers`` is "sequential" (POL-0000001), "random" (POL-<7 random digits>,
+    duplicates possible) or "regional" (NY-POL-0000001). ``names`` is "zipf",
+    where a few names dominate as in real customer lists, or "uniform".
+    ``start`` offsets sequence numbers and the random seed so shards loaded in
+    parallel produce distinct, reproducible rows.
     """
-    supabase.rpc("execute_sql", {"query": schema}).execute()
+    rng = random.Random(seed * 1_000_003 + start)
+    first_weights = _zipf_weights(len(FIRST_NAMES), zipf_exponent) if names == "zipf" else None
+    last_weights = _zipf_weights(len(LAST_NAMES), zipf_exponent) if names == "zipf" else None
+    # Names are drawn for the whole batch at once; per-row choices() calls dominate the load time otherwise.
+    firsts = rng.choices(FIRST_NAMES, cum_weights=first_weights, k=count)
+    lasts = rng.choices(LAST_NAMES, cum_weights=last_weights, k=count)
+    epoch = date(2005, 1, 1).toordinal()
+    random_value, lognormal = rng.random, rng.lognormvariate
+    for offset, i in enumerate(range(start, start + count)):
+        if numbers == "random":
+            number = f"POL-{int(random_value() * 10 ** 7):07d}"
+        elif numbers == "regional":
+            number = f"{REGIONS[int(random_value() * len(REGIONS))]}-POL-{i:07d}"
+        else:
+            number = f"POL-{i:07d}"
+        if random_value() < company_share:
+            name = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)}"
+        else:
+            name = f"{firsts[offset]} {lasts[offset]}"
+        premium = round(min(lognormal(7.2, 0.5), 99999.0), 2)
+        issued = date.fromordinal(epoch + int(random_value() * 7300))
+        yield number, name, premium, issued.isoformat()
+
+# -------------------- Loading --------------------
+
+class ConnectionPool:
+    """A fixed set of PostgreSQL connections handed out to loader threads.
+
+    Each ``connection()`` block commits on success and rolls back on error,
+    so a failed batch never leaves a half-written transaction on a reused
+    connection.
+    """
+
+    def __init__(self, dsn, size):
+        from analyze_queries import connect
+        self._connections = [connect(dsn) for _ in range(max(1, size))]
+        self._idle = queue.Queue()
+        for connection in self._connections:
+            self._idle.put(connection)
+
+    @contextmanager
+    def connection(self):
+        connection = self._idle.get()
+        try:
+            yield connection
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            self._idle.put(connection)
+
+    def close(self):
+        for connection in self._connections:
+            connection.close()
+
+def _copy_escape(value):
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+def copy_rows(connection, rows):
+    """Stream rows into Policies with COPY (psycopg 3 write_row, or copy_expert on psycopg2)."""
+    statement = f"COPY Policies ({COLUMNS}) FROM STDIN"
+    with connection.cursor() as cursor:
+        if hasattr(cursor, "copy"):
+            with cursor.copy(statement) as copy:
+                for row in rows:
+                    copy.write_row(row)
+        else:
+            buffer = io.StringIO("".join("\t".join(_copy_escape(v) for v in row) + "\n" for row in rows))
+            cursor.copy_expert(statement, buffer)
+
+def insert_rows(connection, rows, per_statement=1000):
+    """Insert rows with multi-row INSERT statements of ``per_statement`` rows each."""
+    rows = iter(rows)
+    with connection.cursor() as cursor:
+        while True:
+            chunk = list(itertools.islice(rows, per_statement))
+            if not chunk:
+                break
+            values = ", ".join(["(%s, %s, %s, %s)"] * len(chunk))
+            cursor.execute(f"INSERT INTO Policies ({COLUMNS}) VALUES {values}",
+                           [value for row in chunk for value in row])
+
+def bulk_load(dsn, rows, batch_size=100_000, workers=4, method="copy", seed=42, numbers="sequential",
+              names="zipf", truncate=False, offset=0):
+    """Load ``rows`` synthetic policies in parallel batches over a connection pool.
+
+    Each batch is generated on the fly and committed on its own, so memory
+    stays bounded and progress survives an interrupted load. Returns rows/second.
+    """
+    pool = ConnectionPool(dsn, workers)
+    load = copy_rows if method == "copy" else insert_rows
+    try:
+        with pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute(SCHEMA)
+            if truncate:
+                cursor.execute("TRUNCATE Policies RESTART IDENTITY")
+
+        def load_batch(start):
+            count = min(batch_size, offset + rows - start)
+            with pool.connection() as connection:
+                load(connection, generate_rows(count, start=start, seed=seed, numbers=numbers, names=names))
+            return count
+
+        started = time.perf_counter()
+        loaded = 0
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for count in executor.map(load_batch, range(offset, offset + rows, batch_size)):
+                loaded += count
+                elapsed = time.perf_counter() - started
+                print(f"Loaded {loaded}/{rows} rows ({loaded / elapsed:,.0f} rows/s)")
+        elapsed = time.perf_counter() - started
+        with pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute("ANALYZE Policies")
+    finally:
+        pool.close()
+    rate = rows / elapsed if elapsed else 0.0
+    print(f"Loaded {rows} rows with {method} in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+    return rate
+
+# -------------------- Candidate Indexes --------------------
+
+# Indexes to compare with analyze_queries.py. Plain btree indexes serve equality
+# and sorting, text_pattern_ops serves prefix LIKE 'POL-%', and trigram GIN
+# indexes are the only ones usable by the pipeline's LIKE '%...%' searches.
+CANDIDATE_INDEXES = {
+    "btree": [
+        "CREATE INDEX IF NOT EXISTS idx_policies_policynumber ON Policies (PolicyNumber)",
+        "CREATE INDEX IF NOT EXISTS idx_policies_customername ON Policies (CustomerName)",
+    ],
+    "prefix": [
+        "CREATE INDEX IF NOT EXISTS idx_policies_policynumber_prefix ON Policies (PolicyNumber text_pattern_ops)",
+    ],
+    "trigram": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS idx_policies_policynumber_trgm ON Policies USING gin (PolicyNumber gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS idx_policies_customername_trgm ON Policies USING gin (CustomerName gin_trgm_ops)",
+    ],
+}
+
+def create_indexes(dsn, groups):
+    """Create the candidate index groups (btree, prefix, trigram) and refresh planner statistics."""
+    from analyze_queries import connect
+    connection = connect(dsn)
+    try:
+        with connection.cursor() as cursor:
+            for group in groups:
+                for statement in CANDIDATE_INDEXES[group]:
+                    started = time.perf_counter()
+                    cursor.execute(statement)
+                    print(f"{statement} ({time.perf_counter() - started:.1f}s)")
+            cursor.execute("ANALYZE Policies")
+        connection.commit()
+    finally:
+        connection.close()
+
+def drop_indexes(dsn):
+    """Drop every candidate index so a baseline without indexes can be measured."""
+    from analyze_queries import connect
+    connection = connect(dsn)
+    try:
+        with connection.cursor() as cursor:
+            for statements in CANDIDATE_INDEXES.values():
+                for statement in statements:
+                    if statement.startswith("CREATE INDEX"):
+                        cursor.execute(f"DROP INDEX IF EXISTS {statement.split()[5]}")
+        connection.commit()
+    finally:
+        connection.close()
 
 if __name__ == "__main__":
-    import os
-    setup_supabase(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Create the Policies table, optionally bulk-loading synthetic rows")
+    parser.add_argument("--rows", type=int, default=0, help="Synthetic rows to load (requires --dsn); 0 seeds three rows via Supabase")
+    parser.add_argument("--dsn", default=os.environ.get("DATABASE_URL"), help="PostgreSQL connection string (default: DATABASE_URL)")
+    parser.add_argument("--method", choices=["copy", "insert"], default="copy", help="COPY or multi-row INSERT batches")
+    parser.add_argument("--batch-size", type=int, default=100_000, help="Rows per committed batch")
+    parser.add_argument("--workers", type=int, default=4, help="Pooled connections loading batches in parallel")
+    parser.add_argument("--numbers", choices=NUMBER_DISTRIBUTIONS, default="sequential", help="PolicyNumber distribution")
+    parser.add_argument("--names", choices=NAME_DISTRIBUTIONS, default="zipf", help="CustomerName distribution")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for reproducible data")
+    parser.add_argument("--truncate", action="store_true", help="Empty the table before loading")
+    parser.add_argument("--indexes", default="", help="Comma-separated candidate index groups to create: btree,prefix,trigram")
+    parser.add_argument("--drop-indexes", action="store_true", help="Drop all candidate indexes first (baseline run)")
+    args = parser.parse_args()
+
+    if not args.rows and not args.indexes and not args.drop_indexes:
+        setup_supabase(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+    else:
+        if not args.dsn:
+            parser.error("--dsn or DATABASE_URL is required for bulk loading and index creation")
+        groups = [group.strip() for group in args.indexes.split(",") if group.strip()]
+        unknown = [group for group in groups if group not in CANDIDATE_INDEXES]
+        if unknown:
+            parser.error(f"Unknown index group(s): {', '.join(unknown)}")
+        if args.drop_indexes:
+            drop_indexes(args.dsn)
+        if args.rows:
+            bulk_load(args.dsn, args.rows, args.batch_size, args.workers, args.method, args.seed,
+                      args.numbers, args.names, args.truncate)
+        if groups:
+            create_indexes(args.dsn, groups)
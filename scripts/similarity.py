@@ -0,0 +1,173 @@
+import difflib
+import hashlib
+import os
+import re
+
+from source_index import parse_structure
+
+# Files at least this similar (estimated Jaccard of token shingles) share one model call.
+DEFAULT_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", "0.85"))
+# DEDUP_DISABLED=1 sends every file to the model even when near-duplicates are found.
+DEDUP_ENABLED = os.environ.get("DEDUP_DISABLED", "").strip().lower() not in ("1", "true", "yes")
+SHINGLE_SIZE = 5
+SKETCH_SIZE = 64
+BANDS = 16
+TYPE_SUFFIXES = ("ServiceImpl", "Impl", "DAO", "Dao", "Servlet", "Service", "Controller", "Repository",
+                 "Entity", "DTO", "Dto", "Bean", "Manager", "Helper", "Handler", "Action", "Form")
+
+_COMMENT = re.compile(r"//[^\n]*|/\*.*?\*/", re.DOTALL)
+_TOKEN = re.compile(r"[A-Za-z_$][\w$]*|\d+|\S")
+_PACKAGE_LINE = re.compile(r"^\s*(?:package|import)\b[^\n]*", re.MULTILINE)
+_EMPTY = (1 << 64) - 1
+
+def type_stems(code):
+    """Return the file's declared type names and their stems, e.g. 'PolicyDAO' -> 'Policy', longest first."""
+    names = set()
+    for name in parse_structure(code)["classes"]:
+        names.add(name)
+        for suffix in TYPE_SUFFIXES:
+            if name.endswith(suffix) and len(name) > len(suffix):
+                names.add(name[:-len(suffix)])
+                break
+    return sorted(names, key=len, reverse=True)
+
+def normalize_tokens(code, stems=None):
+    """Tokenize code without comments, package/import lines or the file's own type names.
+
+    Occurrences of the declared type names (and their stems) become '$T', so a
+    class copied per module with only its entity renamed normalizes to the
+    same token stream.
+    """
+    stems = type_stems(code) if stems is None else stems
+    text = _PACKAGE_LINE.sub(" ", _COMMENT.sub(" ", code))
+    if stems:
+        pattern = re.compile("|".join(re.escape(s) for s in stems + [s[:1].lower() + s[1:] for s in stems]))
+        text = pattern.sub("$T", text)
+    return _TOKEN.findall(text)
+
+def sketch(code, stems=None, size=SKETCH_SIZE):
+    """Compute a one-permutation MinHash sketch of the code's token shingles.
+
+    Every shingle is hashed once and lands in one of ``size`` bins, each bin
+    keeping its minimum; empty bins borrow from the next filled bin so that
+    sketches of small files remain comparable.
+    """
+    tokens = normalize_tokens(code, stems)
+    mins = [_EMPTY] * size
+    for i in range(max(1, len(tokens) - SHINGLE_SIZE + 1)):
+        shingle = " ".join(tokens[i:i + SHINGLE_SIZE]).encode("utf-8")
+        value = int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), "big")
+        bin_index, rest = value % size, value // size
+        if rest < mins[bin_index]:
+            mins[bin_index] = rest
+    filled = [i for i, value in enumerate(mins) if value != _EMPTY]
+    if not filled:
+        return mins
+    for i in range(size):
+        if mins[i] == _EMPTY:
+            donor = next((j for j in filled if j > i), filled[0])
+            mins[i] = mins[donor] ^ (i * 0x9E3779B97F4A7C15 & _EMPTY)
+    return mins
+
+def estimate_similarity(a, b):
+    """Estimate the Jaccard similarity of two sketches as the share of equal bins."""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+class NearDuplicateIndex:
+    """Groups sketches around representatives using LSH bands.
+
+    A sketch is split into ``bands`` bands; sketches sharing any band are
+    candidates and are compared exactly. Each new item either joins the most
+    similar representative at or above the threshold or becomes a
+    representative itself, so clusters never drift through chains of
+    slightly-different members.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, bands=BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.buckets = {}
+        self.sketches = {}
+
+    def _band_keys(self, values):
+        rows = len(values) // self.bands
+        return [(band, tuple(values[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+
+    def add(self, key, values):
+        """Add a sketch; return (representative key, similarity) if it is a near-duplicate, else None."""
+        best, best_score = None, 0.0
+        seen = set()
+        band_keys = self._band_keys(values)
+        for band_key in band_keys:
+            for candidate in self.buckets.get(band_key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                score = estimate_similarity(values, self.sketches[candidate])
+                if score > best_score:
+                    best, best_score = candidate, score
+        if best is not None and best_score >= self.threshold:
+            return best, best_score
+        self.sketches[key] = values
+        for band_key in band_keys:
+            self.buckets.setdefault(band_key, []).append(key)
+        return None
+
+def cluster_sources(sources, threshold=DEFAULT_THRESHOLD):
+    """Split (key, code) pairs into representatives and near-duplicates.
+
+    Returns {member key: (representative key, similarity)}; keys missing
+    from the mapping are representatives. The first file of a cluster, in
+    input order, is its representative.
+    """
+    index = NearDuplicateIndex(threshold)
+    duplicates = {}
+    for key, code in sources:
+        match = index.add(key, sketch(code))
+        if match is not None:
+            duplicates[key] = match
+    return duplicates
+
+def describe_difference(representative_code, member_code, limit=2):
+    """Describe how a member differs from its representative: renamed types and changed lines."""
+    rep_stems, member_stems = type_stems(representative_code), type_stems(member_code)
+    renames = rename_map(rep_stems, member_stems)
+    adapted = adapt_text(representative_code, renames).splitlines()
+    member_lines = member_code.splitlines()
+    changed = []
+    matcher = difflib.SequenceMatcher(None, adapted, member_lines, autojunk=False)
+    for tag, _, _, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            changed += [line.strip() for line in member_lines[j1:j2] if line.strip()]
+    changed = [line for line in changed if not line.startswith(("package ", "import "))]
+    parts = []
+    primary = next(((old, new) for old, new in renames.items() if old != new), None)
+    if primary:
+        parts.append(f"{primary[0]} is renamed to {primary[1]}")
+    if changed:
+        examples = "; ".join(f"`{line[:80]}`" for line in changed[:limit])
+        parts.append(f"{len(changed)} other line(s) differ, e.g. {examples}")
+    return ", ".join(parts) if parts else "identical apart from formatting or comments"
+
+def rename_map(rep_stems, member_stems):
+    """Pair the representative's type names with the member's, longest names first."""
+    return dict(zip(rep_stems, member_stems)) if len(rep_stems) == len(member_stems) else {}
+
+def adapt_text(text, renames):
+    """Rewrite representative type names in text (summary, requirements, code) to the member's names."""
+    if not renames:
+        return text
+    variants = {}
+    for old, new in renames.items():
+        variants[old] = new
+        variants[old[:1].lower() + old[1:]] = new[:1].lower() + new[1:]
+    pattern = re.compile("|".join(re.escape(old) for old in sorted(variants, key=len, reverse=True)))
+    return pattern.sub(lambda match: variants[match.group(0)], text)
+
+def fan_out(text, representative, member, representative_code, member_code, similarity):
+    """Adapt a representative's generated text to a near-duplicate member and note how they differ."""
+    renames = rename_map(type_stems(representative_code), type_stems(member_code))
+    adapted = adapt_text(text.replace(representative, member), renames)
+    note = (f"(Near-duplicate of {representative}, {similarity:.0%} similar; adapted from its result. "
+            f"Differences: {describe_difference(representative_code, member_code)}.)")
+    return f"{adapted}\n{note}"
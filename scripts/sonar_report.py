@@ -0,0 +1,184 @@
+import argparse
+import base64
+import json
+import os
+import re
+import urllib.parse
+import urllib.request
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# SonarQube's issues/search API refuses to page past 10,000 results.
+SONAR_MAX_RESULTS = 10000
+# Larger projects are exported in slices under that cap: by type, then severity, then creation date.
+SONAR_TYPES = ["BUG", "VULNERABILITY", "CODE_SMELL"]
+SONAR_SEVERITIES = ["BLOCKER", "CRITICAL", "MAJOR", "MINOR", "INFO"]
+SONAR_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S+0000"
+
+def _page_number(path):
+    match = re.search(r"(\d+)(?=\.json$)", path.name)
+    return int(match.group(1)) if match else 0
+
+def find_page_files(report_path):
+    """Return the Sonar export files under report_path in page order.
+
+    Accepts a sonar-report/ directory of page files (as written by
+    fetch_sonar_pages), sibling page files named sonar-report-<n>.json, or a
+    single sonar-report.json, in that order of preference: an older export
+    left next to a newer one is ignored rather than read twice.
+    """
+    report_path = Path(report_path)
+    if report_path.is_file():
+        return [report_path]
+    page_dir = report_path / "sonar-report"
+    pages = sorted(page_dir.glob("*.json"), key=_page_number) if page_dir.is_dir() else []
+    if not pages:
+        pages = sorted(report_path.glob("sonar-report-*.json"), key=_page_number)
+    if not pages and (report_path / "sonar-report.json").exists():
+        pages = [report_path / "sonar-report.json"]
+    return pages
+
+def iter_issues(report_path):
+    """Yield issues from every page file, loading one page at a time.
+
+    Totals are kept per query slice (see fetch_sonar_pages). Warns when the
+    pages found hold fewer issues than their paging totals, which means some
+    pages were never downloaded, and when a query matched more issues than
+    the API returns (SONAR_MAX_RESULTS), which means the export is truncated.
+    """
+    seen, totals = 0, {}
+    for page_file in find_page_files(report_path):
+        with open(page_file, encoding="utf-8") as f:
+            page = json.load(f)
+        paging = page.get("paging") or {}
+        query = json.dumps(page.get("slice"), sort_keys=True)
+        totals[query] = max(totals.get(query, 0), paging.get("total", page.get("total", 0)) or 0)
+        issues = page.get("issues", [])
+        seen += len(issues)
+        yield from issues
+    expected = sum(totals.values())
+    reachable = sum(min(total, SONAR_MAX_RESULTS) for total in totals.values())
+    if seen < reachable:
+        print(f"Warning: Sonar export reports {reachable} issues but only {seen} were found in the page files.")
+    if expected > reachable:
+        print(f"Warning: Sonar export is truncated: {expected} issues matched but the API returns at most "
+              f"{SONAR_MAX_RESULTS} per query, so {expected - reachable} are missing. "
+              f"Re-export with sonar_report.py, which splits the query.")
+
+def dedupe_issues(issues):
+    """Collapse issues with the same rule and component into one entry with an occurrence count."""
+    groups = OrderedDict()
+    for issue in issues:
+        key = (issue.get("rule", "unknown"), issue.get("component", "unknown"))
+        group = groups.get(key)
+        if group is None:
+            groups[key] = {
+                "rule": key[0],
+                "component": key[1],
+                "type": issue.get("type", "unknown"),
+                "severity": issue.get("severity", "unknown"),
+                "message": issue.get("message", "No message"),
+                "count": 1,
+            }
+        else:
+            group["count"] += 1
+    return list(groups.values())
+
+def aggregate_by_component(groups):
+    """Pre-aggregate deduplicated issues into per-component type counts, largest components first."""
+    components = OrderedDict()
+    for group in groups:
+        entry = components.setdefault(group["component"], {"types": Counter(), "total": 0, "issues": []})
+        entry["types"][group.get("type", "unknown")] += group.get("count", 1)
+        entry["total"] += group.get("count", 1)
+        entry["issues"].append(group)
+    for entry in components.values():
+        entry["issues"].sort(key=lambda g: -g.get("count", 1))
+    return OrderedDict(sorted(components.items(), key=lambda item: -item[1]["total"]))
+
+def load_sonar_issues(report_path):
+    """Stream all Sonar pages under report_path and return the deduplicated issue groups."""
+    return dedupe_issues(iter_issues(report_path))
+
+# -------------------- Export --------------------
+
+def _total(data):
+    return (data.get("paging") or {}).get("total", data.get("total", 0)) or 0
+
+def query_slices(search, query):
+    """Yield (query, total) slices of ``query`` that each match at most SONAR_MAX_RESULTS issues.
+
+    ``search`` runs one issues/search request and returns its JSON. A query
+    over the cap is split by type, then severity, then halved creation-date
+    windows; a window too short to split is yielded as is with a warning.
+    """
+    total = _total(search(dict(query, p=1, ps=1)))
+    if total <= SONAR_MAX_RESULTS:
+        yield query, total
+    elif "types" not in query:
+        for issue_type in SONAR_TYPES:
+            yield from query_slices(search, dict(query, types=issue_type))
+    elif "severities" not in query:
+        for severity in SONAR_SEVERITIES:
+            yield from query_slices(search, dict(query, severities=severity))
+    else:
+        after = datetime.strptime(query.get("createdAfter", "1970-01-01T00:00:00+0000"), SONAR_DATE_FORMAT)
+        before = (datetime.strptime(query["createdBefore"], SONAR_DATE_FORMAT) if "createdBefore" in query
+                  else datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0) + timedelta(days=1))
+        if before - after <= timedelta(minutes=1):
+            print(f"Warning: {total} Sonar issues match {query}; only the first {SONAR_MAX_RESULTS} can be exported.")
+            yield query, total
+            return
+        middle = (after + (before - after) / 2).replace(microsecond=0)
+        for start, end in ((after, middle), (middle, before)):
+            yield from query_slices(search, dict(query, createdAfter=start.strftime(SONAR_DATE_FORMAT),
+                                                 createdBefore=end.strftime(SONAR_DATE_FORMAT)))
+
+def fetch_sonar_pages(host_url, token, component, output_dir, page_size=500):
+    """Download every issue of /api/issues/search into output_dir as page-<n>.json files.
+
+    Page files of an earlier export are removed first. Projects with more
+    issues than the API pages through are fetched in slices (see
+    query_slices); each page file records its slice, so iter_issues can
+    check the totals.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for stale in output_dir.glob("page-*.json"):
+        stale.unlink()
+    auth = base64.b64encode(f"{token}:".encode("utf-8")).decode("ascii")
+
+    def search(query):
+        request = urllib.request.Request(
+            f"{host_url.rstrip('/')}/api/issues/search?{urllib.parse.urlencode(query)}",
+            headers={"Authorization": f"Basic {auth}"}
+        )
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return json.load(response)
+
+    written, slices = [], 0
+    for query, total in query_slices(search, {"componentKeys": component}):
+        slices += 1
+        page = 1
+        while True:
+            data = search(dict(query, p=page, ps=page_size))
+            data["slice"] = query
+            path = output_dir / f"page-{len(written) + 1}.json"
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            written.append(path)
+            if page * page_size >= min(_total(data), SONAR_MAX_RESULTS) or not data.get("issues"):
+                break
+            page += 1
+    print(f"Downloaded {len(written)} Sonar page(s) in {slices} query slice(s) for {component} into {output_dir}")
+    return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--component", required=True, help="Sonar project key")
+    parser.add_argument("--output-dir", default="reports/sonar-report", help="Directory for page files")
+    parser.add_argument("--page-size", type=int, default=500, help="Issues per page (Sonar maximum is 500)")
+    args = parser.parse_args()
+    fetch_sonar_pages(os.environ["SONAR_HOST_URL"], os.environ["SONAR_TOKEN"], args.component,
+                      args.output_dir, args.page_size)
@@ -0,0 +1,149 @@
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+# What the shared index scans (each step filters it to the languages it handles); override with comma-separated env values.
+SOURCE_EXTENSIONS = tuple(
+    os.environ.get("SOURCE_EXTENSIONS", ".java,.kt,.scala,.groovy,.cs,.py,.js,.ts").split(",")
+)
+IGNORED_DIRS = {".git", ".svn", ".idea", ".gradle", ".mvn", "target", "build", "out", "bin", "node_modules", "__pycache__"}
+IGNORED_PATTERNS = [p for p in os.environ.get("SOURCE_IGNORE", "").split(",") if p]
+DEFAULT_INDEX_PATH = os.environ.get("SOURCE_INDEX_PATH", "reports/source-index.json")
+INDEX_VERSION = 1
+
+LANGUAGES = {
+    ".java": "java", ".kt": "kotlin", ".scala": "scala", ".groovy": "groovy",
+    ".cs": "csharp", ".py": "python", ".js": "javascript", ".ts": "typescript",
+}
+
+_PACKAGE = re.compile(r"^\s*(?:package|namespace)\s+([\w.]+)", re.MULTILINE)
+_IMPORT = re.compile(
+    r"^\s*(?:import\s+(?:static\s+)?([\w.*]+)"          # Java/Kotlin/Scala/Groovy/Python
+    r"|using\s+(?:static\s+)?([\w.]+)\s*;"              # C#
+    r"|from\s+([\w.]+)\s+import"                        # Python
+    r"|import\s+.*?from\s+['\"]([^'\"]+)['\"])",        # JavaScript/TypeScript
+    re.MULTILINE
+)
+_CLASS = re.compile(r"\b(?:class|interface|enum|record|object|trait)\s+([A-Z_]\w*)")
+_ANNOTATION = re.compile(r"(?<![\w\"'])@([A-Z]\w*)")
+
+def parse_structure(code):
+    """Extract package, imports, declared type names and annotations from source text."""
+    package = _PACKAGE.search(code)
+    imports = []
+    for match in _IMPORT.finditer(code):
+        name = next(group for group in match.groups() if group)
+        if name not in imports:
+            imports.append(name)
+    return {
+        "package": package.group(1) if package else None,
+        "imports": imports,
+        "classes": list(dict.fromkeys(_CLASS.findall(code))),
+        "annotations": sorted(set(_ANNOTATION.findall(code))),
+    }
+
+def is_source_file(relative_path, extensions=SOURCE_EXTENSIONS):
+    """Apply the shared extension and ignore policy to a path relative to the source root."""
+    if not relative_path.endswith(tuple(extensions)):
+        return False
+    return not any(fnmatch.fnmatch(relative_path, pattern) for pattern in IGNORED_PATTERNS)
+
+def _walk(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in IGNORED_DIRS)
+        for name in sorted(filenames):
+            path = Path(dirpath) / name
+            relative = path.relative_to(root).as_posix()
+            if is_source_file(relative):
+                yield relative, path
+
+def _read_index(index_path):
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") == INDEX_VERSION:
+            return index
+    except (OSError, ValueError):
+        pass
+    return None
+
+def build_index(source_dir, previous=None):
+    """Walk source_dir once and describe every source file.
+
+    Files whose size and mtime match the previous index are taken over without
+    being read again; the rest are read, hashed and parsed.
+    """
+    root = Path(source_dir).resolve()
+    known = {}
+    if previous and previous.get("root") == str(root):
+        known = {record["path"]: record for record in previous.get("files", [])}
+    files, reparsed = [], 0
+    for relative, path in _walk(root):
+        try:
+            stat = path.stat()
+        except OSError as e:
+            print(f"Warning: Failed to stat {path}: {str(e)}")
+            continue
+        old = known.get(relative)
+        if old and old["size"] == stat.st_size and old["mtime"] == stat.st_mtime:
+            files.append(old)
+            continue
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            print(f"Warning: Failed to read {path}: {str(e)}")
+            continue
+        record = {
+            "path": relative,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "language": LANGUAGES.get(path.suffix, path.suffix.lstrip(".")),
+        }
+        record.update(parse_structure(data.decode("utf-8", errors="replace")))
+        files.append(record)
+        reparsed += 1
+    print(f"Indexed {len(files)} source files under {root} ({reparsed} read, {len(files) - reparsed} unchanged)")
+    return {"version": INDEX_VERSION, "root": str(root), "created": time.time(), "files": files}
+
+def save_index(index, index_path=DEFAULT_INDEX_PATH):
+    """Write the index as JSON, creating parent directories as needed."""
+    index_path = Path(index_path)
+    os.makedirs(index_path.parent, exist_ok=True)
+    tmp_path = index_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+
+def load_index(source_dir, index_path=DEFAULT_INDEX_PATH, reuse=False):
+    """Return the source index for source_dir.
+
+    With ``reuse``, an existing index for the same root is returned as is,
+    without touching the source tree; this is how downstream steps share the
+    scan done by the first step. Otherwise the tree is rescanned incrementally
+    and the refreshed index is saved back to index_path.
+    """
+    root = str(Path(source_dir).resolve())
+    previous = _read_index(index_path) if index_path else None
+    if reuse and previous and previous.get("root") == root:
+        print(f"Loaded source index {index_path} ({len(previous['files'])} files)")
+        return previous
+    index = build_index(source_dir, previous)
+    if index_path:
+        try:
+            save_index(index, index_path)
+        except OSError as e:
+            print(f"Warning: Failed to save source index {index_path}: {str(e)}")
+    return index
+
+def source_files(index, extensions=None):
+    """Yield (absolute path, record) pairs from an index, optionally restricted to some extensions."""
+    root = Path(index["root"])
+    for record in index["files"]:
+        if extensions is None or record["path"].endswith(tuple(extensions)):
+            yield root / record["path"], record